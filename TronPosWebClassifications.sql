@@ -4,4 +4,6 @@ CREATE TABLE TronPosWebClassifications (
     TopWebClassificationGUID NVARCHAR(255) NOT NULL,
     Name NVARCHAR(50) NULL,
     PRIMARY KEY(id)
-)
\ No newline at end of file
+);
+
+CREATE INDEX IX_TronPosWebClassifications_tpfirm_id ON TronPosWebClassifications (tpfirm_id);
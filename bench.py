@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+
+"""Benchmarks for model layer hot paths, run against local stand-in database (standin.py).
+
+Measures rows per second and latency percentiles of CRUD, fetch and hydration paths
+and writes JSON report. With --baseline, report is compared to previous report and
+exit code is 1 if any measurement regressed more than --threshold.
+
+Example:
+    python bench.py --sizes 1000 10000 --output bench.json
+    python bench.py --sizes 1000 10000 --baseline bench.json
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import random
+import sys
+import time
+
+import models
+from models import TronPosOdooExchangeUp
+from standin import StandInDatabase
+
+
+CONNECTION_PARAMETERS = {'server': 'standin', 'database': 'bench', 'user': '', 'password': ''}
+
+
+def make_row(pk):
+    """generates row of TronPosOdooExchangeUp, as returned from as_dict cursor
+
+    Args:
+        pk (int): primary key value
+
+    Returns:
+        dict: row values
+    """
+    return {
+        'tpfirm_id': pk,
+        'tpfirmName': 'Firma {}'.format(pk),
+        'tpfirmActive': pk % 3 != 0,
+        'TronRetailServerDataBase': 'TronRetail{}'.format(pk % 50),
+        'OdooHost': 'odoo{}.example.com'.format(pk % 20),
+        'OdooPort': 8069,
+        'OdooDataBase': 'odoo_{}'.format(pk),
+        'OdooUserName': 'admin',
+        'OdooPassword': 'secret{}'.format(pk),
+        'recDate': datetime.datetime(2020, 1, 1) + datetime.timedelta(minutes=pk),
+        'OdooECommerce': None if pk % 5 == 0 else True,
+        'RowChID': pk,
+        'SyncClientUser': 'sync',
+        'SyncClientPassword': None,
+        'WebClassificationTable': 'WebClass',
+        'TopWebClassifications': None
+    }
+
+
+def percentile(sorted_values, q):
+    """nearest rank percentile
+
+    Args:
+        sorted_values (list[float]): sorted samples
+        q (float): percentile between 0 and 100
+
+    Returns:
+        float: percentile value
+    """
+    if(len(sorted_values) == 0):
+        return 0.0
+    rank = max(int(round(q / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def measure(func, items, rows_per_call=1):
+    """calls func for each item and collects timings
+
+    Args:
+        func (function): measured function, called with item
+        items (iterable): items passed to func
+        rows_per_call (int, optional): rows processed in single call. Defaults to 1.
+
+    Returns:
+        dict: calls, rows, rows_per_s and latency percentiles in ms
+    """
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        func(item)
+        latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    total = sum(latencies)
+    rows = len(latencies) * rows_per_call
+    return {
+        'calls': len(latencies),
+        'rows': rows,
+        'total_s': round(total, 6),
+        'rows_per_s': round(rows / total, 1) if total > 0 else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 4),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 4),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 4),
+        'max_ms': round(latencies[-1] * 1000, 4) if latencies else 0.0
+    }
+
+
+def run_size(size, max_ops, repeat, latency):
+    """runs all benchmarks for table of given size
+
+    Args:
+        size (int): number of rows in table
+        max_ops (int): max number of single row calls (fetch where, update, delete)
+        repeat (int): number of FetchAllObjects calls
+        latency (float): simulated round trip in seconds
+
+    Returns:
+        dict{string:dict}: results by benchmark name
+    """
+    database = StandInDatabase(latency=latency)
+    database.createTables()
+    models.set_connection_factory(database.connect)
+
+    rows = [make_row(pk) for pk in range(1, size + 1)]
+    rng = random.Random(size)
+    sample = rng.sample(rows, min(max_ops, size))
+
+    results = {}
+
+    results['SchemaObject.__init__'] = measure(TronPosOdooExchangeUp, rows)
+
+    objects = [TronPosOdooExchangeUp(row) for row in rows]
+    results['getFieldValuesSQL'] = measure(lambda obj: obj.getFieldValuesSQL(), objects)
+
+    results['insertObject'] = measure(
+        lambda obj: obj.insertObject(CONNECTION_PARAMETERS), objects)
+
+    results['FetchAllObjects'] = measure(
+        lambda _: TronPosOdooExchangeUp.FetchAllObjects(CONNECTION_PARAMETERS),
+        range(repeat), rows_per_call=size)
+
+    results['FetchObjectsWhere'] = measure(
+        lambda row: TronPosOdooExchangeUp.FetchObjectsWhere(
+            CONNECTION_PARAMETERS, {'tpfirm_id': row['tpfirm_id']}),
+        sample)
+
+    to_modify = [objects[row['tpfirm_id'] - 1] for row in sample]
+
+    def update(obj):
+        obj.setField('OdooPort', obj.getField('OdooPort') + 1)
+        obj.updateObject(CONNECTION_PARAMETERS)
+
+    results['updateObject'] = measure(update, to_modify)
+    results['deleteObject'] = measure(
+        lambda obj: obj.deleteObject(CONNECTION_PARAMETERS), to_modify)
+
+    return results
+
+
+def compare(report, baseline, threshold):
+    """compares report with baseline report
+
+    Args:
+        report (dict): current report
+        baseline (dict): baseline report
+        threshold (float): allowed relative slowdown of rows_per_s, ex. 0.1 for 10%
+
+    Returns:
+        list[dict]: comparison of each benchmark present in both reports
+    """
+    comparison = []
+    for key, result in report['results'].items():
+        if(key not in baseline.get('results', {})):
+            continue
+        old = baseline['results'][key]['rows_per_s']
+        new = result['rows_per_s']
+        change = (new - old) / old if old > 0 else 0.0
+        comparison.append({
+            'benchmark': key,
+            'baseline_rows_per_s': old,
+            'rows_per_s': new,
+            'change': round(change, 4),
+            'regression': change < -threshold
+        })
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='table sizes in rows')
+    parser.add_argument('--max-ops', type=int, default=10000,
+                        help='max number of single row calls per benchmark')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of FetchAllObjects calls')
+    parser.add_argument('--rtt-ms', type=float, default=0.0,
+                        help='simulated round trip per statement in ms')
+    parser.add_argument('--output', help='write JSON report to file instead of stdout')
+    parser.add_argument('--baseline', help='JSON report to compare with')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='allowed relative slowdown before regression is reported')
+    args = parser.parse_args(argv)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'backend': 'standin',
+            'rtt_ms': args.rtt_ms,
+            'max_ops': args.max_ops
+        },
+        'results': {}
+    }
+
+    for size in args.sizes:
+        for name, result in run_size(size, args.max_ops, args.repeat, args.rtt_ms / 1000.0).items():
+            report['results']['{}@{}'.format(name, size)] = result
+
+    exit_code = 0
+    if(args.baseline):
+        with open(args.baseline) as f:
+            report['comparison'] = compare(report, json.load(f), args.threshold)
+        if(any(item['regression'] for item in report['comparison'])):
+            exit_code = 1
+
+    output = json.dumps(report, indent=2)
+    if(args.output):
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+"""Command line entry point for batch jobs, without GUI.
+
+Only model layer and module of chosen command are imported, so jobs start fast and can run
+in cron or containers without Tk. Connection settings are read from config.ini (see --config),
+which is not created when it's missing.
+
+Commands:
+    ping      checks connection to SQL DB
+    fetch     prints rows as JSON lines or CSV
+    delete    deletes rows matching filter, with referencing rows
+    export    see export.py
+    import    see importer.py
+    sync      see sync.py
+    probe     see probe.py
+    advise    see index_advisor.py
+    codegen   see codegen.py
+
+Example:
+    python cli.py fetch TronPosOdooExchangeUp --where "tpfirmActive=1" --mask
+    python cli.py delete TronPosOdooExchangeUp --where "tpfirm_id>=1000"
+    python cli.py export TronPosWebClassifications classifications.csv
+
+Tables from .sql files listed in MSSQL_APP_SCHEMA (see codegen.py) are available to all commands.
+"""
+
+import argparse
+import csv
+import importlib
+import json
+import os
+import sys
+
+from config import CONFIG_FILE, load_connection_parameters
+from models import SCHEMA_CLASSES, connect, parse_filter_text
+
+
+# same as codegen.SCHEMA_ENV, codegen is imported only when it's set
+SCHEMA_ENV = "MSSQL_APP_SCHEMA"
+
+# commands implemented by other modules, module is imported only when command is used
+MODULE_COMMANDS = {
+    'export': 'export',
+    'import': 'importer',
+    'sync': 'sync',
+    'probe': 'probe',
+    'advise': 'index_advisor',
+    'codegen': 'codegen'
+}
+
+
+def ping(args):
+    with connect(load_connection_parameters(args.config, write_default=False)) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            conn.commit()
+    print("OK")
+    return 0
+
+
+def fetch(args):
+    from export import MASK, format_values
+
+    schema_class = SCHEMA_CLASSES[args.table]
+    field_names = list(schema_class.fields.keys())
+    masked = [field_names.index(name) for name in schema_class.SECRET_FIELDS] if args.mask else []
+
+    if(args.format == 'csv'):
+        writer = csv.writer(sys.stdout)
+        writer.writerow(field_names)
+        write = writer.writerow
+    else:
+        encoder = json.JSONEncoder(ensure_ascii=False)
+        write = lambda row: sys.stdout.write(encoder.encode(dict(zip(field_names, row))) + "\n")
+
+    count = 0
+    for rows in schema_class.IterValues(load_connection_parameters(args.config, write_default=False),
+                                        parse_filter_text(schema_class, args.where)):
+        format_values(schema_class, rows)
+        for row in rows:
+            if(args.limit is not None and count >= args.limit):
+                return 0
+            for i in masked:
+                if(row[i] is not None):
+                    row[i] = MASK
+            write(row)
+            count += 1
+    return 0
+
+
+def delete(args):
+    schema_class = SCHEMA_CLASSES[args.table]
+    if(args.where == '' and not args.all):
+        print("Filter is empty, use --all to delete all rows", file=sys.stderr)
+        return 2
+
+    deleted = schema_class.DeleteObjectsWhere(load_connection_parameters(args.config, write_default=False),
+                                              parse_filter_text(schema_class, args.where))
+    print(json.dumps(deleted))
+    return 0
+
+
+def main(argv=None):
+    if(argv is None):
+        argv = sys.argv[1:]
+
+    if(os.environ.get(SCHEMA_ENV)):
+        import codegen
+        codegen.register_from_environment()
+
+    # module commands have their own arguments
+    if(len(argv) > 0 and argv[0] in MODULE_COMMANDS):
+        return importlib.import_module(MODULE_COMMANDS[argv[0]]).main(argv[1:])
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0],
+                                     epilog="Commands {} accept --help.".format(", ".join(MODULE_COMMANDS)))
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--config', default=CONFIG_FILE, help='config file with connection settings')
+
+    command = commands.add_parser('ping', help='check connection to SQL DB', parents=[common])
+    command.set_defaults(run=ping)
+
+    command = commands.add_parser('fetch', help='print rows', parents=[common])
+    command.add_argument('table', choices=list(SCHEMA_CLASSES.keys()))
+    command.add_argument('--where', default='', help='filter, ex. "tpfirmActive=1 OdooHost:odoo.example.com"')
+    command.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    command.add_argument('--mask', action='store_true', help='mask passwords')
+    command.add_argument('--limit', type=int, help='max number of rows')
+    command.set_defaults(run=fetch)
+
+    command = commands.add_parser('delete', help='delete rows matching filter with referencing rows',
+                                  parents=[common])
+    command.add_argument('table', choices=list(SCHEMA_CLASSES.keys()))
+    command.add_argument('--where', default='', help='filter, ex. "tpfirm_id>=1000"')
+    command.add_argument('--all', action='store_true', help='delete all rows when filter is empty')
+    command.set_defaults(run=delete)
+
+    for name in MODULE_COMMANDS:
+        commands.add_parser(name, help='see {}.py'.format(MODULE_COMMANDS[name]), add_help=False)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
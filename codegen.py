@@ -0,0 +1,600 @@
+#!/usr/bin/env python3
+
+"""Schema code generator, builds schema classes from table definitions.
+
+Tables are read from .sql DDL files (offline) or from SQL DB catalog views (INFORMATION_SCHEMA and sys).
+Generated module contains schema classes with fields, PK/FK metadata and precomputed statements
+(see models.compile_statements), so nothing is computed when classes are loaded. Module is cached
+in schema_cache directory under key of source (files or DB and tables) and hash of DDL (or catalog fingerprint),
+next start imports cached module instead of parsing or introspecting again. When source changes, cached
+modules of its older hashes are deleted.
+
+Generated classes are registered next to hand-written classes in models.SCHEMA_CLASSES, hand-written
+classes keep precedence. With --check, hand-written classes are compared with generated ones
+and differences (drift) are printed.
+
+Conventions:
+    RowChID integer column is row version (VERSION_FIELD)
+    columns with "password" in name are secret (SECRET_FIELDS)
+    first text columns, which are not keys or secrets, are searched (SEARCH_FIELDS)
+
+Example:
+    python codegen.py --sql TronPosOdooExchangeUp.sql TronPosWebClassifications.sql --check
+    python codegen.py --catalog --table TronPosWebClassifications --output schema.py
+    MSSQL_APP_SCHEMA=NewTable.sql python cli.py fetch NewTable
+"""
+
+import argparse
+import glob
+import hashlib
+import importlib.util
+import os
+import re
+import sys
+from collections import OrderedDict, namedtuple
+
+import models
+from config import CONFIG_FILE, load_connection_parameters
+from models import (MSBigInt, MSBit, MSDatetime, MSDecimal, MSFloat, MSInt, MSUniqueIdentifier, MSVarbinary, MSVarchar,
+                    compile_statements, connect)
+
+
+# bumped when generated source changes, so old cached modules are not used
+GENERATOR_VERSION = 2
+
+SCHEMA_ENV = "MSSQL_APP_SCHEMA"
+CACHE_DIR = "schema_cache"
+VERSION_COLUMN = "RowChID"
+SECRET_MARKER = "password"
+MAX_SEARCH_FIELDS = 3
+# length of (N)VARCHAR(MAX)
+MAX_LENGTH = 1073741823
+
+TYPES = {
+    'INT': MSInt,
+    'SMALLINT': MSInt,
+    'TINYINT': MSInt,
+    'BIGINT': MSBigInt,
+    'BIT': MSBit,
+    'DATETIME': MSDatetime,
+    'DATETIME2': MSDatetime,
+    'SMALLDATETIME': MSDatetime,
+    'DATE': MSDatetime,
+    'CHAR': MSVarchar,
+    'NCHAR': MSVarchar,
+    'VARCHAR': MSVarchar,
+    'NVARCHAR': MSVarchar,
+    'DECIMAL': MSDecimal,
+    'NUMERIC': MSDecimal,
+    'MONEY': MSDecimal,
+    'SMALLMONEY': MSDecimal,
+    'FLOAT': MSFloat,
+    'REAL': MSFloat,
+    'UNIQUEIDENTIFIER': MSUniqueIdentifier,
+    'BINARY': MSVarbinary,
+    'VARBINARY': MSVarbinary
+}
+
+# precision and scale of types which don't declare them
+DECIMAL_DEFAULTS = {
+    'DECIMAL': (18, 0),
+    'NUMERIC': (18, 0),
+    'MONEY': (19, 4),
+    'SMALLMONEY': (10, 4)
+}
+
+# length is precision of DECIMAL/NUMERIC columns, scale is None for other types
+ColumnInfo = namedtuple('ColumnInfo', ['name', 'type_name', 'length', 'nullable', 'is_pk', 'references', 'scale'],
+                        defaults=(None,))
+TableInfo = namedtuple('TableInfo', ['name', 'columns'])
+
+CATALOG_COLUMNS_QUERY = """SELECT c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE, c.CHARACTER_MAXIMUM_LENGTH, c.IS_NULLABLE,
+    c.NUMERIC_PRECISION, c.NUMERIC_SCALE
+FROM INFORMATION_SCHEMA.COLUMNS c
+JOIN INFORMATION_SCHEMA.TABLES t ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME
+WHERE t.TABLE_TYPE = 'BASE TABLE' AND c.TABLE_NAME IN ({})
+ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION"""
+
+CATALOG_PK_QUERY = """SELECT k.TABLE_NAME, k.COLUMN_NAME
+FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc
+JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE k ON k.CONSTRAINT_SCHEMA = tc.CONSTRAINT_SCHEMA AND k.CONSTRAINT_NAME = tc.CONSTRAINT_NAME
+WHERE tc.CONSTRAINT_TYPE = 'PRIMARY KEY' AND k.TABLE_NAME IN ({})"""
+
+CATALOG_FK_QUERY = """SELECT OBJECT_NAME(f.parent_object_id) AS TABLE_NAME,
+    COL_NAME(f.parent_object_id, f.parent_column_id) AS COLUMN_NAME,
+    OBJECT_NAME(f.referenced_object_id) AS REFERENCED_TABLE
+FROM sys.foreign_key_columns f
+WHERE OBJECT_NAME(f.parent_object_id) IN ({})"""
+
+# changes when any column or table definition changes, cheap compared to reading catalog
+CATALOG_FINGERPRINT_QUERY = """SELECT
+    (SELECT CHECKSUM_AGG(BINARY_CHECKSUM(TABLE_NAME, COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH,
+                                      NUMERIC_PRECISION, NUMERIC_SCALE, IS_NULLABLE, ORDINAL_POSITION))
+     FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME IN ({0})) AS columns_checksum,
+    (SELECT CONVERT(VARCHAR(30), MAX(modify_date), 126) FROM sys.tables WHERE name IN ({0})) AS modified"""
+
+CREATE_TABLE = re.compile(r"CREATE\s+TABLE\s+((?:\[?\w+\]?\.)*\[?\w+\]?)\s*\(", re.IGNORECASE)
+COLUMN = re.compile(r"^\[?(\w+)\]?\s+\[?(\w+)\]?\s*(?:\(\s*(\w+)\s*(?:,\s*(\w+)\s*)?\))?(.*)$", re.DOTALL)
+COLUMN_LIST = re.compile(r"\(([^)]*)\)")
+REFERENCES = re.compile(r"REFERENCES\s+((?:\[?\w+\]?\.)*\[?\w+\]?)", re.IGNORECASE)
+CREATE_INDEX = re.compile(r"CREATE\s+(?:UNIQUE\s+)?(?:(?:NON)?CLUSTERED\s+)?INDEX\s+\[?\w+\]?\s+ON\s+"
+                          r"((?:\[?\w+\]?\.)*\[?\w+\]?)\s*\(([^)]*)\)", re.IGNORECASE)
+
+
+class CodegenError(Exception):
+    """Raised if table definition can't be converted to schema class"""
+    pass
+
+
+def unquote(name):
+    """returns name without brackets and schema prefix, ex. [dbo].[Table] -> Table"""
+    return name.split(".")[-1].strip("[] ")
+
+
+def split_top_level(text):
+    """splits text by commas which are not in parentheses"""
+    parts = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(text):
+        if(char == "("):
+            depth += 1
+        elif(char == ")"):
+            depth -= 1
+        elif(char == "," and depth == 0):
+            parts.append(text[start:i].strip())
+            start = i + 1
+    parts.append(text[start:].strip())
+    return [part for part in parts if part != ""]
+
+
+def column_names(text):
+    """returns names from first parenthesized list in text"""
+    match = COLUMN_LIST.search(text)
+    if(match is None):
+        raise CodegenError("expected column list: {}".format(text))
+    return [unquote(name) for name in match.group(1).split(",")]
+
+
+def parse_ddl(text):
+    """parses CREATE TABLE statements, other statements are ignored
+
+    Args:
+        text (string): DDL
+
+    Raises:
+        CodegenError: raised if statement can't be parsed
+
+    Returns:
+        list[TableInfo]: tables in order of statements
+    """
+    text = re.sub(r"--[^\n]*", "", text)
+    tables = []
+
+    for match in CREATE_TABLE.finditer(text):
+        depth = 1
+        end = match.end()
+        while(depth > 0):
+            if(end >= len(text)):
+                raise CodegenError("unbalanced parentheses in CREATE TABLE {}".format(match.group(1)))
+            depth += {"(": 1, ")": -1}.get(text[end], 0)
+            end += 1
+
+        columns = OrderedDict()
+        primary_key = []
+        references = {}
+        for item in split_top_level(text[match.end():end - 1]):
+            words = item.split()
+            if(words[0].upper() == "CONSTRAINT"):
+                item = item.split(None, 2)[2]
+                words = item.split()
+
+            keyword = " ".join(words[:2]).upper()
+            if(keyword.startswith("PRIMARY KEY")):
+                primary_key.extend(column_names(item))
+                continue
+            if(keyword.startswith("FOREIGN KEY")):
+                target = REFERENCES.search(item)
+                if(target is None):
+                    raise CodegenError("expected REFERENCES: {}".format(item))
+                for name in column_names(item[:target.start()]):
+                    references[name] = unquote(target.group(1))
+                continue
+            if(words[0].upper() in ("UNIQUE", "CHECK", "INDEX")):
+                continue
+
+            column = COLUMN.match(item)
+            if(column is None):
+                raise CodegenError("can't parse column: {}".format(item))
+            name, type_name, length, scale, rest = column.groups()
+            target = REFERENCES.search(rest)
+            if(target is not None):
+                references[name] = unquote(target.group(1))
+            rest = " ".join(rest.upper().split())
+            length = MAX_LENGTH if length is not None and length.upper() == "MAX" else length
+            if("PRIMARY KEY" in rest):
+                primary_key.append(name)
+            columns[name] = ColumnInfo(name, type_name.upper(), int(length) if length is not None else None,
+                                       "NOT NULL" not in rest, False, None, int(scale) if scale is not None else None)
+
+        for name in primary_key:
+            if(name not in columns):
+                raise CodegenError("PK column {} is not defined".format(name))
+            columns[name] = columns[name]._replace(is_pk=True, nullable=False)
+        for name, table_name in references.items():
+            columns[name] = columns[name]._replace(references=table_name)
+
+        tables.append(TableInfo(unquote(match.group(1)), list(columns.values())))
+
+    return tables
+
+
+def parse_indexes(text):
+    """parses CREATE INDEX statements, other statements are ignored. ASC/DESC of key columns is dropped.
+
+    Args:
+        text (string): DDL
+
+    Returns:
+        dict{string:list[tuple[string]]}: key columns of indexes of each table
+    """
+    text = re.sub(r"--[^\n]*", "", text)
+    indexes = OrderedDict()
+    for match in CREATE_INDEX.finditer(text):
+        columns = tuple(unquote(column.split()[0]) for column in match.group(2).split(","))
+        indexes.setdefault(unquote(match.group(1)), []).append(columns)
+    return indexes
+
+
+def read_catalog(connection_parameters, table_names):
+    """reads tables from catalog views of SQL DB
+
+    Args:
+        connection_parameters (kwargs dict): pymssql connection parameters
+        table_names (list[string]): names of tables
+
+    Raises:
+        CodegenError: raised if table doesn't exist
+
+    Returns:
+        list[TableInfo]: tables in order of table_names
+    """
+    placeholders = ",".join(["%s"] * len(table_names))
+    with connect(connection_parameters) as conn:
+        with conn.cursor(as_dict=True) as cursor:
+            cursor.execute(CATALOG_COLUMNS_QUERY.format(placeholders), tuple(table_names))
+            rows = cursor.fetchall()
+            cursor.execute(CATALOG_PK_QUERY.format(placeholders), tuple(table_names))
+            primary_keys = {(row['TABLE_NAME'], row['COLUMN_NAME']) for row in cursor.fetchall()}
+            cursor.execute(CATALOG_FK_QUERY.format(placeholders), tuple(table_names))
+            references = {(row['TABLE_NAME'], row['COLUMN_NAME']): row['REFERENCED_TABLE'] for row in cursor.fetchall()}
+            conn.commit()
+
+    tables = OrderedDict((table_name, []) for table_name in table_names)
+    for row in rows:
+        key = (row['TABLE_NAME'], row['COLUMN_NAME'])
+        length = row['CHARACTER_MAXIMUM_LENGTH']
+        scale = None
+        if(row['DATA_TYPE'].upper() in ('DECIMAL', 'NUMERIC')):
+            length, scale = row['NUMERIC_PRECISION'], row['NUMERIC_SCALE']
+        tables[row['TABLE_NAME']].append(ColumnInfo(
+            row['COLUMN_NAME'], row['DATA_TYPE'].upper(), MAX_LENGTH if length == -1 else length,
+            row['IS_NULLABLE'] == 'YES', key in primary_keys, references.get(key), scale))
+
+    missing = [table_name for table_name, columns in tables.items() if len(columns) == 0]
+    if(len(missing) > 0):
+        raise CodegenError("tables not found: {}".format(", ".join(missing)))
+    return [TableInfo(table_name, columns) for table_name, columns in tables.items()]
+
+
+def catalog_fingerprint(connection_parameters, table_names):
+    """returns string which changes when definition of any of tables changes"""
+    placeholders = ",".join(["%s"] * len(table_names))
+    with connect(connection_parameters) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(CATALOG_FINGERPRINT_QUERY.format(placeholders), tuple(table_names) * 2)
+            row = cursor.fetchone()
+            conn.commit()
+    return "{}|{}".format(*row)
+
+
+def field_source(column):
+    """returns source of MSType object of column
+
+    Args:
+        column (ColumnInfo): column
+
+    Raises:
+        CodegenError: raised if type of column is not supported
+
+    Returns:
+        string: ex. MSVarchar(50, isNull=True)
+    """
+    field_type = TYPES.get(column.type_name)
+    if(field_type is None):
+        raise CodegenError("unsupported type {} of column {}".format(column.type_name, column.name))
+
+    arguments = []
+    if(field_type in (MSVarchar, MSVarbinary)):
+        arguments.append(str(column.length if column.length is not None else 1))
+    elif(field_type is MSDecimal):
+        precision, scale = DECIMAL_DEFAULTS[column.type_name]
+        if(column.type_name in ('DECIMAL', 'NUMERIC') and column.length is not None):
+            precision, scale = column.length, column.scale if column.scale is not None else 0
+        arguments.extend([str(precision), str(scale)])
+    for flag, value in (('isNull', column.nullable), ('isPK', column.is_pk), ('isFK', column.references is not None)):
+        if(value):
+            arguments.append("{}=True".format(flag))
+    return "{}({})".format(field_type.__name__, ", ".join(arguments))
+
+
+def class_attributes(table):
+    """returns class attributes of schema class of table, by conventions in module docstring
+
+    Args:
+        table (TableInfo): table
+
+    Returns:
+        OrderedDict{string:value}: names and values of attributes
+    """
+    primary_key = [column.name for column in table.columns if column.is_pk]
+    if(len(primary_key) > 1):
+        raise CodegenError("composite PK of table {} is not supported".format(table.name))
+
+    version_field = next((column.name for column in table.columns
+                          if column.name == VERSION_COLUMN and TYPES.get(column.type_name) in (MSInt, MSBigInt)), None)
+    secret_fields = tuple(column.name for column in table.columns if SECRET_MARKER in column.name.lower())
+    search_fields = tuple(column.name for column in table.columns
+                          if TYPES.get(column.type_name) is MSVarchar and not column.is_pk
+                          and column.references is None and column.name not in secret_fields)[:MAX_SEARCH_FIELDS]
+
+    attributes = OrderedDict([
+        ('TABLE_NAME', table.name),
+        ('VERSION_FIELD', version_field),
+        ('SEARCH_FIELDS', search_fields),
+        ('SECRET_FIELDS', secret_fields),
+        ('FOREIGN_KEYS', {column.name: column.references for column in table.columns if column.references is not None})
+    ])
+    attributes.update(compile_statements(table.name, [column.name for column in table.columns],
+                                         primary_key[0] if primary_key else None, version_field))
+    return attributes
+
+
+def generate_source(tables, description, schema_hash=""):
+    """generates module with schema classes of tables
+
+    Args:
+        tables (list[TableInfo]): tables
+        description (string): source of tables, written in header
+        schema_hash (string, optional): hash written in header. Defaults to "".
+
+    Returns:
+        string: Python source
+    """
+    lines = [
+        "# Generated by codegen.py from {}, do not edit.".format(description),
+        "# schema hash: {}".format(schema_hash),
+        "",
+        "import copy",
+        "from collections import OrderedDict",
+        "",
+        "from models import (SchemaObject, MSBigInt, MSBit, MSDatetime, MSDecimal, MSFloat, MSInt, MSUniqueIdentifier,",
+        "                    MSVarbinary, MSVarchar)",
+        ""
+    ]
+
+    for table in tables:
+        lines.extend(["", "class {}(SchemaObject):".format(table.name),
+                      '    """Schema class for {}"""'.format(table.name), ""])
+        for name, value in class_attributes(table).items():
+            lines.append("    {} = {!r}".format(name, value))
+        lines.extend(["", "    fields = OrderedDict(["])
+        lines.append(",\n".join("        ({!r}, {})".format(column.name, field_source(column)) for column in table.columns))
+        lines.extend([
+            "    ])",
+            "",
+            "    def __init__(self, fields_dict={}):",
+            "        super().__init__(copy.deepcopy(self.fields), self.TABLE_NAME, fields_dict)",
+            ""
+        ])
+
+    lines.extend(["", "SCHEMA_CLASSES = OrderedDict(["])
+    lines.append(",\n".join("    ({0!r}, {0})".format(table.name) for table in tables))
+    lines.extend(["])", ""])
+    return "\n".join(lines)
+
+
+def compute_hash(*parts):
+    """returns hash of generator version and parts"""
+    digest = hashlib.sha1(str(GENERATOR_VERSION).encode("utf-8"))
+    for part in parts:
+        digest.update(b"\0")
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def prune_cache(cache_dir, source_key, keep):
+    """deletes cached modules of source other than keep, so changed schemas don't accumulate.
+    Modules cached before source key was part of name are deleted too.
+
+    Args:
+        cache_dir (string): directory of generated modules
+        source_key (string): key of source, see load_schema_classes
+        keep (string): path of current module
+    """
+    stale = glob.glob(os.path.join(cache_dir, "schema_{}_*.py".format(source_key)))
+    stale += [file_path for file_path in glob.glob(os.path.join(cache_dir, "schema_*.py"))
+              if re.fullmatch(r"schema_[0-9a-f]{16}\.py", os.path.basename(file_path))]
+    for file_path in stale:
+        if(os.path.abspath(file_path) == os.path.abspath(keep)):
+            continue
+        try:
+            os.remove(file_path)
+        except OSError:
+            # module can be used (or already deleted) by other process
+            pass
+
+
+def import_module(file_path, module_name):
+    spec = importlib.util.spec_from_file_location(module_name, file_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_schema_classes(sql_files=None, connection_parameters=None, table_names=None, cache_dir=CACHE_DIR):
+    """returns generated schema classes, from cache if tables didn't change
+
+    Args:
+        sql_files (list[string], optional): .sql DDL files. Defaults to None, catalog is read.
+        connection_parameters (kwargs dict, optional): pymssql connection parameters, used if sql_files is None.
+        table_names (list[string], optional): tables read from catalog, used if sql_files is None.
+        cache_dir (string, optional): directory of generated modules. Defaults to CACHE_DIR.
+
+    Returns:
+        OrderedDict{string:schema class}: table names and schema classes
+    """
+    if(sql_files is not None):
+        contents = []
+        for file_path in sql_files:
+            with open(file_path, "rb") as f:
+                contents.append(f.read())
+        schema_hash = compute_hash(*contents)
+        source = [os.path.abspath(file_path) for file_path in sql_files]
+    else:
+        table_names = list(table_names)
+        schema_hash = compute_hash(catalog_fingerprint(connection_parameters, table_names), *table_names)
+        source = [connection_parameters.get('server', ''), connection_parameters.get('database', '')] + table_names
+
+    # key of source is same for all versions of its schema, so older modules can be found
+    source_key = hashlib.sha1("\0".join(source).encode("utf-8")).hexdigest()[:8]
+    module_name = "schema_{}_{}".format(source_key, schema_hash)
+    file_path = os.path.join(cache_dir, module_name + ".py")
+    if(not os.path.isfile(file_path)):
+        if(sql_files is not None):
+            tables = [table for content in contents for table in parse_ddl(content.decode("utf-8-sig"))]
+            description = ", ".join(os.path.basename(file_path) for file_path in sql_files)
+        else:
+            tables = read_catalog(connection_parameters, table_names)
+            description = "catalog of {}".format(connection_parameters.get('database', 'SQL DB'))
+
+        os.makedirs(cache_dir, exist_ok=True)
+        # written to temporary file first, so concurrent starts don't import partial module
+        temporary_path = "{}.{}.tmp".format(file_path, os.getpid())
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            f.write(generate_source(tables, description, schema_hash))
+        os.replace(temporary_path, file_path)
+        prune_cache(cache_dir, source_key, file_path)
+
+    return import_module(file_path, module_name).SCHEMA_CLASSES
+
+
+def register_schema_classes(schema_classes):
+    """adds schema classes to models.SCHEMA_CLASSES, hand-written classes are kept
+
+    Args:
+        schema_classes (dict{string:schema class}): table names and schema classes
+
+    Returns:
+        list[string]: names of added tables
+    """
+    added = [table_name for table_name in schema_classes if table_name not in models.SCHEMA_CLASSES]
+    for table_name in added:
+        models.SCHEMA_CLASSES[table_name] = schema_classes[table_name]
+    return added
+
+
+def register_from_environment():
+    """registers classes generated from .sql files listed in MSSQL_APP_SCHEMA (separated by os.pathsep)"""
+    sql_files = [file_path for file_path in os.environ.get(SCHEMA_ENV, "").split(os.pathsep) if file_path != ""]
+    if(len(sql_files) == 0):
+        return []
+    return register_schema_classes(load_schema_classes(sql_files))
+
+
+def field_signature(field_type):
+    return (type(field_type).__name__, field_type.DESCRIPTOR, field_type.isNull, field_type.isPK, field_type.isFK)
+
+
+def check(schema_classes, reference=None):
+    """compares generated classes with hand-written classes of same tables
+
+    Args:
+        schema_classes (dict{string:schema class}): generated classes
+        reference (dict{string:schema class}, optional): hand-written classes. Defaults to models.SCHEMA_CLASSES.
+
+    Returns:
+        list[string]: differences, empty if there is no drift
+    """
+    if(reference is None):
+        reference = models.SCHEMA_CLASSES
+
+    differences = []
+    for table_name, generated in schema_classes.items():
+        written = reference.get(table_name)
+        if(written is None or written is generated):
+            continue
+
+        if(list(written.fields.keys()) != list(generated.fields.keys())):
+            differences.append("{}: fields {} in models, {} in DDL".format(
+                table_name, list(written.fields.keys()), list(generated.fields.keys())))
+        for field_name in written.fields.keys() & generated.fields.keys():
+            if(field_signature(written.fields[field_name]) != field_signature(generated.fields[field_name])):
+                differences.append("{}.{}: {} in models, {} in DDL".format(
+                    table_name, field_name, field_signature(written.fields[field_name]),
+                    field_signature(generated.fields[field_name])))
+        for name in ('VERSION_FIELD', 'FOREIGN_KEYS'):
+            if(getattr(written, name) != getattr(generated, name)):
+                differences.append("{}.{}: {!r} in models, {!r} in DDL".format(
+                    table_name, name, getattr(written, name), getattr(generated, name)))
+
+    return differences
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--sql', nargs='+', metavar='FILE', help='.sql files with CREATE TABLE statements')
+    source.add_argument('--catalog', action='store_true', help='read tables from catalog views of SQL DB')
+    parser.add_argument('--table', action='append', default=[], help='table read from catalog, can be repeated')
+    parser.add_argument('--output', help='write generated module to file instead of cache')
+    parser.add_argument('--check', action='store_true', help='compare with hand-written classes, exit code 1 on drift')
+    parser.add_argument('--config', default=CONFIG_FILE, help='config file with connection settings')
+    args = parser.parse_args(argv)
+
+    if(args.catalog and len(args.table) == 0):
+        parser.error("--catalog requires --table")
+
+    connection_parameters = None
+    if(args.catalog):
+        connection_parameters = load_connection_parameters(args.config, write_default=False)
+
+    if(args.output):
+        if(args.sql):
+            tables = []
+            for file_path in args.sql:
+                with open(file_path, encoding="utf-8-sig") as f:
+                    tables.extend(parse_ddl(f.read()))
+            description = ", ".join(os.path.basename(file_path) for file_path in args.sql)
+        else:
+            tables = read_catalog(connection_parameters, args.table)
+            description = "catalog of {}".format(connection_parameters.get('database', 'SQL DB'))
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(generate_source(tables, description))
+        schema_classes = import_module(args.output, "generated_schema").SCHEMA_CLASSES
+    else:
+        schema_classes = load_schema_classes(args.sql, connection_parameters, args.table)
+
+    for table_name, schema_class in schema_classes.items():
+        print("{}: {} fields, PK {}".format(table_name, len(schema_class.fields), schema_class.PK_NAME), file=sys.stderr)
+
+    if(args.check):
+        differences = check(schema_classes)
+        for difference in differences:
+            print(difference)
+        return 1 if differences else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+"""Loading of connection settings from config.ini, shared by GUI and command line tools"""
+
+import configparser
+from os import path
+
+
+CONFIG_FILE = "config.ini"
+
+DEFAULT_SETTINGS = {
+    'dbhost': 'localhost',
+    'dbname': 'OdooExchangeSync',
+    'dbuser': 'SA',
+    'dbpass': '<YourStrong@Passw0rd>'
+}
+
+
+def load_connection_parameters(config_file=CONFIG_FILE, write_default=True):
+    """reads pymssql connection parameters from config file
+
+    Args:
+        config_file (string, optional): path to config file. Defaults to CONFIG_FILE.
+        write_default (bool, optional): if True, config file with default settings is written when it doesn't exist. Defaults to True.
+
+    Raises:
+        KeyError: raised if config file doesn't contain connection settings
+
+    Returns:
+        kwargs dict: pymssql connection parameters
+    """
+    config = configparser.ConfigParser()
+
+    if(path.isfile(config_file)):
+        config.read(config_file)
+
+    else:
+        config['CONNECTION_SETTINGS'] = DEFAULT_SETTINGS
+        if(write_default):
+            with open(config_file, "w") as f:
+                config.write(f)
+
+    settings = config['CONNECTION_SETTINGS']
+    return {
+        'server': settings['dbhost'],
+        'database': settings['dbname'],
+        'user': settings['dbuser'],
+        'password': settings['dbpass']
+    }
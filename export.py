@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+
+"""Streaming export of tables to CSV, JSON lines or Parquet file.
+
+Rows are fetched in chunks and written before next chunk is fetched, so memory use doesn't depend
+on size of table. Values are converted same as getFieldValuesSQL (bits are 1/0). In CSV, NULL is
+written as empty value. Parquet needs optional pyarrow package.
+
+Example:
+    python export.py TronPosOdooExchangeUp firms.csv --mask
+    python export.py TronPosWebClassifications classifications.parquet --where "tpfirm_id=5"
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from os import path
+
+from config import CONFIG_FILE, load_connection_parameters
+from models import (SCHEMA_CLASSES, MSBigInt, MSBit, MSDatetime, MSDecimal, MSFloat, MSInt, MSType, MSVarbinary,
+                    parse_filter_text)
+
+
+MASK = "********"
+
+
+def format_values(schema_class, rows):
+    """formats values of rows in place with MSType.toText (ex. datetime, decimal), used for text formats
+
+    Args:
+        schema_class (schema class): class of rows
+        rows (list[list]): SQL values of rows
+    """
+    # only fields whose type changes values are converted
+    converters = [(i, field_type.toText) for i, field_type in enumerate(schema_class.fields.values())
+                  if type(field_type).toText is not MSType.toText]
+    for row in rows:
+        for i, convert in converters:
+            if(row[i] is not None):
+                row[i] = convert(row[i])
+
+
+class CsvExportWriter:
+    """Writes rows to CSV file with header"""
+
+    def __init__(self, file_path, schema_class):
+        self.file = open(file_path, "w", newline="", encoding="utf-8")
+        self.schema_class = schema_class
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(schema_class.fields.keys())
+
+    def write(self, rows):
+        # csv module writes None as empty value
+        format_values(self.schema_class, rows)
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class JsonLinesExportWriter:
+    """Writes each row as JSON object on its own line"""
+
+    def __init__(self, file_path, schema_class):
+        self.file = open(file_path, "w", encoding="utf-8")
+        self.schema_class = schema_class
+        self.field_names = list(schema_class.fields.keys())
+        self.encoder = json.JSONEncoder(ensure_ascii=False)
+
+    def write(self, rows):
+        format_values(self.schema_class, rows)
+        self.file.writelines(self.encoder.encode(dict(zip(self.field_names, row))) + "\n" for row in rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetExportWriter:
+    """Writes rows to Parquet file, each chunk is one row group"""
+
+    def __init__(self, file_path, schema_class):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow package")
+
+        self.pyarrow = pyarrow
+        types = []
+        # values of string columns are converted with MSType.toText (ex. UNIQUEIDENTIFIER)
+        self.converters = []
+        for i, field_type in enumerate(schema_class.fields.values()):
+            if(isinstance(field_type, MSBigInt)):
+                types.append(pyarrow.int64())
+            elif(isinstance(field_type, MSInt)):
+                types.append(pyarrow.int32())
+            elif(isinstance(field_type, MSBit)):
+                types.append(pyarrow.int8())
+            elif(isinstance(field_type, MSDatetime)):
+                types.append(pyarrow.timestamp("ms"))
+            elif(isinstance(field_type, MSDecimal)):
+                types.append(pyarrow.decimal128(field_type.precision, field_type.scale))
+            elif(isinstance(field_type, MSFloat)):
+                types.append(pyarrow.float64())
+            elif(isinstance(field_type, MSVarbinary)):
+                types.append(pyarrow.binary())
+            else:
+                types.append(pyarrow.string())
+                if(type(field_type).toText is not MSType.toText):
+                    self.converters.append((i, field_type.toText))
+
+        self.schema = pyarrow.schema(list(zip(schema_class.fields.keys(), types)))
+        self.writer = pyarrow.parquet.ParquetWriter(file_path, self.schema)
+
+    def write(self, rows):
+        for row in rows:
+            for i, convert in self.converters:
+                if(row[i] is not None):
+                    row[i] = convert(row[i])
+        columns = list(zip(*rows))
+        self.writer.write_table(self.pyarrow.Table.from_arrays(
+            [self.pyarrow.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+EXPORT_FORMATS = {
+    'csv': CsvExportWriter,
+    'jsonl': JsonLinesExportWriter,
+    'parquet': ParquetExportWriter
+}
+
+
+def format_of(file_path):
+    """returns export format from file extension
+
+    Args:
+        file_path (string): path to file
+
+    Raises:
+        ValueError: raised if extension is not known
+
+    Returns:
+        string: key of EXPORT_FORMATS
+    """
+    extension = path.splitext(file_path)[1].lstrip(".").lower()
+    if(extension == "json"):
+        extension = "jsonl"
+    if(extension not in EXPORT_FORMATS):
+        raise ValueError("Unknown export format: {}".format(extension))
+    return extension
+
+
+def export_table(schema_class, connection_parameters, file_path, file_format=None, mask=False,
+                 conditions=(), chunk_size=10000, on_progress=None):
+    """exports table to file, rows are streamed from SQL DB in chunks
+
+    Args:
+        schema_class (schema class): exported table
+        connection_parameters (kwargs dict): pymssql connection parameters
+        file_path (string): path of output file, it's overwritten
+        file_format (string, optional): key of EXPORT_FORMATS. Defaults to None, format is taken from extension.
+        mask (bool, optional): if True, values of SECRET_FIELDS are replaced with MASK. Defaults to False.
+        conditions (list, optional): filter conditions, see compile_filter. Defaults to (), all rows.
+        chunk_size (int, optional): number of rows fetched and written at once. Defaults to 10000.
+        on_progress (function, optional): called with number of exported rows after each chunk. Defaults to None.
+
+    Returns:
+        int: number of exported rows
+    """
+    if(file_format is None):
+        file_format = format_of(file_path)
+
+    field_names = list(schema_class.fields.keys())
+    masked = [field_names.index(name) for name in schema_class.SECRET_FIELDS] if mask else []
+
+    count = 0
+    writer = EXPORT_FORMATS[file_format](file_path, schema_class)
+    try:
+        for rows in schema_class.IterValues(connection_parameters, conditions, chunk_size):
+            for row in rows:
+                for i in masked:
+                    if(row[i] is not None):
+                        row[i] = MASK
+            writer.write(rows)
+            count += len(rows)
+            if(on_progress is not None):
+                on_progress(count)
+    finally:
+        writer.close()
+
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('table', choices=list(SCHEMA_CLASSES.keys()), help='exported table')
+    parser.add_argument('output', help='output file, format is taken from extension (.csv, .jsonl, .parquet)')
+    parser.add_argument('--format', choices=list(EXPORT_FORMATS.keys()), help='output format')
+    parser.add_argument('--mask', action='store_true', help='mask passwords')
+    parser.add_argument('--where', default='', help='filter, ex. "tpfirmActive=1 OdooHost:odoo.example.com"')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='rows fetched at once')
+    parser.add_argument('--config', default=CONFIG_FILE, help='config file with connection settings')
+    args = parser.parse_args(argv)
+
+    schema_class = SCHEMA_CLASSES[args.table]
+    start = time.perf_counter()
+    count = export_table(schema_class, load_connection_parameters(args.config, write_default=False), args.output,
+                         args.format, args.mask, parse_filter_text(schema_class, args.where), args.chunk_size)
+    print("Exported {} rows in {:.1f} s".format(count, time.perf_counter() - start), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
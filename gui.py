@@ -1,18 +1,45 @@
 #!/usr/bin/env python3
 
+import time
+# taken before other imports, so startup times (see MainWindow) include import of modules below
+STARTUP_TIME = time.perf_counter()
+
 import inspect
-from models import TronPosWebClassifications, TronPosOdooExchangeUp, MSDatetime, MSInt, MSBigInt, MSBit
-from tkcalendar import Calendar, DateEntry
+from models import TronPosWebClassifications, TronPosOdooExchangeUp, MSDatetime, MSInt, MSBigInt, MSBit, MSVarchar, ConcurrencyConflict, ObjectPageSource, RowStore, SearchIndex, ChangeTracker, MAX_PARAMETERS, parse_filter_text, connect
 import copy
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
+from tkinter import filedialog
 
-from os import path
+import os
 import sys
+import argparse
 import pymssql
-import configparser
 import traceback
+import threading
+import queue
+import itertools
+
+from config import load_connection_parameters
+# export, probe, sync, snapshot and UIProfiler are imported where they are used, so they don't delay first frame
+from profiler import PROFILE_ENV, profiled
+
+
+_date_entry_class = None
+
+
+def date_entry_class():
+    """imports tkcalendar only when first dialog with date field is shown, import is slow
+
+    Returns:
+        class: tkcalendar.DateEntry
+    """
+    global _date_entry_class
+    if(_date_entry_class is None):
+        from tkcalendar import DateEntry
+        _date_entry_class = DateEntry
+    return _date_entry_class
 
 
 def db_error_handler(func):
@@ -48,7 +75,17 @@ def db_error_handler(func):
 
 
 class ObjectTreeView(ttk.Treeview):
-    """ Wrapped class for tkk.Treeview for schema classes"""
+    """ Wrapped class for tkk.Treeview for schema classes
+
+    In virtual mode (see setPageSource) only window of VIRTUAL_WINDOW objects around visible part is
+    inserted in treeview, other objects are fetched from page source when scrolling. Pages which are not
+    cached are fetched in background, window shows placeholder items until they arrive.
+    """
+
+    VIRTUAL_WINDOW = 300
+    VIRTUAL_BUFFER = 100
+    PLACEHOLDER_PREFIX = "~"
+    PLACEHOLDER_TEXT = "..."
 
     def __init__(self, schemaobject, *args, **kwargs):
         """constuctor
@@ -71,37 +108,165 @@ class ObjectTreeView(ttk.Treeview):
                          command=lambda _col=name: self.sortoncolumn(_col, False))
             self.column(name, stretch=tk.NO)
 
+        self.store = RowStore(schemaobject)
+        self.iids = {}
+        self.keys = {}
+        self.filter_keys = None
+        self.filter_search = None
+        self.scrollbar = None
+        self.page_source = None
+        self.page_worker = None
+        self.row_count = 0
+        self.first_row = 0
+        self.selected_keys = set()
+        self.rewindow_pending = False
+        self.iid_counter = itertools.count()
+
     def sortoncolumn(self, col, reverse):
-        """function for sorting items when clicking on column
+        """function for sorting items when clicking on column. Items are sorted by typed values in row store,
+        in virtual mode ordering is done in SQL DB.
 
         Args:
             col (Treeview iid): string
             reverse (bool): if True, sort in reversed order, else sort in normal order
         """
-        if(col == "#0"):
-            l = [((int(k), k), k) for k in self.get_children('')]
-        else:
-            l = [(self.set(k, col), k) for k in self.get_children('')]
+        field_name = self.store.field_names[0] if col == "#0" else col
 
-        l.sort(reverse=reverse)
-
-        for index, (_val, k) in enumerate(l):
-            self.move(k, '', index)
+        if(self.page_source is not None):
+            self.page_source.setOrder(field_name, reverse)
+            self.showWindow(0)
+            super().yview('moveto', 0)
+        else:
+            self.store.sortedKeys(field_name, reverse)
+            self.showKeys()
 
         self.heading(
             col, command=lambda _col=col: self.sortoncolumn(_col, not reverse))
 
+    def showKeys(self):
+        """reorders treeview items in single call, by display order of row store.
+        Items not matching filter are detached.
+        """
+        keys = self.store.orderedKeys()
+        if(self.filter_keys is not None):
+            keys = [key for key in keys if key in self.filter_keys]
+        self.set_children('', *[self.iidOf(key) for key in keys])
+
+    def setFilter(self, keys, search=None):
+        """shows only items with given keys, other items are detached from treeview and selection
+
+        Args:
+            keys (set[string]): keys of shown items, None shows all items
+            search (function, optional): returns keys of shown items, called again after objects are inserted or refreshed. Defaults to None.
+        """
+        self.filter_keys = keys
+        self.filter_search = search if keys is not None else None
+        self.showKeys()
+        if(keys is not None):
+            hidden = [item for item in self.selection() if self.keyOf(item) not in keys]
+            if(len(hidden) > 0):
+                self.selection_remove(*hidden)
+
+    def iidOf(self, key):
+        """returns treeview iid of object. Iid is PK of object, unless PK was changed after insert.
+
+        Args:
+            key (string or value): PK of object
+
+        Returns:
+            string: treeview iid
+        """
+        return self.iids.get(str(key), str(key))
+
+    def keyOf(self, iid):
+        """returns PK of object as string (key in row store) from treeview iid
+
+        Args:
+            iid (string): treeview iid
+
+        Returns:
+            string: key of object
+        """
+        return self.keys.get(iid, iid)
+
+    def delete(self, *items):
+        """deletes items from treeview and row store
+
+        Args:
+            items (string): treeview iids
+        """
+        for item in items:
+            key = self.keys.pop(str(item), str(item))
+            self.iids.pop(key, None)
+            self.store.remove(key)
+        super().delete(*items)
+
+    @profiled
+    def deleteKeys(self, *keys):
+        """deletes items of objects with given PKs, if they are in treeview
+
+        Args:
+            keys (string or value): PKs of objects
+        """
+        items = [self.iidOf(key) for key in keys if self.exists(self.iidOf(key))]
+        if(len(items) > 0):
+            self.delete(*items)
+
     def insertObject(self, schema_object, index='end'):
-        """inserts object into treeview
+        """inserts object into treeview. In virtual mode, visible window is reloaded instead.
 
         Args:
             schema_object (schema object): schema object to insert
             index (str, optional): treeview index. Defaults to 'end'.
         """
+        if(self.page_source is not None):
+            self.objectsChanged()
+            return
+
+        self.insertItem(schema_object, index)
+        self.refilter()
+
+    def refilter(self):
+        """applies filter again after objects were inserted or refreshed, so changed objects are shown or hidden"""
+        if(self.filter_search is not None):
+            self.setFilter(self.filter_search(), self.filter_search)
+
+    def insertObjects(self, objects, on_progress=None, on_done=None, rows=False):
+        """inserts many objects without blocking UI, see BulkInsert
+
+        Args:
+            objects (iterable): schema objects, iterated in background thread
+            on_progress (function, optional): called with number of inserted objects after each time slice. Defaults to None.
+            on_done (function, optional): called at the end with number of inserted objects and exception raised while iterating or None. Defaults to None.
+            rows (bool, optional): if True, objects are lists of SQL values instead of schema objects. Defaults to False.
+
+        Returns:
+            BulkInsert: running insert, can be cancelled
+        """
+        return BulkInsert(self, objects, on_progress, on_done, rows)
+
+    def insertItem(self, schema_object, index='end', obj_values=None):
+        """inserts treeview item for object
+
+        Args:
+            schema_object (schema object): schema object to insert, can be None if obj_values are given
+            index (str, optional): treeview index. Defaults to 'end'.
+            obj_values (list, optional): already computed getFieldValuesSQL of object. Defaults to None.
+        """
+        if(obj_values is None):
+            obj_values = schema_object.getFieldValuesSQL()
+
+        key = str(obj_values[0])
+        iid = key
+        if(iid in self.keys):
+            # iid is still used by object whose PK was changed
+            iid = "{}#{}".format(key, next(self.iid_counter))
+            self.iids[key] = iid
+            self.keys[iid] = key
 
-        obj_values = schema_object.getFieldValuesSQL()
         self.insert(
-            '', index, iid=obj_values[0], text=obj_values[0], values=obj_values[1:])
+            '', index, iid=iid, text=obj_values[0], values=obj_values[1:])
+        self.store.put(key, obj_values)
 
     def refreshObject(self, schema_object, last_id=None):
         """refreshes object in treeview
@@ -110,15 +275,329 @@ class ObjectTreeView(ttk.Treeview):
             schema_object (schema object): schema object to refresh
             last_id (treeview iid, optional): iid of object. Defaults to None. If none, then value is taken from object clone
         """
-        if(last_id is None):
-            last_id = schema_object.clone.getFieldValuesSQL()[0]
+        self.refreshObjects([(schema_object, last_id)])
+
+    @profiled
+    def refreshObjects(self, objects):
+        """refreshes objects in treeview. Only changed cells are updated, so items keep their position,
+        selection and focus. If PK was changed, item keeps its iid and is remapped to new PK.
+        Objects not in treeview are inserted at the end.
+
+        Args:
+            objects (list[tuple(schema object, value)]): objects and their PKs before change. If PK is None, it's taken from object clone
+        """
+        if(self.page_source is not None):
+            self.page_source.invalidate()
+
+        columns = self['columns']
+        for schema_object, last_id in objects:
+            if(last_id is None):
+                last_id = schema_object.clone.getFieldValuesSQL()[0]
+
+            old_key = str(last_id)
+            iid = self.iidOf(old_key)
+            obj_values = schema_object.getFieldValuesSQL()
+            new_key = str(obj_values[0])
+
+            if(not self.exists(iid) or old_key not in self.store):
+                self.insertItem(schema_object, obj_values=obj_values)
+                continue
+
+            old_values = self.store.get(old_key)
+
+            if(new_key != old_key):
+                self.store.rename(old_key, new_key)
+                self.iids.pop(old_key, None)
+                if(new_key == iid):
+                    self.keys.pop(iid, None)
+                else:
+                    self.iids[new_key] = iid
+                    self.keys[iid] = new_key
+                self.item(iid, text=obj_values[0])
+
+            changed = [i for i in range(1, len(obj_values)) if obj_values[i] != old_values[i]]
+            if(len(changed) > len(columns) // 2):
+                self.item(iid, values=obj_values[1:])
+            else:
+                for i in changed:
+                    self.set(iid, columns[i - 1], obj_values[i])
+
+            self.store.put(new_key, obj_values)
+
+        self.refilter()
+
+    def objectsChanged(self):
+        """called after objects were inserted or deleted in SQL DB. In virtual mode, visible window is reloaded."""
+        if(self.page_source is None):
+            return
+
+        top = self.first_row + int(self.yview()[0] * len(self.get_children('')))
+        self.loadWindow(top - self.VIRTUAL_BUFFER, invalidate=True)
+
+    def setPageSource(self, page_source):
+        """switches treeview to virtual mode, objects are fetched from page source while scrolling.
+        Also used for replacing page source, ex. with filtered one.
+
+        Args:
+            page_source (ObjectPageSource): source of objects
+        """
+        if(self.page_source is None):
+            self.bind('<<TreeviewSelect>>', self.trackSelection, add='+')
+            self.page_worker = QueryWorker(self)
+            self.bind('<Destroy>', lambda event: self.page_worker.close() if event.widget is self else None, add='+')
+        elif(self.page_source is not page_source):
+            self.page_source.close()
+        self.page_source = page_source
+        self.row_count = page_source.total or 0
+        self.showWindow(0)
+        super().yview('moveto', 0)
+
+    def trackSelection(self, event):
+        """keeps keys of selected objects, also of objects outside of visible window
+
+        Args:
+            event (tk event): selection event, not used here
+        """
+        placeholders = [iid for iid in self.selection() if iid.startswith(self.PLACEHOLDER_PREFIX)]
+        if(len(placeholders) > 0):
+            self.selection_remove(*placeholders)
+            return
+        shown = set(self.get_children(''))
+        self.selected_keys = (self.selected_keys - shown) | set(self.selection())
+
+    def showWindow(self, first_row):
+        """replaces treeview items with window of objects from page source. If window isn't cached,
+        placeholders are shown and window is fetched in background.
+
+        Args:
+            first_row (int): position of first object in window
+        """
+        first_row = max(0, min(first_row, self.row_count - self.VIRTUAL_WINDOW))
+        objects = self.page_source.cachedRows(first_row, first_row + self.VIRTUAL_WINDOW)
+        self.fillWindow(first_row, objects)
+        if(objects is None or self.page_source.total is None):
+            self.loadWindow(first_row)
+
+    def fillWindow(self, first_row, objects):
+        """replaces treeview items with objects, or with placeholders
+
+        Args:
+            first_row (int): position of first object
+            objects (list): objects, None for placeholders
+        """
+        self.first_row = first_row
+        self.delete(*self.get_children(''))
+        if(objects is None):
+            for row in range(first_row, min(first_row + self.VIRTUAL_WINDOW, self.row_count)):
+                self.insert('', 'end', iid="{}{}".format(self.PLACEHOLDER_PREFIX, row), text=self.PLACEHOLDER_TEXT)
+            return
+
+        for obj in objects:
+            self.insertItem(obj)
+
+        selected = [iid for iid in self.get_children('') if iid in self.selected_keys]
+        if(len(selected) > 0):
+            self.selection_set(selected)
+
+    def loadWindow(self, first_row, invalidate=False):
+        """fetches count and window of objects in background, see windowLoaded
+
+        Args:
+            first_row (int): position of first object in window
+            invalidate (bool, optional): if True, cached pages are dropped first. Defaults to False.
+        """
+        page_source = self.page_source
+        self.page_worker.submit(
+            lambda superseded: self.fetchWindow(page_source, first_row, invalidate, superseded), self.windowLoaded)
+
+    def fetchWindow(self, page_source, first_row, invalidate, superseded):
+        """runs in background, fetches count, window of objects and page after window (prefetch)
+
+        Returns:
+            tuple(ObjectPageSource, int, int, list): page source, number of objects, position of first object
+                and objects, None if query was superseded
+        """
+        if(invalidate):
+            page_source.invalidate()
+        total = page_source.count()
+        first_row = max(0, min(first_row, total - self.VIRTUAL_WINDOW))
+        objects = page_source.getRows(first_row, first_row + self.VIRTUAL_WINDOW)
+        if(superseded()):
+            return None
+        page_source.getRows(first_row + self.VIRTUAL_WINDOW, first_row + self.VIRTUAL_WINDOW + page_source.page_size)
+        return (page_source, total, first_row, objects)
+
+    def windowLoaded(self, result):
+        """shows fetched window, called on main thread. Visible position is kept.
+
+        Args:
+            result (tuple or Exception): result of fetchWindow
+        """
+        if(isinstance(result, Exception)):
+            print("Loading rows failed: {}".format(result))
+            return
+        if(result is None or result[0] is not self.page_source or not self.winfo_exists()):
+            return
+
+        page_source, total, first_row, objects = result
+        shown = len(self.get_children(''))
+        top = self.first_row + (self.yview()[0] * shown if shown > 0 else 0)
+        self.row_count = total
+        self.fillWindow(first_row, objects)
+        super().yview('moveto', (top - first_row) / max(len(objects), 1))
+
+    def scrollToRow(self, row):
+        """scrolls to object at position row, window is moved if row is near its edge
+
+        Args:
+            row (int): position of object
+        """
+        shown = len(self.get_children(''))
+        total = self.row_count
+        if(row < self.first_row or (row - self.first_row < self.VIRTUAL_BUFFER / 2 and self.first_row > 0) or
+                (self.first_row + shown - row < self.VIRTUAL_BUFFER and self.first_row + shown < total)):
+            self.showWindow(row - self.VIRTUAL_BUFFER)
+            shown = len(self.get_children(''))
+
+        super().yview('moveto', (row - self.first_row) / max(shown, 1))
+
+    def rewindow(self, row):
+        self.rewindow_pending = False
+        self.scrollToRow(row)
+
+    def yview(self, *args):
+        """yview of treeview. In virtual mode, 'moveto' fraction is relative to all objects in page source"""
+        if(self.page_source is None or len(args) == 0 or args[0] != 'moveto'):
+            return super().yview(*args)
+
+        self.scrollToRow(int(float(args[1]) * self.row_count))
+
+    def onYScroll(self, first, last):
+        """yscrollcommand of treeview, updates scrollbar. In virtual mode, position is converted to position in all objects
+        and window is moved when it's scrolled near its edge.
+
+        Args:
+            first (string): fraction of first visible item
+            last (string): fraction of last visible item
+        """
+        if(self.scrollbar is None):
+            return
+
+        if(self.page_source is None):
+            self.scrollbar.set(first, last)
+            return
+
+        shown = len(self.get_children(''))
+        total = self.row_count
+        if(shown == 0 or total == 0):
+            self.scrollbar.set(0, 1)
+            return
+
+        top = self.first_row + float(first) * shown
+        bottom = self.first_row + float(last) * shown
+        self.scrollbar.set(top / total, bottom / total)
+
+        if((top - self.first_row < self.VIRTUAL_BUFFER / 2 and self.first_row > 0) or
+                (self.first_row + shown - bottom < self.VIRTUAL_BUFFER / 2 and self.first_row + shown < total)):
+            if(not self.rewindow_pending):
+                self.rewindow_pending = True
+                self.after_idle(self.rewindow, int(top))
+
+
+class BulkInsert:
+    """Inserts objects into ObjectTreeView without blocking UI. Objects are taken from iterable in background
+    thread, so iterable can be generator that fetches them from DB. Batches of objects are passed through
+    bounded queue and inserted on main thread in time limited slices, between slices Tk handles events.
+    """
+
+    BATCH_SIZE = 200
+    QUEUE_BATCHES = 20
+    FRAME_BUDGET = 0.03
+    POLL_INTERVAL = 15
+
+    def __init__(self, treeview, objects, on_progress=None, on_done=None, rows=False):
+        """Constructor, starts inserting
+
+        Args:
+            treeview (ObjectTreeView): target treeview
+            objects (iterable): schema objects
+            on_progress (function, optional): called with number of inserted objects after each time slice. Defaults to None.
+            on_done (function, optional): called at the end with number of inserted objects and exception raised while iterating or None. Defaults to None.
+            rows (bool, optional): if True, objects are lists of SQL values instead of schema objects. Defaults to False.
+        """
+        self.treeview = treeview
+        self.rows = rows
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.batches = queue.Queue(self.QUEUE_BATCHES)
+        self.count = 0
+        self.cancelled = False
+
+        threading.Thread(target=self.produce, args=(objects,), daemon=True).start()
+        self.treeview.after(self.POLL_INTERVAL, self.consume)
+
+    def cancel(self):
+        """stops inserting, on_done is not called"""
+        self.cancelled = True
+
+    def put(self, item):
+        while(not self.cancelled):
+            try:
+                self.batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def produce(self, objects):
+        """runs in background thread, iterates objects and prepares their values.
+        Generator is closed at the end, also when insert is cancelled, so its connection is closed."""
+        batch = []
+        try:
+            for obj in objects:
+                if(self.cancelled):
+                    return
+                if(self.rows):
+                    batch.append((None, obj))
+                else:
+                    batch.append((obj, obj.getFieldValuesSQL()))
+                if(len(batch) >= self.BATCH_SIZE):
+                    self.put(batch)
+                    batch = []
+            self.put(batch)
+            self.put(None)
+        except Exception as e:
+            self.put(e)
+        finally:
+            if(hasattr(objects, 'close')):
+                objects.close()
+
+    def consume(self):
+        """runs on main thread, inserts batches until time slice is used"""
+        if(self.cancelled):
+            return
+        if(not self.treeview.winfo_exists()):
+            self.cancel()
+            return
+
+        deadline = time.perf_counter() + self.FRAME_BUDGET
+        while(time.perf_counter() < deadline):
+            try:
+                batch = self.batches.get_nowait()
+            except queue.Empty:
+                break
 
-        current_index = 'end'
-        if(self.exists(last_id)):
-            current_index = self.index(last_id)
-            self.delete(last_id)
+            if(batch is None or isinstance(batch, Exception)):
+                if(self.on_done is not None):
+                    self.on_done(self.count, batch)
+                return
 
-        self.insertObject(schema_object, current_index)
+            for obj, obj_values in batch:
+                self.treeview.insertItem(obj, obj_values=obj_values)
+            self.count += len(batch)
+
+        if(self.on_progress is not None):
+            self.on_progress(self.count)
+        self.treeview.after(self.POLL_INTERVAL, self.consume)
 
 
 class TreeFrame(tk.Frame):
@@ -139,8 +618,9 @@ class TreeFrame(tk.Frame):
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(0, weight=1)
 
+        self.treeview.scrollbar = scrollbar_vertical
         self.treeview.configure(
-            yscrollcommand=scrollbar_vertical.set, xscrollcommand=scrollbar_horizontal.set)
+            yscrollcommand=self.treeview.onYScroll, xscrollcommand=scrollbar_horizontal.set)
 
         scrollbar_vertical.grid(column=1, row=0, sticky="nsw")
         scrollbar_horizontal.grid(column=0, row=1, sticky="sew")
@@ -148,8 +628,314 @@ class TreeFrame(tk.Frame):
         self.pack(fill=tk.BOTH, expand=1)
 
 
+class QueryWorker:
+    """Runs queries in background thread, one at a time. Only latest submitted query is run,
+    queries superseded before start are skipped and results of superseded queries are dropped.
+    """
+
+    POLL_INTERVAL = 30
+
+    def __init__(self, widget):
+        """Constructor
+
+        Args:
+            widget (tk widget): widget used for polling results on main thread
+        """
+        self.widget = widget
+        self.generation = 0
+        self.delivered = 0
+        self.pending = None
+        self.polling = False
+        self.closed = False
+        self.condition = threading.Condition()
+        self.results = queue.Queue()
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def submit(self, func, callback):
+        """submits query, previous queries are superseded
+
+        Args:
+            func (function): runs in background, gets function that returns True when query is superseded
+            callback (function): called on main thread with result of func, or with raised exception
+        """
+        with self.condition:
+            self.generation += 1
+            self.pending = (self.generation, func, callback)
+            self.condition.notify()
+
+        if(not self.polling):
+            self.polling = True
+            self.widget.after(self.POLL_INTERVAL, self.poll)
+
+    def close(self):
+        """stops background thread, pending query is not run and running query is not delivered"""
+        with self.condition:
+            self.generation += 1
+            self.pending = False
+            self.condition.notify()
+        self.closed = True
+        self.delivered = self.generation
+
+    def run(self):
+        while(True):
+            with self.condition:
+                while(self.pending is None):
+                    self.condition.wait()
+                if(self.pending is False):
+                    return
+                generation, func, callback = self.pending
+                self.pending = None
+
+            try:
+                result = func(lambda: generation != self.generation)
+            except Exception as e:
+                result = e
+            self.results.put((generation, callback, result))
+
+    def poll(self):
+        """delivers result of latest query on main thread"""
+        if(self.closed):
+            self.polling = False
+            return
+
+        try:
+            while(True):
+                try:
+                    generation, callback, result = self.results.get_nowait()
+                except queue.Empty:
+                    break
+                self.delivered = generation
+                if(generation == self.generation):
+                    callback(result)
+        finally:
+            # also when callback raised, so later queries are still delivered
+            if(self.delivered == self.generation):
+                self.polling = False
+            else:
+                self.widget.after(self.POLL_INTERVAL, self.poll)
+
+
+class AutoRefresh:
+    """Keeps ObjectView up to date with changes of other users. ChangeTracker is polled in background
+    and only changed items are patched. Interval is shortened while objects are changing and
+    lengthened while they are not, so idle views don't load SQL DB.
+    """
+
+    MIN_INTERVAL = 2000
+    MAX_INTERVAL = 60000
+    FAILED_STATUS = 'Osveževanje ni uspelo'
+
+    def __init__(self, view, tracker):
+        """Constructor, starts polling. If baseline of tracker was restored (see ChangeTracker.restore),
+        first poll is done immediately, so view is reconciled with SQL DB.
+
+        Args:
+            view (ObjectView): refreshed view
+            tracker (ChangeTracker): tracker with baseline of objects shown in view
+        """
+        self.view = view
+        self.tracker = tracker
+        self.interval = self.MIN_INTERVAL
+        self.versions = tracker.versions
+        self.worker = QueryWorker(view)
+        self.after_id = self.view.after(0 if tracker.state is None else self.interval, self.tick)
+
+    def stop(self):
+        """stops polling"""
+        if(self.after_id is not None):
+            self.view.after_cancel(self.after_id)
+            self.after_id = None
+        self.worker.close()
+
+    def tick(self):
+        self.after_id = None
+        if(not self.view.winfo_exists()):
+            self.worker.close()
+            return
+
+        if(self.view.treeview.page_source is not None):
+            self.worker.submit(lambda superseded: self.tracker.hasChanged(), self.refreshed)
+        else:
+            self.worker.submit(lambda superseded: self.tracker.poll(), self.refreshed)
+
+    def refreshed(self, result):
+        """applies result of poll on main thread and schedules next poll
+
+        Args:
+            result (tuple, bool or Exception): result of ChangeTracker.poll or ChangeTracker.hasChanged
+        """
+        if(not self.view.winfo_exists()):
+            self.worker.close()
+            return
+
+        if(isinstance(result, Exception)):
+            print("Auto refresh failed: {}".format(result))
+            self.view.setStatus(self.FAILED_STATUS)
+            self.interval = self.MAX_INTERVAL
+            self.after_id = self.view.after(self.interval, self.tick)
+            return
+
+        # versions of objects shown in view, tracker is ahead of view while poll is running
+        self.versions = self.tracker.versions
+        if(self.view.status_label.cget('text') == self.FAILED_STATUS):
+            self.view.setStatus('')
+        if(self.view.apply_changes(result)):
+            self.interval = max(self.MIN_INTERVAL, self.interval // 2)
+        else:
+            self.interval = min(self.MAX_INTERVAL, self.interval * 3 // 2)
+
+        self.after_id = self.view.after(self.interval, self.tick)
+
+
+class ProbeWindow(tk.Toplevel):
+    """Shows connectivity of firms to Odoo and retail databases, see probe.ConnectivityProbe.
+    Classifications of same firms can be synced to Odoo from here, see sync.SyncEngine.
+    Probe and sync run in background thread and each result is shown as soon as it arrives.
+    Probe and sync modules are imported when window is opened.
+    """
+
+    POLL_INTERVAL = 50
+    PENDING = '...'
+
+    def __init__(self, connection_parameters, pks, *args, **kwargs):
+        """Constructor, starts probe
+
+        Args:
+            connection_parameters (kwargs dict): pymssql connection parameters
+            pks (list): probed firm IDs, if empty all active firms are probed
+        """
+        from probe import ODOO, RETAIL
+
+        super().__init__(*args, **kwargs)
+        self.title('Povezljivost')
+
+        self.tree = ttk.Treeview(self, columns=('firm', ODOO, RETAIL, 'sync'), show='headings')
+        for column, text, width in (('firm', 'Firma', 200), (ODOO, 'Odoo', 250), (RETAIL, 'Retail baza', 250),
+                                    ('sync', 'Sinhronizacija', 250)):
+            self.tree.heading(column, text=text)
+            self.tree.column(column, width=width)
+        self.tree.tag_configure('failed', foreground='red')
+        self.tree.pack(expand=1, fill=tk.BOTH)
+
+        self.syncbutton = tk.Button(self, text='Sinhroniziraj', state=tk.DISABLED, command=self.sync)
+        self.syncbutton.pack(side=tk.RIGHT, padx=5, pady=5)
+        self.status_label = tk.Label(self, text='Nalaganje...', anchor=tk.W)
+        self.status_label.pack(fill=tk.X, side=tk.LEFT)
+
+        self.results = queue.Queue()
+        self.closed = False
+        self.failed = set()
+        self.done = 0
+        self.start = time.perf_counter()
+        self.connection_parameters = connection_parameters
+        self.pks = pks or None
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        threading.Thread(target=self.run, args=(connection_parameters, self.pks), daemon=True).start()
+        self.after(self.POLL_INTERVAL, self.poll)
+
+    def run(self, connection_parameters, pks):
+        from probe import ConnectivityProbe, load_targets
+
+        try:
+            targets = load_targets(connection_parameters, pks)
+            self.results.put(targets)
+            ConnectivityProbe(connection_parameters).run(targets, self.results.put, lambda: self.closed)
+        except Exception as e:
+            self.results.put(e)
+        self.results.put(None)
+
+    def sync(self):
+        """syncs classifications of shown firms in background thread"""
+        self.syncbutton.configure(state=tk.DISABLED)
+        self.status_label.configure(text='Sinhronizacija...')
+        self.start = time.perf_counter()
+        for iid in self.tree.get_children():
+            self.tree.set(iid, 'sync', '')
+        threading.Thread(target=self.run_sync, daemon=True).start()
+        self.after(self.POLL_INTERVAL, self.poll)
+
+    def run_sync(self):
+        from sync import Checkpoint, SyncEngine
+
+        checkpoint = None
+        try:
+            checkpoint = Checkpoint()
+            results = SyncEngine(self.connection_parameters, checkpoint).run(
+                self.pks, self.results.put, lambda: self.closed)
+            self.results.put({'results': results})
+        except Exception as e:
+            self.results.put(e)
+            self.results.put({'results': []})
+        finally:
+            if(checkpoint is not None):
+                checkpoint.close()
+
+    def close(self):
+        self.closed = True
+        self.destroy()
+
+    def poll(self):
+        """shows received results on main thread, polling stops after last result of probe or sync"""
+        from sync import SyncResult
+
+        if(self.closed):
+            return
+
+        finished = False
+        while(not finished):
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            if(result is None):
+                self.status_label.configure(text='Preverjenih {} firm v {:.1f} s, neuspešnih {}'.format(
+                    len(self.tree.get_children()), time.perf_counter() - self.start, len(self.failed)))
+                self.syncbutton.configure(state=tk.NORMAL)
+                finished = True
+            elif(isinstance(result, dict)):
+                results = result['results']
+                self.status_label.configure(text='Sinhroniziranih {} firm v {:.1f} s, poslanih {} klasifikacij, neuspešnih {}'.format(
+                    len(results), time.perf_counter() - self.start, sum(item.sent for item in results),
+                    sum(not item.ok for item in results)))
+                self.syncbutton.configure(state=tk.NORMAL)
+                finished = True
+            elif(isinstance(result, Exception)):
+                print("Probe failed: {}".format(result))
+                messagebox.showerror("Napaka", "Neuspešno spajanje na bazo", parent=self)
+            elif(isinstance(result, SyncResult)):
+                if(self.tree.exists(result.firm_id)):
+                    if(result.ok):
+                        text = 'Poslanih {}, nespremenjenih {}'.format(result.sent, result.unchanged)
+                    else:
+                        text = result.detail
+                        self.tree.item(result.firm_id, tags=('failed',))
+                    self.tree.set(result.firm_id, 'sync', text)
+            elif(isinstance(result, list)):
+                for target in result:
+                    self.tree.insert('', tk.END, iid=target.firm_id,
+                                     values=(target.name, self.PENDING, self.PENDING))
+            else:
+                self.tree.set(result.firm_id, result.kind, result.detail)
+                if(not result.ok):
+                    self.failed.add(result.firm_id)
+                    self.tree.item(result.firm_id, tags=('failed',))
+                self.done += 1
+                self.status_label.configure(text='Preverjanje... {}/{}'.format(
+                    self.done, 2 * len(self.tree.get_children())))
+
+        if(not finished):
+            self.after(self.POLL_INTERVAL, self.poll)
+
+
 class ObjectView(tk.Frame):
     """main class for viewing object, with basic functionality"""
+
+    ALL_FIELDS = 'Vsa polja'
+    FILTER_DELAY = 150
+    SERVER_FILTER_DELAY = 400
+
     @db_error_handler
     def cb(self, originalobject, newobject, window):
         """callback function, which is to be called when object is ready to be inserted or modified
@@ -167,13 +953,55 @@ class ObjectView(tk.Frame):
 
         else:
             oldid = newobject.clone.getField('id')
-            final_value = newobject.updateObject(
-                self.root_object.CONNECTION_PARAMETERS)
+            try:
+                final_value = newobject.updateObject(
+                    self.root_object.CONNECTION_PARAMETERS, optimistic=True)
+            except ConcurrencyConflict as conflict:
+                self.conflict_handler(conflict, window)
+                return
             self.treeview.refreshObject(newobject, oldid)
 
         if(final_value > 0):
             window.destroy()
 
+    @db_error_handler
+    def batch_cb(self, pks, field_values, window):
+        """callback of batch dialog, applies values to all objects with single UPDATE and refreshes them in treeview
+
+        Args:
+            pks (list): PKs of changed objects
+            field_values (dict{string:value}): applied field names and SQL values
+            window (tk.Toplevel): dialog window, which is closed at the end
+        """
+        if(len(field_values) > 0):
+            self.schemaobject.UpdateObjectsByPK(
+                self.root_object.CONNECTION_PARAMETERS, pks, field_values)
+            objects = self.schemaobject.FetchObjectsByPK(
+                self.root_object.CONNECTION_PARAMETERS, pks)
+
+            # objects deleted by other users meanwhile
+            fetched = {obj.getPKfield().getValueSQL() for obj in objects}
+            self.treeview.deleteKeys(*[pk for pk in pks if pk not in fetched])
+            self.treeview.refreshObjects([(obj, obj.getPKfield().getValueSQL()) for obj in objects])
+
+        window.destroy()
+
+    def conflict_handler(self, conflict, window):
+        """shows warning when object was changed by another user and refreshes treeview with current objects
+
+        Args:
+            conflict (ConcurrencyConflict): raised conflict
+            window (tk.Toplevel): dialog window, which is closed at the end
+        """
+        self.treeview.deleteKeys(*[obj.clone.getPKfield().getValueSQL()
+                                   for obj, current in conflict.conflicts if current is None])
+        self.treeview.refreshObjects([(current, obj.clone.getPKfield().getValueSQL())
+                                      for obj, current in conflict.conflicts if current is not None])
+
+        messagebox.showwarning(
+            'Sprememba', 'Objekt je medtem spremenil ali izbrisal drug uporabnik. Prikazani so trenutni podatki.')
+        window.destroy()
+
     def __init__(self, schemaobject, *args, root_object, **kwargs):
         """constuctor
 
@@ -193,15 +1021,44 @@ class ObjectView(tk.Frame):
             self.button_toolbar, text='Spremeni', command=self.modify_button)
         self.deletebutton = tk.Button(
             self.button_toolbar, text='Briši', command=self.delete_button)
+        self.exportbutton = tk.Button(
+            self.button_toolbar, text='Izvozi', command=self.export_button)
 
         self.addbutton.pack(side=tk.LEFT, )
         self.modifybutton.pack(side=tk.LEFT, padx=5)
         self.deletebutton.pack(side=tk.LEFT, padx=5)
+        self.exportbutton.pack(side=tk.LEFT, padx=5)
+
+        self.status_label = tk.Label(self.button_toolbar)
+        self.status_label.pack(side=tk.RIGHT, padx=5)
 
         self.button_toolbar.pack(fill=tk.X, ipady=10)
 
+        self.search_index = None
+        self.query_worker = None
+        self.auto_refresh = None
+        self.filter_after_id = None
+        self.view_conditions = []
+        if(len(schemaobject.SEARCH_FIELDS) > 0):
+            self.filter_bar = tk.Frame(self)
+            self.filter_var = tk.StringVar()
+            self.filter_var.trace_add('write', lambda *_: self.schedule_filter())
+            self.filter_field = ttk.Combobox(self.filter_bar, state='readonly',
+                                             values=[self.ALL_FIELDS] + list(schemaobject.SEARCH_FIELDS))
+            self.filter_field.set(self.ALL_FIELDS)
+            self.filter_field.bind('<<ComboboxSelected>>', lambda e: self.schedule_filter())
+
+            tk.Label(self.filter_bar, text='Iskanje:').pack(side=tk.LEFT)
+            tk.Entry(self.filter_bar, textvariable=self.filter_var).pack(side=tk.LEFT, padx=5)
+            self.filter_field.pack(side=tk.LEFT, padx=5)
+            self.filter_bar.pack(fill=tk.X, pady=(0, 5))
+
         tree_frame = TreeFrame(schemaobject, self)
         self.treeview = tree_frame.treeview
+
+        if(len(schemaobject.SEARCH_FIELDS) > 0):
+            self.search_index = SearchIndex(schemaobject, schemaobject.SEARCH_FIELDS)
+            self.treeview.store.addIndex(self.search_index)
         self.treeview.bind('<<TreeviewSelect>>', self.selection_handler)
         self.treeview.bind('<Double-1>', lambda e: self.modify_button())
 
@@ -210,8 +1067,170 @@ class ObjectView(tk.Frame):
 
         tree_frame.pack(fill=tk.BOTH, expand=1)
 
+    def schedule_filter(self):
+        """applies filter after short delay, so it's not applied on every keystroke"""
+        if(self.filter_after_id is not None):
+            self.after_cancel(self.filter_after_id)
+        delay = self.FILTER_DELAY if self.treeview.page_source is None else self.SERVER_FILTER_DELAY
+        self.filter_after_id = self.after(delay, self.apply_filter)
+
+    def apply_filter(self):
+        """shows only objects that contain text from filter bar. In virtual mode, filter is
+        compiled to SQL (see parse_filter_text) and run in background, otherwise search index is used.
+        """
+        self.filter_after_id = None
+        field_name = self.filter_field.get()
+        field_names = None if field_name == self.ALL_FIELDS else [field_name]
+
+        if(self.treeview.page_source is not None):
+            try:
+                conditions = parse_filter_text(
+                    self.schemaobject, self.filter_var.get(), field_names)
+            except ValueError:
+                self.setStatus('Napačen filter')
+                return
+
+            if(self.query_worker is None):
+                self.query_worker = QueryWorker(self)
+            page_source = self.treeview.page_source
+            self.setStatus('Iskanje...')
+            self.query_worker.submit(
+                lambda superseded: self.filter_query(page_source, conditions, superseded), self.filter_loaded)
+            return
+
+        text = self.filter_var.get()
+        keys = self.search_index.search(text, field_names)
+        self.treeview.setFilter(keys, lambda: self.search_index.search(text, field_names))
+        self.setStatus('' if keys is None else 'Zadetkov: {}'.format(len(keys)))
+
+    def filter_conditions(self):
+        """returns filter conditions (see compile_filter) matching objects shown in view, used for export.
+        Search index matches filter text as substring, so in normal mode text is matched with "contains".
+
+        Raises:
+            ValueError: raised if filter text can't be parsed in virtual mode
+
+        Returns:
+            list: conditions
+        """
+        conditions = list(self.view_conditions)
+        if(self.search_index is None or self.filter_var.get().strip() == ''):
+            return conditions
+
+        field_name = self.filter_field.get()
+        field_names = self.schemaobject.SEARCH_FIELDS if field_name == self.ALL_FIELDS else [field_name]
+        if(self.treeview.page_source is not None):
+            return conditions + parse_filter_text(self.schemaobject, self.filter_var.get(), field_names)
+        return conditions + [(tuple(field_names), "contains", self.filter_var.get().strip())]
+
+    @staticmethod
+    def filter_query(page_source, conditions, superseded):
+        """runs in background, prepares filtered page source with count and first window
+
+        Args:
+            page_source (ObjectPageSource): current page source
+            conditions (list): filter conditions
+            superseded (function): returns True if query is no longer needed
+
+        Returns:
+            ObjectPageSource: filtered page source with count and first window, None if query was superseded
+        """
+        filtered = page_source.withFilter(conditions)
+        filtered.count()
+        if(superseded()):
+            return None
+        filtered.getRows(0, ObjectTreeView.VIRTUAL_WINDOW)
+        return filtered
+
+    @db_error_handler
+    def filter_loaded(self, result):
+        """shows filtered page source, called on main thread
+
+        Args:
+            result (ObjectPageSource or Exception): result of filter_query
+        """
+        if(isinstance(result, Exception)):
+            self.setStatus('')
+            raise result
+        if(result is None):
+            return
+        self.treeview.setPageSource(result)
+        self.setStatus('Zadetkov: {}'.format(result.count()))
+
+    def load_objects(self, objects, on_done=None, tracker=None, rows=False):
+        """inserts objects into treeview in background, progress is shown in toolbar
+
+        Args:
+            objects (iterable): schema objects, iterated in background thread
+            on_done (function, optional): called with number of inserted objects at the end. Defaults to None.
+            tracker (ChangeTracker, optional): tracker of loaded objects, view is refreshed automatically after load. Defaults to None.
+            rows (bool, optional): if True, objects are lists of SQL values instead of schema objects. Defaults to False.
+
+        Returns:
+            BulkInsert: running insert
+        """
+        if(tracker is not None):
+            self.view_conditions = list(tracker.conditions)
+        self.setStatus('Nalaganje...')
+        return self.treeview.insertObjects(
+            objects, on_progress=lambda count: self.setStatus('Nalaganje... {}'.format(count)),
+            on_done=lambda count, error: self.objects_loaded(count, error, on_done, tracker), rows=rows)
+
+    @db_error_handler
+    def objects_loaded(self, count, error, on_done=None, tracker=None):
+        """called when objects from load_objects are inserted, filter is applied to them
+
+        Args:
+            count (int): number of inserted objects
+            error (Exception): exception raised while fetching objects, None if there was none
+            on_done (function, optional): called with number of inserted objects. Defaults to None.
+            tracker (ChangeTracker, optional): tracker used for automatic refresh. Defaults to None.
+        """
+        self.setStatus('')
+        if(self.search_index is not None and self.filter_var.get().strip() != ''):
+            self.apply_filter()
+        if(on_done is not None):
+            on_done(count)
+        if(error is not None):
+            raise error
+        if(tracker is not None):
+            self.auto_refresh = AutoRefresh(self, tracker)
+
+    @profiled
+    def apply_changes(self, changes):
+        """patches treeview with changes found by ChangeTracker. In virtual mode, visible window is reloaded.
+
+        Args:
+            changes (tuple(list, list) or bool): changed objects and PKs of deleted objects, or True if probe found changes in virtual mode
+
+        Returns:
+            bool: True if anything was changed
+        """
+        if(self.treeview.page_source is not None):
+            if(changes):
+                self.treeview.objectsChanged()
+            return bool(changes)
+
+        objects, deleted = changes
+        if(len(objects) == 0 and len(deleted) == 0):
+            return False
+
+        self.treeview.deleteKeys(*deleted)
+        self.treeview.refreshObjects([(obj, obj.getPKfield().getValueSQL()) for obj in objects])
+        if(self.search_index is not None and self.filter_var.get().strip() != ''):
+            self.apply_filter()
+        return True
+
+    def setStatus(self, text):
+        """shows status text in toolbar, ex. loading state
+
+        Args:
+            text (string): status text, empty string hides status
+        """
+        self.status_label.configure(text=text)
+
     def selection_handler(self, event):
-        if(len(self.treeview.selection()) == 1):
+        if(len(self.treeview.selection()) >= 1):
             self.modifybutton.configure(state=tk.NORMAL)
         else:
             self.modifybutton.configure(state=tk.DISABLED)
@@ -223,7 +1242,12 @@ class ObjectView(tk.Frame):
 
     @db_error_handler
     def modify_button(self):
-        """Modify action of object. This action should be called only when single object is selected."""
+        """Modify action of object. If multiple objects are selected, batch dialog is shown, see batch_cb."""
+        if(len(self.treeview.selection()) > 1):
+            pks = [self.treeview.store.get(self.treeview.keyOf(item))[0] for item in self.treeview.selection()]
+            ObjectDialog(self.schemaobject, self.batch_cb, self, batch=pks)
+            return
+
         item = self.treeview.selection()[0]
 
         idd = self.treeview.item(item)['text']
@@ -235,7 +1259,8 @@ class ObjectView(tk.Frame):
 
     @db_error_handler
     def delete_button(self):
-        """Delete action. If multiple objects are selected, all of them will be deleted.
+        """Delete action. If multiple objects are selected, all of them will be deleted, with objects referencing them.
+        Same cascade as in cli.py delete is used, see SchemaObject.DeleteObjectsWhere.
         """
         toDelete = tk.messagebox.askokcancel(
             'Brisanje dokumenta', 'Če izbrišete ta dokument, boste izbrisali tudi vse povezane dokumente. Ali želite nadaljevati?', icon='warning')
@@ -243,26 +1268,61 @@ class ObjectView(tk.Frame):
         if(toDelete is False):
             return
 
-        items = self.treeview.selection()
+        store = self.treeview.store
+        pk_name = self.schemaobject.GetPK()[0]
+        pk_index = store.field_names.index(pk_name)
+        keys = [key for key in map(self.treeview.keyOf, self.treeview.selection()) if key in store]
+        pks = [store.get(key)[pk_index] for key in keys]
 
-        for item in items:
-            idd = self.treeview.item(item)['text']
+        for start in range(0, len(pks), MAX_PARAMETERS):
+            self.schemaobject.DeleteObjectsWhere(
+                self.root_object.CONNECTION_PARAMETERS, [(pk_name, "in", pks[start:start + MAX_PARAMETERS])])
 
+        self.treeview.deleteKeys(*keys)
+        self.treeview.objectsChanged()
 
-            tt = self.schemaobject.FetchObjectsWhere(
-                self.root_object.CONNECTION_PARAMETERS, {self.schemaobject.GetPK()[0]: idd})
-            tta = tt[0]
+    def export_button(self):
+        """Export action. Objects matching filter bar are exported to chosen file in background."""
+        from export import export_table
 
-            fkitems = TronPosWebClassifications.FetchObjectsWhere(
-                self.root_object.CONNECTION_PARAMETERS, {'tpfirm_id': tta.getField('tpfirm_id')})
+        try:
+            conditions = self.filter_conditions()
+        except ValueError:
+            self.setStatus('Napačen filter')
+            return
 
-            for fkitem in fkitems:
-                fkitem.deleteObject(self.root_object.CONNECTION_PARAMETERS)
+        file_path = filedialog.asksaveasfilename(
+            parent=self, title='Izvoz', defaultextension='.csv',
+            filetypes=[('CSV', '*.csv'), ('JSON lines', '*.jsonl'), ('Parquet', '*.parquet')])
+        if(not file_path):
+            return
 
-            tta.deleteObject(self.root_object.CONNECTION_PARAMETERS)
+        mask = len(self.schemaobject.SECRET_FIELDS) > 0 and messagebox.askyesno(
+            'Izvoz', 'Ali želite skriti gesla?')
 
-            self.treeview.delete(idd)
+        worker = QueryWorker(self)
+        self.setStatus('Izvažanje...')
+        worker.submit(
+            lambda superseded: export_table(self.schemaobject, self.root_object.CONNECTION_PARAMETERS, file_path,
+                                            mask=mask, conditions=conditions),
+            lambda result: self.export_done(result, worker))
 
+    @db_error_handler
+    def export_done(self, result, worker):
+        """shows result of export, called on main thread
+
+        Args:
+            result (int or Exception): number of exported rows or raised exception
+            worker (QueryWorker): worker used for export, it's closed
+        """
+        worker.close()
+        self.setStatus('')
+        if(isinstance(result, pymssql.Error)):
+            raise result
+        if(isinstance(result, Exception)):
+            messagebox.showerror('Napaka', 'Izvoz ni uspel: {}'.format(result))
+            return
+        messagebox.showinfo('Izvoz', 'Izvoženih vrstic: {}'.format(result))
 
 
 class TronPosOdooExchangeUpView(ObjectView):
@@ -292,9 +1352,10 @@ class TronPosOdooExchangeUpView(ObjectView):
         self.treeview.selection_remove()
 
     def test_method(self):
-        """Test method. Logic will be added here
+        """checks connectivity of selected firms to Odoo and retail databases, or of all active firms if none is selected
         """
-        pass
+        pks = [self.treeview.store.get(self.treeview.keyOf(item))[0] for item in self.treeview.selection()]
+        ProbeWindow(self.root_object.CONNECTION_PARAMETERS, pks, self)
 
     def selection_handle(self, event):
         """function that is called when selection of treeview is changed. Enables and disables buttons.
@@ -302,14 +1363,15 @@ class TronPosOdooExchangeUpView(ObjectView):
         Args:
             event (tk event): selection event, not used here, added for compatibility
         """
-        if(len(self.treeview.selection()) == 1):
+        if(len(self.treeview.selection()) >= 1):
             self.modifybutton.configure(state=tk.NORMAL)
-            self.showbutton.configure(state=tk.NORMAL)
-            self.testbutton.configure(state=tk.NORMAL)
         else:
             self.modifybutton.configure(state=tk.DISABLED)
+
+        if(len(self.treeview.selection()) == 1):
+            self.showbutton.configure(state=tk.NORMAL)
+        else:
             self.showbutton.configure(state=tk.DISABLED)
-            self.testbutton.configure(state=tk.DISABLED)
 
         if(len(self.treeview.selection()) < 1):
             self.deletebutton.configure(state=tk.DISABLED)
@@ -331,34 +1393,30 @@ class TronPosOdooExchangeUpView(ObjectView):
             self.root_object.CONNECTION_PARAMETERS, {self.schemaobject.GetPK()[0]: idd})
         selected_obj = received_objs[0]
 
-        fk_objs = TronPosWebClassifications.FetchObjectsWhere(
-            self.root_object.CONNECTION_PARAMETERS, {'tpfirm_id': selected_obj.getField('tpfirm_id')})
+        tracker = ChangeTracker(TronPosWebClassifications, self.root_object.CONNECTION_PARAMETERS,
+                                [('tpfirm_id', '=', selected_obj.getField('tpfirm_id'))])
+        fk_objs = itertools.chain.from_iterable(tracker.iterObjects())
 
         topW = tk.Toplevel(self)
         topW.title('Povezave na {}'.format(idd))
 
         view = ObjectView(TronPosWebClassifications, topW, root_object=self.root_object)
-
-
-        for fk_obj in fk_objs:
-            view.treeview.insertObject(fk_obj)
         view.pack(expand=1, fill=tk.BOTH)
+        view.load_objects(fk_objs, tracker=tracker)
 
     @db_error_handler
     def showall_fk(self):
         """shows all objects from TronPosWebClassifications
         """
-        fk_objs = TronPosWebClassifications.FetchAllObjects(
-            self.root_object.CONNECTION_PARAMETERS)
+        tracker = ChangeTracker(TronPosWebClassifications, self.root_object.CONNECTION_PARAMETERS)
+        fk_objs = itertools.chain.from_iterable(tracker.iterObjects())
 
         topW = tk.Toplevel(self)
         topW.title('TronPosWebClassifications')
 
         view = ObjectView(TronPosWebClassifications, topW, root_object=self.root_object)
-
-        for fk_obj in fk_objs:
-            view.treeview.insertObject(fk_obj)
         view.pack(expand=1, fill=tk.BOTH)
+        view.load_objects(fk_objs, tracker=tracker)
 
     @db_error_handler
     def cb(self, originalobject, newobject, window):
@@ -396,31 +1454,34 @@ class TronPosOdooExchangeUpView(ObjectView):
                     toUpdate = tk.messagebox.askokcancel(
                         'Zunanja povezava', 'Na dokument obstajajo zunanje povezave. Za nadaljevanje je potrebno vezane dokumente spremeniti. Želite nadaljevati?', icon='warning')
                     if(toUpdate):
-                        original_copy = copy.deepcopy(newobject.clone)
-                        final_value = newobject.insertObject(
-                            self.root_object.CONNECTION_PARAMETERS)
-                        for objfk in objs:
-                            objfk.setField(
-                                'tpfirm_id', newobject.getField('tpfirm_id'))
-                            objfk.updateObject(
-                                self.root_object.CONNECTION_PARAMETERS)
-    
-                        original_copy.deleteObject(
-                            self.root_object.CONNECTION_PARAMETERS)
-                        self.treeview.refreshObject(
-                            newobject, original_copy.getField('tpfirm_id'))
+                        oldid = newobject.clone.getField('tpfirm_id')
+                        try:
+                            final_value = newobject.renameObject(
+                                self.root_object.CONNECTION_PARAMETERS, optimistic=True)
+                        except ConcurrencyConflict as conflict:
+                            self.conflict_handler(conflict, window)
+                            return
+                        self.treeview.refreshObject(newobject, oldid)
 
                 else:
                     # No FK objects present
                     oldid = newobject.clone.getField('tpfirm_id')
-                    final_value = newobject.updateObject(
-                        self.root_object.CONNECTION_PARAMETERS)
+                    try:
+                        final_value = newobject.updateObject(
+                            self.root_object.CONNECTION_PARAMETERS, optimistic=True)
+                    except ConcurrencyConflict as conflict:
+                        self.conflict_handler(conflict, window)
+                        return
                     self.treeview.refreshObject(newobject, oldid)
             else:
                 # No primary key collision
                 oldid = newobject.clone.getField('tpfirm_id')
-                final_value = newobject.updateObject(
-                    self.root_object.CONNECTION_PARAMETERS)
+                try:
+                    final_value = newobject.updateObject(
+                        self.root_object.CONNECTION_PARAMETERS, optimistic=True)
+                except ConcurrencyConflict as conflict:
+                    self.conflict_handler(conflict, window)
+                    return
                 self.treeview.refreshObject(newobject, oldid)
 
         if(final_value > 0):
@@ -428,24 +1489,31 @@ class TronPosOdooExchangeUpView(ObjectView):
 
 
 class ObjectDialog(tk.Toplevel):
-    def __init__(self, schemaobject, cb, *args, **kwargs):
+    @profiled
+    def __init__(self, schemaobject, cb, *args, batch=None, **kwargs):
         """edit view/dialog for schema object
 
         Args:
             schemaobject (schema object or class): If it's object, then it populated edit field of that object. If it's class, then values are set to default.
-            cb (function): callback function to be called when object is read for modify/insert
+            cb (function): callback function to be called when object is read for modify/insert. In batch mode, it's called with PKs, dict of applied SQL values and dialog.
+            batch (list, optional): PKs of objects changed together, schemaobject must be class. Only fields with checked 'Uporabi' are applied, PK is not shown. Defaults to None.
         """
 
 
         super().__init__(*args, **kwargs)
 
         self.cb = cb
+        self.batch = batch
 
         self.frame_container = tk.Frame(self)
 
         self.binded_vars = {}
 
-        if(inspect.isclass(schemaobject)):
+        if(batch is not None):
+            self.originalobject = None
+            self.schemaobject = schemaobject()
+            self.title('Spreminjanje {} objektov'.format(len(batch)))
+        elif(inspect.isclass(schemaobject)):
             self.originalobject = None
             self.schemaobject = schemaobject()
             self.title('Novi objekt')
@@ -456,6 +1524,9 @@ class ObjectDialog(tk.Toplevel):
                 schemaobject.getPKfield().getValueSQL()))
 
         for i, (field_name, mstype) in enumerate(schemaobject.fields.items()):
+            if(batch is not None and mstype.isPK):
+                continue
+
             entry_label = tk.Label(self.frame_container,
                          text="{} [{}]".format(field_name, mstype.DESCRIPTOR))
             self.binded_vars[field_name] = {'type': mstype}
@@ -468,12 +1539,12 @@ class ObjectDialog(tk.Toplevel):
             self.binded_vars[field_name]['var'] = binded_var
 
             if(mstype.getValue() is not None):
-                binded_var.set(mstype.getValue())
+                binded_var.set(mstype.toText(mstype.getValueSQL()))
 
             main_entry = tk.Entry(self.frame_container, textvariable=binded_var)
 
             if(isinstance(mstype, MSDatetime)):
-                main_entry = DateEntry(self.frame_container, width=12, background='darkblue',
+                main_entry = date_entry_class()(self.frame_container, width=12, background='darkblue',
                                foreground='white', borderwidth=2, state="readonly")
                 date_val = mstype.getValue()
                 if(date_val is not None):
@@ -496,21 +1567,34 @@ class ObjectDialog(tk.Toplevel):
                 self.binded_vars[field_name]['null'] = isnullvar
 
                 checkboxbtn = tk.Checkbutton(
-                    self.frame_container, text='NULL', command=lambda main_entry=main_entry, isnullvar=isnullvar: toggleMe(isnullvar, main_entry))
+                    self.frame_container, text='NULL', command=lambda main_entry=main_entry, isnullvar=isnullvar, mstype=mstype: toggleMe(isnullvar, main_entry, isinstance(mstype, MSDatetime)))
                 if(mstype.getValue() is None):
                     isnullvar.set(1)
                     checkboxbtn.select()
-                    toggleMe(isnullvar, main_entry)
+                    toggleMe(isnullvar, main_entry, isinstance(mstype, MSDatetime))
                 checkboxbtn.configure(variable=isnullvar)
                 checkboxbtn.grid(row=i, column=2)
 
-        if(self.originalobject is None):
+            if(batch is not None):
+                # field is applied when it's checked or changed
+                applyvar = tk.IntVar()
+                self.binded_vars[field_name]['apply'] = applyvar
+                tk.Checkbutton(self.frame_container, text='Uporabi', variable=applyvar).grid(row=i, column=3)
+                touched = lambda *_, applyvar=applyvar: applyvar.set(1)
+                if(isinstance(mstype, MSDatetime)):
+                    main_entry.bind('<<DateEntrySelected>>', touched)
+                else:
+                    binded_var.trace_add('write', touched)
+                if(mstype.isNull):
+                    isnullvar.trace_add('write', touched)
+
+        if(self.originalobject is None and batch is None):
             button_text = "Kreiraj"
         else:
             button_text = "Shrani"
 
         tk.Button(self.frame_container, text=button_text,
-                  command=self.parseObject).grid(row=i+1, columnspan=3, ipadx=20, pady=10)
+                  command=self.parseObject).grid(row=i+1, columnspan=4, ipadx=20, pady=10)
 
         self.frame_container.pack()
 
@@ -522,14 +1606,19 @@ class ObjectDialog(tk.Toplevel):
         """
         error_count = 0
         for fieldname, values_dict in self.binded_vars.items():
+            if('apply' in values_dict and values_dict['apply'].get() == 0):
+                continue
             if('null' in values_dict and values_dict['null'].get() == 1):
                 self.schemaobject.setField(fieldname, None)
             else:
                 try:
-                    if(isinstance(values_dict['var'], DateEntry)):
+                    if(isinstance(self.schemaobject.fields[fieldname], MSDatetime)):
                         testvalue = values_dict['var'].get_date()
                     else:
                         testvalue = values_dict['var'].get()
+                    # entries of types without own variable (ex. DECIMAL, UNIQUEIDENTIFIER) hold text
+                    if(isinstance(testvalue, str) and not isinstance(self.schemaobject.fields[fieldname], MSVarchar)):
+                        testvalue = self.schemaobject.fields[fieldname].fromText(testvalue)
 
                     originalvalue = self.schemaobject.getField(fieldname)
                     self.schemaobject.setField(fieldname, testvalue)
@@ -537,7 +1626,7 @@ class ObjectDialog(tk.Toplevel):
                         self.schemaobject.setField(fieldname, originalvalue)
                         raise ValueError
 
-                    if(isinstance(values_dict['var'], DateEntry)):
+                    if(isinstance(self.schemaobject.fields[fieldname], MSDatetime)):
                         style = ttk.Style()
                         style.configure('my.DateEntry', foreground='black')
                         values_dict['control'].configure(style='my.DateEntry')
@@ -545,7 +1634,7 @@ class ObjectDialog(tk.Toplevel):
                         values_dict['control'].configure(fg='black')
 
                 except:
-                    if(isinstance(values_dict['var'], DateEntry)):
+                    if(isinstance(self.schemaobject.fields[fieldname], MSDatetime)):
                         style = ttk.Style()
                         style.configure('my.DateEntry', foreground='red')
                         values_dict['control'].configure(style='my.DateEntry')
@@ -554,45 +1643,61 @@ class ObjectDialog(tk.Toplevel):
                     error_count += 1
 
         if(error_count < 1):
-            self.cb(self.originalobject, self.schemaobject, self)
+            if(self.batch is not None):
+                self.cb(self.batch, {fieldname: self.schemaobject.fields[fieldname].getValueSQL()
+                                     for fieldname, values_dict in self.binded_vars.items() if values_dict['apply'].get() == 1}, self)
+            else:
+                self.cb(self.originalobject, self.schemaobject, self)
 
 
-def toggleMe(var, controlEntry):
+def toggleMe(var, controlEntry, is_date=False):
     """function that handles toggling of entry fields, used for "isNull" option 
 
     Args:
         var (tk IntVar): IntVar binded to "isNull" checkbox
         controlEntry (tk Widget): Widget that is enabled or disabled
+        is_date (bool, optional): controlEntry is DateEntry. Defaults to False.
     """
     if(var.get() == 1):
         controlEntry.configure(state=tk.DISABLED)
     else:
-        if(isinstance(controlEntry, DateEntry)):
+        if(is_date):
             controlEntry.configure(state='readonly')
         else:
             controlEntry.configure(state=tk.NORMAL)
 
 
+@db_error_handler
+def show_db_error(error):
+    """shows error dialog for exception raised in background thread
+
+    Args:
+        error (Exception): raised exception
+    """
+    raise error
+
+
 @db_error_handler
 def test_connection(connection_parameters):
-    """functions that quickly checks if connection to DB is successful
+    """functions that quickly checks if connection to DB is successful. Connection is left open, so it can be reused
 
     Args:
         connection_parameters (kwargs dict): pymssql connection parameters
 
     Returns:
-        bool: True if connection is available, False otherwise
+        pymssql.Connection: opened connection if connection is available, None otherwise
     """
-    with pymssql.connect(**connection_parameters) as conn:
-        with conn.cursor(as_dict=True) as cursor:
-            return True
+    return connect(connection_parameters)
 
 
 class MainWindow(tk.Tk):
     """main control tk Element"""
 
     CONFIG_FILE = "config.ini"
+    SNAPSHOT_FILE = "snapshot.db"
+    VIRTUAL_THRESHOLD = 50000
 
+    @profiled
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.lift()
@@ -600,54 +1705,178 @@ class MainWindow(tk.Tk):
         self.attributes('-topmost', False)
         self.withdraw()
 
-        config = configparser.ConfigParser()
-
-        if(path.isfile(self.CONFIG_FILE)):
-            config.read(self.CONFIG_FILE)
-
-        else:
-            # Write default file
-            config['CONNECTION_SETTINGS'] = {
-                'dbhost': 'localhost',
-                'dbname': 'OdooExchangeSync',
-                'dbuser': 'SA',
-                'dbpass': '<YourStrong@Passw0rd>'
-            }
-            with open(self.CONFIG_FILE, "w") as f:
-                config.write(f)
-
-        self.CONNECTION_PARAMETERS = {}
-
         try:
-            self.CONNECTION_PARAMETERS['server'] = config['CONNECTION_SETTINGS']['dbhost']
-            self.CONNECTION_PARAMETERS['database'] = config['CONNECTION_SETTINGS']['dbname']
-            self.CONNECTION_PARAMETERS['user'] = config['CONNECTION_SETTINGS']['dbuser']
-            self.CONNECTION_PARAMETERS['password'] = config['CONNECTION_SETTINGS']['dbpass']
+            self.CONNECTION_PARAMETERS = load_connection_parameters(self.CONFIG_FILE)
         except KeyError as _:
             print("ERR")
             messagebox.showerror(
                 "Napaka", "Nepravilna konfiguracijska datoteka")
             sys.exit()
 
-        if(test_connection(self.CONNECTION_PARAMETERS) is not True):
-            sys.exit()
+        from snapshot import Snapshot
+        self.snapshot = Snapshot(self.SNAPSHOT_FILE)
+        warm_start = self.snapshot.has(TronPosOdooExchangeUp)
+
+        if(not warm_start):
+            probe_connection = test_connection(self.CONNECTION_PARAMETERS)
+            if(probe_connection is None):
+                sys.exit()
 
         self.deiconify()
 
         self.geometry("1366x768")
 
-        tv = TronPosOdooExchangeUpView(
+        self.tv = TronPosOdooExchangeUpView(
             TronPosOdooExchangeUp, self, root_object=self)
+        self.tv.pack(expand=1, fill=tk.BOTH)
+
+        self.startup_times = {}
+        self.after_idle(self.first_frame)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.virtual_source = None
+        self.tracker = ChangeTracker(TronPosOdooExchangeUp, self.CONNECTION_PARAMETERS)
+        if(warm_start):
+            # objects from snapshot are shown first, first refresh fetches only objects changed since
+            self.tracker.restore(self.snapshot.versions(TronPosOdooExchangeUp))
+            self.loading = self.tv.load_objects(self.snapshot.iterRows(TronPosOdooExchangeUp), on_done=self.rows_loaded,
+                                                tracker=self.tracker, rows=True)
+            # connection is tested while snapshot is shown
+            self.connection_worker = QueryWorker(self)
+            self.connection_worker.submit(lambda superseded: self.check_connection(), self.connection_checked)
+        else:
+            self.loading = self.tv.load_objects(self.startup_objects(probe_connection), on_done=self.rows_loaded,
+                                                tracker=self.tracker)
+
+    def first_frame(self):
+        """called when window is shown for first time"""
+        self.startup_times['first_frame'] = time.perf_counter() - STARTUP_TIME
+
+    def startup_objects(self, connection):
+        """generator of objects shown at startup, iterated in background thread. If there are more than
+        VIRTUAL_THRESHOLD objects, nothing is generated and page source for virtual mode is prepared instead.
+
+        Args:
+            connection (pymssql.Connection): opened connection, closed at the end
+
+        Yields:
+            TronPosOdooExchangeUp: fetched objects
+        """
+        with connection:
+            if(TronPosOdooExchangeUp.CountObjects(self.CONNECTION_PARAMETERS, connection=connection) > self.VIRTUAL_THRESHOLD):
+                self.tracker.reset(connection=connection, versions=False)
+                virtual_source = ObjectPageSource(TronPosOdooExchangeUp, self.CONNECTION_PARAMETERS)
+                # count and first page are fetched here, so main thread doesn't wait for them
+                virtual_source.count()
+                virtual_source.getRows(0, ObjectTreeView.VIRTUAL_WINDOW)
+                self.virtual_source = virtual_source
+                return
+
+            for chunk in self.tracker.iterObjects(connection=connection):
+                yield from chunk
+
+    def check_connection(self):
+        """runs in background at warm start, connects to SQL DB and counts objects
+
+        Returns:
+            pymssql.Connection: opened connection if there are more than VIRTUAL_THRESHOLD objects, None otherwise
+        """
+        connection = connect(self.CONNECTION_PARAMETERS)
+        try:
+            if(TronPosOdooExchangeUp.CountObjects(self.CONNECTION_PARAMETERS, connection=connection) > self.VIRTUAL_THRESHOLD):
+                return connection
+        except Exception:
+            connection.close()
+            raise
+        connection.close()
+        return None
+
+    def connection_checked(self, result):
+        """called on main thread with result of check_connection. If connection failed, error is shown
+        and application exits, same as at cold start. If table grew over VIRTUAL_THRESHOLD, loading of
+        snapshot is stopped and view is switched to virtual mode.
+
+        Args:
+            result (pymssql.Connection, None or Exception): result of check_connection
+        """
+        self.connection_worker.close()
+        if(isinstance(result, Exception)):
+            show_db_error(result)
+            sys.exit()
+        if(result is None):
+            return
+
+        self.loading.cancel()
+        if(self.tv.auto_refresh is not None):
+            self.tv.auto_refresh.stop()
+            self.tv.auto_refresh = None
+        self.loading = self.tv.load_objects(self.startup_objects(result), on_done=self.rows_loaded,
+                                            tracker=self.tracker)
+
+    def rows_loaded(self, count):
+        """called when startup objects are loaded, reports startup times
+
+        Args:
+            count (int): number of inserted objects
+        """
+        if(self.virtual_source is not None):
+            self.tv.treeview.setPageSource(self.virtual_source)
+            count = self.tv.treeview.row_count
+
+        self.startup_times['all_rows'] = time.perf_counter() - STARTUP_TIME
+        print("Startup: first frame after {:.0f} ms, {} rows after {:.0f} ms".format(
+            self.startup_times.get('first_frame', 0) * 1000, count,
+            self.startup_times['all_rows'] * 1000))
+
+    def on_close(self):
+        """saves snapshot of main view and closes window"""
+        try:
+            self.save_snapshot()
+        except Exception as e:
+            print("Snapshot not saved: {}".format(e))
+        self.destroy()
+
+    def save_snapshot(self):
+        """saves objects shown in main view with their versions, used for warm start. In virtual mode
+        snapshot is removed, because objects are not loaded.
+        """
+        if(self.tv.treeview.page_source is not None):
+            self.snapshot.drop(TronPosOdooExchangeUp)
+            return
+
+        auto_refresh = self.tv.auto_refresh
+        if(auto_refresh is None or auto_refresh.versions is None):
+            # objects are still loading, previous snapshot is kept
+            return
+
+        store = self.tv.treeview.store
+        self.snapshot.save(TronPosOdooExchangeUp, (store.get(key) for key in store.orderedKeys()),
+                           auto_refresh.versions)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='MSSQL_app')
+    parser.add_argument('--profile', metavar='FILE', default=os.environ.get(PROFILE_ENV),
+                        help='time UI callbacks and detect stalls, report is written to FILE on exit')
+    args = parser.parse_args(argv)
+
+    profiler = None
+    if(args.profile):
+        from profiler import UIProfiler
+        profiler = UIProfiler().install()
+
+    mainwindow = MainWindow()
+    mainwindow.title('Glavno okno')
 
-        testsObjs = TronPosOdooExchangeUp.FetchAllObjects(
-            self.CONNECTION_PARAMETERS)
+    if(profiler is not None):
+        profiler.start(mainwindow)
 
-        for obi in testsObjs:
-            tv.treeview.insertObject(obi)
-        tv.pack(expand=1, fill=tk.BOTH)
+    mainwindow.mainloop()
 
+    if(profiler is not None):
+        profiler.stop()
+        profiler.save(args.profile)
 
-mainwindow = MainWindow()
-mainwindow.title('Glavno okno')
 
-mainwindow.mainloop()
+if __name__ == '__main__':
+    main()
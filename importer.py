@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+
+"""Bulk import of CSV files with validation and batched upsert.
+
+CSV file must have header with field names, missing nullable fields are NULL. Each value is converted
+with MSType.fromText and checked with MSType.isValueOK, same as in ObjectDialog. Empty value is NULL,
+except for non-nullable text fields, where it's empty text. Rows with invalid values, duplicate PK or
+missing referenced object are written to reject report, other rows are inserted or updated (matched by PK)
+in batches, each batch in single transaction. Tables are imported in order of FK dependencies.
+Masked values of SECRET_FIELDS (see export.py --mask) keep current value of updated rows, new rows with
+masked values are rejected.
+
+Example:
+    python importer.py TronPosOdooExchangeUp=firms.csv TronPosWebClassifications=classifications.csv --rejects rejects.csv
+"""
+
+import argparse
+import copy
+import csv
+import json
+import sys
+import time
+
+from config import CONFIG_FILE, load_connection_parameters
+from export import MASK
+from models import SCHEMA_CLASSES, MSVarchar, connect
+
+
+class ImportFileError(Exception):
+    """Raised when CSV file can't be imported, ex. header doesn't match schema"""
+
+
+def dependency_order(schema_classes):
+    """sorts schema classes so referenced classes (see FOREIGN_KEYS) are before classes referencing them
+
+    Args:
+        schema_classes (list[schema class]): schema classes
+
+    Raises:
+        ImportFileError: raised if classes reference each other in cycle
+
+    Returns:
+        list[schema class]: sorted schema classes
+    """
+    ordered = []
+    visiting = set()
+
+    def visit(schema_class):
+        if(schema_class in ordered):
+            return
+        if(schema_class in visiting):
+            raise ImportFileError("Cyclic foreign keys of {}".format(schema_class.TABLE_NAME))
+        visiting.add(schema_class)
+        for table_name in schema_class.FOREIGN_KEYS.values():
+            parent = SCHEMA_CLASSES.get(table_name)
+            if(parent in schema_classes):
+                visit(parent)
+        ordered.append(schema_class)
+
+    for schema_class in schema_classes:
+        visit(schema_class)
+    return ordered
+
+
+class RowParser:
+    """Converts and validates CSV rows of schema class"""
+
+    def __init__(self, schema_class, header):
+        """Constructor
+
+        Args:
+            schema_class (schema class): schema class
+            header (list[string]): field names in CSV file
+
+        Raises:
+            ImportFileError: raised if header has unknown fields or required field is missing
+        """
+        unknown = [name for name in header if name not in schema_class.fields]
+        if(len(unknown) > 0):
+            raise ImportFileError("Unknown fields: {}".format(", ".join(unknown)))
+
+        missing = [name for name, field_type in schema_class.fields.items()
+                   if name not in header and not field_type.isNull]
+        if(len(missing) > 0):
+            raise ImportFileError("Missing fields: {}".format(", ".join(missing)))
+
+        self.columns = []
+        for field_name, field_type in schema_class.fields.items():
+            position = header.index(field_name) if field_name in header else None
+            # copy of type is used only for validation of values
+            self.columns.append((field_name, position, copy.deepcopy(field_type)))
+
+    def parse(self, record):
+        """converts CSV record to SQL values
+
+        Args:
+            record (list[string]): CSV record
+
+        Returns:
+            tuple(list, list[string]): SQL values in order of fields (None if record is not valid) and errors
+        """
+        values = []
+        errors = []
+        for field_name, position, validator in self.columns:
+            text = record[position] if position is not None and position < len(record) else ""
+            try:
+                if(text == "" and (validator.isNull or not isinstance(validator, MSVarchar))):
+                    value = None
+                else:
+                    value = validator.fromText(text)
+            except ValueError:
+                errors.append("{}: not a {} value".format(field_name, validator.DESCRIPTOR))
+                continue
+
+            validator.setValue(value)
+            if(validator.isValueOK() is False):
+                errors.append("{}: invalid {} value".format(field_name, validator.DESCRIPTOR))
+                continue
+            values.append(validator.getValueSQL())
+
+        return (None if errors else values, errors)
+
+
+class RejectReport:
+    """CSV report of rejected rows, with line number, table and errors of each row"""
+
+    def __init__(self, file_path):
+        self.file = open(file_path, "w", newline="", encoding="utf-8") if file_path else None
+        self.writer = csv.writer(self.file) if self.file else None
+        if(self.writer):
+            self.writer.writerow(["table", "line", "errors", "record"])
+        self.count = 0
+
+    def reject(self, table_name, line, errors, record):
+        self.count += 1
+        if(self.writer):
+            self.writer.writerow([table_name, line, "; ".join(errors), json.dumps(record, ensure_ascii=False)])
+
+    def close(self):
+        if(self.file):
+            self.file.close()
+
+
+def unmask_batch(schema_class, cursor, batch, report):
+    """replaces masked values of SECRET_FIELDS with current values from SQL DB, so import of masked export
+    doesn't overwrite passwords. Rows with masked values, which don't exist yet, are rejected.
+
+    Args:
+        schema_class (schema class): schema class
+        cursor (pymssql.Cursor): opened cursor with as_dict
+        batch (list[tuple(int, list, list[string])]): line number, SQL values and CSV record of rows
+        report (RejectReport): report of rejected rows
+
+    Returns:
+        list[tuple(int, list, list[string])]: rows without masked values
+    """
+    field_names = list(schema_class.fields.keys())
+    secret_positions = [field_names.index(name) for name in schema_class.SECRET_FIELDS]
+    pk_name = schema_class.GetPK()[0]
+    pk_position = field_names.index(pk_name)
+
+    masked = [values[pk_position] for _, values, _ in batch if any(values[i] == MASK for i in secret_positions)]
+    if(len(masked) == 0):
+        return batch
+
+    current = {obj.getPKfield().getValueSQL(): obj.getFieldValuesSQL()
+               for obj in schema_class._fetchIn(cursor, pk_name, masked)}
+    valid = []
+    for line, values, record in batch:
+        positions = [i for i in secret_positions if values[i] == MASK]
+        if(len(positions) > 0):
+            if(values[pk_position] not in current):
+                report.reject(schema_class.TABLE_NAME, line, [
+                    "{}: masked value of new object".format(field_names[i]) for i in positions], record)
+                continue
+            for i in positions:
+                values[i] = current[values[pk_position]][i]
+        valid.append((line, values, record))
+    return valid
+
+
+def import_batch(schema_class, cursor, batch, report):
+    """checks referenced objects of batch and upserts valid rows
+
+    Args:
+        schema_class (schema class): schema class
+        cursor (pymssql.Cursor): opened cursor with as_dict
+        batch (list[tuple(int, list, list[string])]): line number, SQL values and CSV record of rows
+        report (RejectReport): report of rejected rows
+
+    Returns:
+        tuple(int, int): number of inserted and updated rows
+    """
+    field_names = list(schema_class.fields.keys())
+    for field_name, table_name in schema_class.FOREIGN_KEYS.items():
+        parent = SCHEMA_CLASSES[table_name]
+        position = field_names.index(field_name)
+        existing = parent._existingKeys(
+            cursor, parent.GetPK()[0], {values[position] for _, values, _ in batch if values[position] is not None})
+        valid = []
+        for line, values, record in batch:
+            if(values[position] is not None and values[position] not in existing):
+                report.reject(schema_class.TABLE_NAME, line, [
+                    "{}: {} {} doesn't exist".format(field_name, table_name, values[position])], record)
+            else:
+                valid.append((line, values, record))
+        batch = valid
+
+    batch = unmask_batch(schema_class, cursor, batch, report)
+    return schema_class.UpsertValues(cursor, [values for _, values, _ in batch])
+
+
+def import_file(schema_class, connection_parameters, file_path, report, batch_size=1000):
+    """imports CSV file, rows are read incrementally and upserted in batches
+
+    Args:
+        schema_class (schema class): schema class
+        connection_parameters (kwargs dict): pymssql connection parameters
+        file_path (string): path to CSV file
+        report (RejectReport): report of rejected rows
+        batch_size (int, optional): number of rows upserted in single transaction. Defaults to 1000.
+
+    Raises:
+        ImportFileError: raised if header doesn't match schema
+
+    Returns:
+        dict: number of read, inserted, updated and rejected rows and duration
+    """
+    start = time.perf_counter()
+    rejected_before = report.count
+    stats = {'read': 0, 'inserted': 0, 'updated': 0}
+    pk_position = list(schema_class.fields.keys()).index(schema_class.GetPK()[0])
+    seen = set()
+
+    with open(file_path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        try:
+            parser = RowParser(schema_class, next(reader))
+        except StopIteration:
+            raise ImportFileError("Empty file {}".format(file_path))
+
+        with connect(connection_parameters) as conn:
+            with conn.cursor(as_dict=True) as cursor:
+
+                def flush(batch):
+                    inserted, updated = import_batch(schema_class, cursor, batch, report)
+                    conn.commit()
+                    stats['inserted'] += inserted
+                    stats['updated'] += updated
+
+                batch = []
+                for record in reader:
+                    stats['read'] += 1
+                    values, errors = parser.parse(record)
+                    if(values is not None and values[pk_position] in seen):
+                        errors = ["{}: duplicate PK".format(schema_class.GetPK()[0])]
+                    if(len(errors) > 0):
+                        report.reject(schema_class.TABLE_NAME, reader.line_num, errors, record)
+                        continue
+
+                    seen.add(values[pk_position])
+                    batch.append((reader.line_num, values, record))
+                    if(len(batch) >= batch_size):
+                        flush(batch)
+                        batch = []
+
+                if(len(batch) > 0):
+                    flush(batch)
+
+    stats['rejected'] = report.count - rejected_before
+    stats['seconds'] = round(time.perf_counter() - start, 3)
+    return stats
+
+
+def import_files(files, connection_parameters, rejects_path=None, batch_size=1000):
+    """imports CSV files of multiple tables in order of FK dependencies
+
+    Args:
+        files (dict{schema class:string}): CSV file of each schema class
+        connection_parameters (kwargs dict): pymssql connection parameters
+        rejects_path (string, optional): path of reject report. Defaults to None, no report is written.
+        batch_size (int, optional): number of rows upserted in single transaction. Defaults to 1000.
+
+    Returns:
+        dict{string:dict}: stats of each table, see import_file
+    """
+    report = RejectReport(rejects_path)
+    results = {}
+    try:
+        for schema_class in dependency_order(list(files.keys())):
+            results[schema_class.TABLE_NAME] = import_file(
+                schema_class, connection_parameters, files[schema_class], report, batch_size)
+    finally:
+        report.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='+', metavar='TABLE=FILE', help='CSV file of table')
+    parser.add_argument('--rejects', help='CSV report of rejected rows')
+    parser.add_argument('--batch-size', type=int, default=1000, help='rows upserted in single transaction')
+    parser.add_argument('--config', default=CONFIG_FILE, help='config file with connection settings')
+    args = parser.parse_args(argv)
+
+    files = {}
+    for item in args.files:
+        table_name, _, file_path = item.partition("=")
+        if(table_name not in SCHEMA_CLASSES or file_path == ""):
+            parser.error("expected TABLE=FILE with table one of {}".format(", ".join(SCHEMA_CLASSES)))
+        files[SCHEMA_CLASSES[table_name]] = file_path
+
+    results = import_files(files, load_connection_parameters(args.config, write_default=False),
+                           args.rejects, args.batch_size)
+    print(json.dumps(results, indent=2))
+    return 1 if any(stats['rejected'] > 0 for stats in results.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
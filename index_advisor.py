@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+
+"""Index advisor, recommends CREATE INDEX statements for schema classes.
+
+Every FK field (isFK or FOREIGN_KEYS) gets index, so lookups of child objects by parent
+(ex. classifications of firm) are seeks instead of scans. Query patterns recorded by
+models.QUERY_LOG (see MSSQL_APP_QUERY_LOG) add indexes for filtered columns: equality columns
+first, then first range column. Indexes covered by PK or by longer recommended index are skipped,
+as are indexes created by CREATE INDEX statements in .sql files (--sql, defaults to SQL_FILES).
+With --check, existing indexes are also read from SQL DB catalog views.
+
+Example:
+    python index_advisor.py
+    MSSQL_APP_QUERY_LOG=queries.json python gui.py
+    python index_advisor.py --query-log queries.json --check
+"""
+
+import argparse
+import os
+import sys
+from collections import OrderedDict, namedtuple
+
+from codegen import parse_indexes
+from config import CONFIG_FILE, load_connection_parameters
+from models import SCHEMA_CLASSES, MSBit, QueryLog, connect
+
+
+IndexRecommendation = namedtuple('IndexRecommendation', ['table_name', 'columns', 'reason'])
+
+# DDL files of tables, relative paths are relative to this module
+SQL_FILES = ['TronPosOdooExchangeUp.sql', 'TronPosWebClassifications.sql']
+
+EXISTING_INDEXES_QUERY = """SELECT t.name AS table_name, i.name AS index_name, c.name AS column_name
+FROM sys.indexes i
+JOIN sys.tables t ON t.object_id = i.object_id
+JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+WHERE ic.key_ordinal > 0
+ORDER BY t.name, i.name, ic.key_ordinal"""
+
+
+def index_name(table_name, columns):
+    return "IX_{}_{}".format(table_name, "_".join(columns))
+
+
+def index_ddl(recommendation):
+    """returns CREATE INDEX statement of recommendation
+
+    Args:
+        recommendation (IndexRecommendation): recommended index
+
+    Returns:
+        string: DDL with reason as comment
+    """
+    return "-- {}\nCREATE INDEX {} ON {} ({});".format(
+        recommendation.reason, index_name(recommendation.table_name, recommendation.columns),
+        recommendation.table_name, ", ".join(recommendation.columns))
+
+
+def pattern_columns(schema_class, columns):
+    """returns index key columns for query pattern: equality columns, then first range column.
+    Bit columns are least selective, so they are last of equality columns.
+
+    Args:
+        schema_class (schema class): queried class
+        columns (tuple[tuple(string, string)]): column names and kinds, see models.QueryLog
+
+    Returns:
+        tuple[string]: key columns, empty if index wouldn't be selective
+    """
+    equal = sorted({name for name, kind in columns if kind == "eq"},
+                   key=lambda name: (isinstance(schema_class.fields[name], MSBit), name))
+    ranged = [name for name, kind in columns if kind == "range" and name not in equal]
+    key_columns = tuple(equal + ranged[:1])
+    if(all(isinstance(schema_class.fields[name], MSBit) for name in key_columns)):
+        return ()
+    return key_columns
+
+
+def is_covered(columns, indexes):
+    """checks if any index has columns as leading key columns
+
+    Args:
+        columns (tuple[string]): key columns
+        indexes (list[tuple[string]]): key columns of indexes
+
+    Returns:
+        bool: True if index can be used for seek on columns
+    """
+    return any(tuple(index[:len(columns)]) == tuple(columns) for index in indexes)
+
+
+def recommend(schema_classes=None, query_log=None, min_count=1, existing=None):
+    """recommends indexes from FK metadata and query patterns
+
+    Args:
+        schema_classes (list[schema class], optional): analyzed classes. Defaults to all SCHEMA_CLASSES.
+        query_log (models.QueryLog, optional): recorded query patterns. Defaults to None, only FKs are used.
+        min_count (int, optional): min number of queries of pattern. Defaults to 1.
+        existing (dict{string:list[tuple[string]]}, optional): key columns of existing indexes of each table.
+            Defaults to None, only PK indexes are assumed.
+
+    Returns:
+        list[IndexRecommendation]: missing indexes
+    """
+    if(schema_classes is None):
+        schema_classes = list(SCHEMA_CLASSES.values())
+
+    candidates = OrderedDict()
+    for schema_class in schema_classes:
+        for field_name, field_type in schema_class.fields.items():
+            if(field_type.isFK or field_name in schema_class.FOREIGN_KEYS):
+                parent = schema_class.FOREIGN_KEYS.get(field_name, "parent table")
+                candidates[(schema_class.TABLE_NAME, (field_name,))] = "FK {}.{} -> {}, lookups of children by parent".format(
+                    schema_class.TABLE_NAME, field_name, parent)
+
+    tables = {schema_class.TABLE_NAME: schema_class for schema_class in schema_classes}
+    if(query_log is not None):
+        for table_name, columns, count in query_log.items():
+            if(table_name not in tables or count < min_count):
+                continue
+            # seek on PK is enough when PK is compared with equality
+            if((tables[table_name].GetPK()[0], "eq") in columns):
+                continue
+            key_columns = pattern_columns(tables[table_name], columns)
+            if(len(key_columns) == 0):
+                continue
+            if((table_name, key_columns) in candidates):
+                candidates[(table_name, key_columns)] += ", {} queries".format(count)
+            else:
+                candidates[(table_name, key_columns)] = "filter on {}, {} queries".format(", ".join(key_columns), count)
+
+    recommendations = []
+    for (table_name, columns), reason in candidates.items():
+        indexes = list(existing.get(table_name, [])) if existing is not None else []
+        indexes.append((tables[table_name].GetPK()[0],))
+        if(is_covered(columns, indexes)):
+            continue
+        # longer recommended index with same leading columns covers this one
+        longer = [other for other_table, other in candidates.keys()
+                  if other_table == table_name and len(other) > len(columns)]
+        if(is_covered(columns, longer)):
+            continue
+        recommendations.append(IndexRecommendation(table_name, columns, reason))
+
+    return recommendations
+
+
+def ddl_indexes(sql_files=SQL_FILES):
+    """reads key columns of indexes created in .sql files, missing files are skipped
+
+    Args:
+        sql_files (list[string], optional): DDL files. Defaults to SQL_FILES.
+
+    Returns:
+        dict{string:list[tuple[string]]}: key columns of indexes of each table
+    """
+    indexes = OrderedDict()
+    for sql_file in sql_files:
+        if(not os.path.isabs(sql_file)):
+            sql_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), sql_file)
+        if(not os.path.isfile(sql_file)):
+            continue
+        with open(sql_file, encoding="utf-8") as f:
+            for table_name, table_indexes in parse_indexes(f.read()).items():
+                indexes.setdefault(table_name, []).extend(table_indexes)
+    return indexes
+
+
+def existing_indexes(connection_parameters):
+    """reads key columns of existing indexes from catalog views
+
+    Args:
+        connection_parameters (kwargs dict): pymssql connection parameters
+
+    Returns:
+        dict{string:list[tuple[string]]}: key columns of indexes of each table
+    """
+    indexes = OrderedDict()
+    with connect(connection_parameters) as conn:
+        with conn.cursor(as_dict=True) as cursor:
+            cursor.execute(EXISTING_INDEXES_QUERY)
+            columns = OrderedDict()
+            for row in cursor.fetchall():
+                columns.setdefault((row['table_name'], row['index_name']), []).append(row['column_name'])
+            conn.commit()
+
+    for (table_name, _), index_columns in columns.items():
+        indexes.setdefault(table_name, []).append(tuple(index_columns))
+    return indexes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--query-log', help='JSON file with query patterns, see MSSQL_APP_QUERY_LOG')
+    parser.add_argument('--min-count', type=int, default=1, help='min number of queries of pattern')
+    parser.add_argument('--sql', nargs='*', default=SQL_FILES, help='DDL files whose CREATE INDEX statements exist')
+    parser.add_argument('--check', action='store_true', help='skip indexes which already exist in SQL DB')
+    parser.add_argument('--config', default=CONFIG_FILE, help='config file with connection settings')
+    args = parser.parse_args(argv)
+
+    query_log = None
+    if(args.query_log):
+        query_log = QueryLog()
+        query_log.load(args.query_log)
+
+    existing = ddl_indexes(args.sql)
+    if(args.check):
+        for table_name, indexes in existing_indexes(load_connection_parameters(args.config, write_default=False)).items():
+            existing.setdefault(table_name, []).extend(indexes)
+
+    recommendations = recommend(query_log=query_log, min_count=args.min_count, existing=existing)
+    for recommendation in recommendations:
+        print(index_ddl(recommendation))
+    if(len(recommendations) == 0):
+        print("-- no missing indexes", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+
+"""Load generator with concurrent simulated editors, run against local stand-in database (standin.py).
+
+Each editor is a thread repeating mixed workflows, same as GUI does them:
+    fetch  - ObjectView.modify_button, fetches selected object
+    modify - ObjectView.cb, fetch, change, updateObject. Increments OdooPort of shared rows,
+             so lost updates can be counted at the end
+    rename - TronPosOdooExchangeUpView.cb, PK change of object with FK objects
+    delete - ObjectView.delete_button, deletes FK objects and object, then inserts it back
+
+Modify and fetch use rows shared by all editors, rename and delete use rows owned by each editor.
+Report is JSON with throughput, latency percentiles, lost updates and lock timeout/deadlock retries.
+With --optimistic, updates and deletes check RowChID and conflicting workflows are retried.
+
+Example:
+    python loadgen.py --editors 8 --duration 10 --rtt-ms 1 --think-ms 5
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+
+import pymssql
+
+import models
+import standin
+from bench import CONNECTION_PARAMETERS, make_row, percentile
+from models import TronPosOdooExchangeUp, TronPosWebClassifications, ConcurrencyConflict
+from standin import StandInDatabase
+
+
+RETRY_ERRORS = (1205, standin.LOCK_TIMEOUT_ERROR)
+DEADLOCK_ERROR = 1205
+
+WORKFLOWS = ('fetch', 'modify', 'rename', 'delete')
+
+# id ranges of rows owned by editors, shared rows are 1..shared_rows
+OWNED_ID_START = 1000000
+OWNED_ID_STEP = 1000000
+
+
+class Editor(threading.Thread):
+    """Simulated operator editing TronPosOdooExchangeUp"""
+
+    def __init__(self, number, shared_ids, owned_ids, weights, deadline, think, max_retries, optimistic=False):
+        """Constructor
+
+        Args:
+            number (int): editor number, used for seed and owned id range
+            shared_ids (list[int]): ids of rows shared by all editors
+            owned_ids (list[int]): ids of rows owned by this editor
+            weights (dict{string:int}): weight of each workflow
+            deadline (float): time.perf_counter value when editor stops
+            think (float): seconds between fetch and save, time spent in dialog
+            max_retries (int): retries of workflow after lock timeout, deadlock or conflict
+            optimistic (bool, optional): use optimistic concurrency for updates and deletes. Defaults to False.
+        """
+        super().__init__(daemon=True)
+        self.rng = random.Random(number)
+        self.shared_ids = shared_ids
+        self.owned_ids = list(owned_ids)
+        self.next_id = OWNED_ID_START + (number + 1) * OWNED_ID_STEP
+        self.workflows = list(weights.keys())
+        self.weights = list(weights.values())
+        self.deadline = deadline
+        self.think = think
+        self.max_retries = max_retries
+        self.optimistic = optimistic
+
+        self.latencies = {name: [] for name in WORKFLOWS}
+        self.increments = {}
+        self.retries = 0
+        self.deadlocks = 0
+        self.lock_timeouts = 0
+        self.conflicts = 0
+        self.errors = 0
+
+    def run(self):
+        while(time.perf_counter() < self.deadline):
+            workflow = self.rng.choices(self.workflows, self.weights)[0]
+            start = time.perf_counter()
+            if(self.attempt(getattr(self, workflow))):
+                self.latencies[workflow].append(time.perf_counter() - start)
+
+    def attempt(self, func):
+        """runs workflow, retries it on lock timeout, deadlock or concurrency conflict
+
+        Returns:
+            bool: True if workflow finished
+        """
+        for retry in range(self.max_retries + 1):
+            try:
+                func()
+                return True
+            except ConcurrencyConflict:
+                self.conflicts += 1
+                if(retry < self.max_retries):
+                    self.retries += 1
+                continue
+            except (pymssql.Error, standin.Error) as e:
+                code = e.args[0] if e.args else None
+                if(code not in RETRY_ERRORS):
+                    self.errors += 1
+                    return False
+                if(code == DEADLOCK_ERROR):
+                    self.deadlocks += 1
+                else:
+                    self.lock_timeouts += 1
+                if(retry < self.max_retries):
+                    self.retries += 1
+                    time.sleep(self.rng.uniform(0, 0.01 * (retry + 1)))
+        self.errors += 1
+        return False
+
+    def fetch(self):
+        pk = self.rng.choice(self.shared_ids)
+        TronPosOdooExchangeUp.FetchObjectsWhere(CONNECTION_PARAMETERS, {'tpfirm_id': pk})
+
+    def modify(self):
+        pk = self.rng.choice(self.shared_ids)
+        obj = TronPosOdooExchangeUp.FetchObjectsWhere(
+            CONNECTION_PARAMETERS, {'tpfirm_id': pk})[0]
+        if(self.think > 0):
+            time.sleep(self.think)
+        obj.setField('OdooPort', obj.getField('OdooPort') + 1)
+        if(obj.updateObject(CONNECTION_PARAMETERS, self.optimistic) > 0):
+            self.increments[pk] = self.increments.get(pk, 0) + 1
+
+    def rename(self):
+        if(len(self.owned_ids) == 0):
+            return
+        index = self.rng.randrange(len(self.owned_ids))
+        obj = TronPosOdooExchangeUp.FetchObjectsWhere(
+            CONNECTION_PARAMETERS, {'tpfirm_id': self.owned_ids[index]})[0]
+        if(self.think > 0):
+            time.sleep(self.think)
+
+        new_id = self.next_id
+        self.next_id += 1
+        obj.setField('tpfirm_id', new_id)
+
+        if(len(TronPosOdooExchangeUp.FetchObjectsWhere(CONNECTION_PARAMETERS, {'tpfirm_id': new_id})) > 0):
+            return
+
+        fk_objs = TronPosWebClassifications.FetchObjectsWhere(
+            CONNECTION_PARAMETERS, {'tpfirm_id': obj.clone.getField('tpfirm_id')})
+        if(len(fk_objs) > 0):
+            obj.renameObject(CONNECTION_PARAMETERS, self.optimistic)
+        else:
+            obj.updateObject(CONNECTION_PARAMETERS, self.optimistic)
+
+        self.owned_ids[index] = new_id
+
+    def delete(self):
+        if(len(self.owned_ids) == 0):
+            return
+        index = self.rng.randrange(len(self.owned_ids))
+        obj = TronPosOdooExchangeUp.FetchObjectsWhere(
+            CONNECTION_PARAMETERS, {'tpfirm_id': self.owned_ids[index]})[0]
+
+        fk_objs = TronPosWebClassifications.FetchObjectsWhere(
+            CONNECTION_PARAMETERS, {'tpfirm_id': obj.getField('tpfirm_id')})
+        for fk_obj in fk_objs:
+            fk_obj.deleteObject(CONNECTION_PARAMETERS)
+        obj.deleteObject(CONNECTION_PARAMETERS, self.optimistic)
+
+        # keep population of owned rows
+        obj.insertObject(CONNECTION_PARAMETERS)
+        for fk_obj in fk_objs:
+            fk_obj.insertObject(CONNECTION_PARAMETERS)
+
+
+def populate(shared_rows, owned_rows, editors, children):
+    """inserts shared and owned rows with FK objects
+
+    Returns:
+        tuple(list[int], list[list[int]]): shared ids, owned ids of each editor
+    """
+    shared_ids = list(range(1, shared_rows + 1))
+    owned = [list(range(OWNED_ID_START * (number + 1), OWNED_ID_START * (number + 1) + owned_rows))
+             for number in range(editors)]
+
+    fk_id = 1
+    for pk in shared_ids + [pk for ids in owned for pk in ids]:
+        TronPosOdooExchangeUp(make_row(pk)).insertObject(CONNECTION_PARAMETERS)
+        for _ in range(children):
+            TronPosWebClassifications({
+                'id': fk_id, 'tpfirm_id': pk,
+                'TopWebClassificationGUID': 'guid-{}'.format(fk_id), 'Name': 'Class {}'.format(fk_id)
+            }).insertObject(CONNECTION_PARAMETERS)
+            fk_id += 1
+
+    return shared_ids, owned
+
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    return {
+        'count': len(latencies),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3) if latencies else 0.0
+    }
+
+
+def run(args):
+    """runs load generation
+
+    Args:
+        args (argparse.Namespace): parsed command line arguments
+
+    Returns:
+        dict: report
+    """
+    database = StandInDatabase(lock_timeout=args.lock_timeout, latency=args.rtt_ms / 1000.0)
+    database.createTables()
+    models.set_connection_factory(database.connect)
+
+    shared_ids, owned = populate(args.shared_rows, args.owned_rows, args.editors, args.children)
+    initial_ports = {pk: make_row(pk)['OdooPort'] for pk in shared_ids}
+    statements_before = database.statements
+
+    weights = {'fetch': args.fetch, 'modify': args.modify, 'rename': args.rename, 'delete': args.delete}
+    start = time.perf_counter()
+    editors = [Editor(number, shared_ids, owned[number], weights, start + args.duration,
+                      args.think_ms / 1000.0, args.max_retries, args.optimistic)
+               for number in range(args.editors)]
+    for editor in editors:
+        editor.start()
+    for editor in editors:
+        editor.join()
+    elapsed = time.perf_counter() - start
+
+    expected = sum(sum(editor.increments.values()) for editor in editors)
+    actual = sum(obj.getField('OdooPort') - initial_ports[obj.getField('tpfirm_id')]
+                 for obj in TronPosOdooExchangeUp.FetchAllObjects(CONNECTION_PARAMETERS)
+                 if obj.getField('tpfirm_id') in initial_ports)
+
+    workflows = {name: summarize([lat for editor in editors for lat in editor.latencies[name]])
+                 for name in WORKFLOWS}
+    completed = sum(item['count'] for item in workflows.values())
+
+    return {
+        'config': vars(args),
+        'elapsed_s': round(elapsed, 3),
+        'workflows_per_s': round(completed / elapsed, 1),
+        'statements_per_s': round((database.statements - statements_before) / elapsed, 1),
+        'workflows': workflows,
+        'successful_updates': expected,
+        'lost_updates': expected - actual,
+        'retries': sum(editor.retries for editor in editors),
+        'lock_timeouts': sum(editor.lock_timeouts for editor in editors),
+        'deadlocks': sum(editor.deadlocks for editor in editors),
+        'conflicts': sum(editor.conflicts for editor in editors),
+        'errors': sum(editor.errors for editor in editors)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--editors', type=int, default=8, help='number of simulated editors')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of load')
+    parser.add_argument('--shared-rows', type=int, default=20, help='rows modified by all editors')
+    parser.add_argument('--owned-rows', type=int, default=20, help='rows renamed/deleted by each editor')
+    parser.add_argument('--children', type=int, default=3, help='TronPosWebClassifications per row')
+    parser.add_argument('--think-ms', type=float, default=5.0, help='time between fetch and save')
+    parser.add_argument('--rtt-ms', type=float, default=1.0, help='simulated round trip per statement')
+    parser.add_argument('--lock-timeout', type=float, default=1.0, help='seconds before lock timeout')
+    parser.add_argument('--max-retries', type=int, default=3, help='retries after lock timeout/deadlock/conflict')
+    parser.add_argument('--optimistic', action='store_true', help='check RowChID on updates and deletes')
+    for name, weight in zip(WORKFLOWS, (40, 40, 10, 10)):
+        parser.add_argument('--' + name, type=int, default=weight, help='weight of {} workflow'.format(name))
+    parser.add_argument('--output', help='write JSON report to file instead of stdout')
+    args = parser.parse_args(argv)
+
+    output = json.dumps(run(args), indent=2)
+    if(args.output):
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
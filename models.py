@@ -2,11 +2,141 @@
 
 import copy
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 
 import pymssql
+import atexit
 import datetime
+import decimal
+import json
+import os
+import re
+import shlex
+import threading
+import uuid
 
-from collections import OrderedDict
+from collections import Counter, OrderedDict, defaultdict
+
+
+CONNECTION_FACTORY = pymssql.connect
+
+# max number of parameters in single statement, MSSQL limit is 2100
+MAX_PARAMETERS = 2000
+
+
+def set_connection_factory(factory):
+    """replaces function used for opening connections to SQL DB
+
+    Args:
+        factory (function): callable accepting pymssql connection parameters as kwargs. Defaults to pymssql.connect
+    """
+    global CONNECTION_FACTORY
+    CONNECTION_FACTORY = factory
+
+
+def connect(connection_parameters):
+    """opens connection to SQL DB
+
+    Args:
+        connection_parameters (kwargs dict): pymssql connection parameters
+
+    Returns:
+        pymssql.Connection: opened connection
+    """
+    return CONNECTION_FACTORY(**connection_parameters)
+
+
+@contextmanager
+def reuse_connection(connection_parameters, connection=None):
+    """yields given opened connection, or opens new connection that is closed at the end
+
+    Args:
+        connection_parameters (kwargs dict): pymssql connection parameters
+        connection (pymssql.Connection, optional): already opened connection, it's not closed. Defaults to None.
+    """
+    if(connection is not None):
+        yield connection
+    else:
+        with connect(connection_parameters) as conn:
+            yield conn
+
+
+class ConcurrencyConflict(Exception):
+    """Raised when optimistic update or delete finds row changed or deleted after it was fetched
+
+    Vals:
+        conflicts (list[tuple(SchemaObject, SchemaObject)]): local object and current object from SQL DB, which is None if row was deleted
+    """
+
+    def __init__(self, conflicts):
+        super().__init__("{} object(s) changed or deleted by another user".format(len(conflicts)))
+        self.conflicts = conflicts
+
+    def getCurrent(self):
+        """returns current object from SQL DB of first conflict
+
+        Returns:
+            SchemaObject: current object, None if row was deleted
+        """
+        return self.conflicts[0][1]
+
+
+class QueryLog:
+    """Counts column patterns of WHERE clauses run by model layer, used by index_advisor.py.
+    Pattern is table name and columns with kind of their condition: "eq" (=, IN, IS NULL) or
+    "range" (<, >, LIKE prefix). Conditions which can't use index (<>, LIKE contains, OR) are not counted.
+    If environment variable QUERY_LOG_ENV is set, patterns are added to that JSON file on exit.
+    """
+
+    QUERY_LOG_ENV = "MSSQL_APP_QUERY_LOG"
+
+    def __init__(self):
+        self.patterns = Counter()
+        self.lock = threading.Lock()
+
+    def record(self, table_name, columns):
+        """counts pattern
+
+        Args:
+            table_name (string): queried table
+            columns (list[tuple(string, string)]): column names and kinds of conditions
+        """
+        if(len(columns) == 0):
+            return
+        with self.lock:
+            self.patterns[(table_name, tuple(columns))] += 1
+
+    def items(self):
+        """returns counted patterns
+
+        Returns:
+            list[tuple(string, tuple, int)]: table name, columns and count, most common first
+        """
+        with self.lock:
+            return [(table_name, columns, count) for (table_name, columns), count in self.patterns.most_common()]
+
+    def load(self, file_path):
+        """adds patterns from JSON file, missing file is ignored"""
+        if(not os.path.isfile(file_path)):
+            return
+        with open(file_path, encoding="utf-8") as f:
+            for item in json.load(f):
+                with self.lock:
+                    self.patterns[(item['table'], tuple(tuple(column) for column in item['columns']))] += item['count']
+
+    def save(self, file_path):
+        """writes patterns to JSON file, together with patterns already in file"""
+        saved = QueryLog()
+        saved.load(file_path)
+        saved.patterns.update(self.patterns)
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump([{'table': table_name, 'columns': columns, 'count': count}
+                       for table_name, columns, count in saved.items()], f, indent=1)
+
+
+QUERY_LOG = QueryLog()
+if(os.environ.get(QueryLog.QUERY_LOG_ENV)):
+    atexit.register(QUERY_LOG.save, os.environ[QueryLog.QUERY_LOG_ENV])
 
 
 class MSType(ABC):
@@ -55,7 +185,55 @@ class MSType(ABC):
         Returns:
             [type]: returns current value in sql format
         """
-        return self.getValue()
+        return self.toSQL(self.getValue())
+
+    def toSQL(self, value):
+        """converts value of this type to sql format, used by getValueSQL and for rows without objects
+
+        Args:
+            value ([type]): value
+
+        Returns:
+            [type]: value in sql format
+        """
+        return value
+
+    def fromText(self, text):
+        """converts text (ex. from filter or CSV file) to value of this type
+
+        Args:
+            text (string): text
+
+        Raises:
+            ValueError: raised if text can't be converted
+
+        Returns:
+            [type]: converted value
+        """
+        return text
+
+    def toText(self, value):
+        """converts SQL value of this type to value which can be written to text file (CSV, JSON) or sqlite,
+        inverse of fromText. Types whose SQL values are not text, numbers or None convert them.
+
+        Args:
+            value ([type]): value in sql format, not None
+
+        Returns:
+            [type]: converted value
+        """
+        return value
+
+    def sortKey(self, value):
+        """returns key used for sorting SQL values of this type, NULL values are first
+
+        Args:
+            value ([type]): value in sql format
+
+        Returns:
+            tuple: sort key
+        """
+        return (value is not None, value)
 
     @ abstractmethod
     def isValueOK(self):
@@ -83,6 +261,11 @@ class MSVarchar(MSType):
         self.maxsize = maxsize
         self.DESCRIPTOR = "VARCHAR({})".format(maxsize)
 
+    def sortKey(self, value):
+        if(value is None):
+            return (False, "")
+        return (True, value.casefold())
+
     def isValueOK(self):
 
         if(self.isNull is True and self.getValue() is None):
@@ -100,6 +283,9 @@ class MSInt(MSType):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+    def fromText(self, text):
+        return int(text)
+
     def isValueOK(self):
 
         if(self.isNull is True and self.getValue() is None):
@@ -116,6 +302,16 @@ class MSBit(MSType):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+    TRUE_TEXTS = ("1", "true", "da", "yes")
+    FALSE_TEXTS = ("0", "false", "ne", "no")
+
+    def fromText(self, text):
+        if(text.strip().lower() in self.TRUE_TEXTS):
+            return True
+        if(text.strip().lower() in self.FALSE_TEXTS):
+            return False
+        raise ValueError("Not a bit value: {}".format(text))
+
     def isValueOK(self):
         if(self.isNull is True and self.getValue() is None):
             return True
@@ -124,10 +320,10 @@ class MSBit(MSType):
 
         return False
 
-    def getValueSQL(self):
-        if(self.getValue() in (True, "True", 1)):
+    def toSQL(self, value):
+        if(value in (True, "True", 1)):
             return 1
-        elif(self.getValue() in (False, "False", 0)):
+        elif(value in (False, "False", 0)):
             return 0
 
 
@@ -138,6 +334,9 @@ class MSBigInt(MSType):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+    def fromText(self, text):
+        return int(text)
+
     def isValueOK(self):
         if(self.isNull is True and self.getValue() is None):
             return True
@@ -153,6 +352,12 @@ class MSDatetime(MSType):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+    def fromText(self, text):
+        return datetime.datetime.fromisoformat(text.strip())
+
+    def toText(self, value):
+        return value.isoformat(" ")
+
     def isValueOK(self):
 
         if(self.isNull is True and self.getValue() is None):
@@ -165,11 +370,158 @@ class MSDatetime(MSType):
 
         return False
 
-    def getValueSQL(self):
-        if(isinstance(self.getValue(), datetime.date)):
-            return datetime.datetime.combine(self.getValue(), datetime.time())
+    def toSQL(self, value):
+        """dates are widened to datetime at midnight, datetime values are kept with time of day
+        (DATETIME columns hold time, truncating them lost it on every save and export)
+        """
+        if(isinstance(value, datetime.date) and not isinstance(value, datetime.datetime)):
+            return datetime.datetime.combine(value, datetime.time())
+
+        return value
+
+
+class MSDecimal(MSType):
+    """Class for MSSQL DECIMAL, NUMERIC and MONEY types, values are decimal.Decimal"""
+
+    def __init__(self, precision=18, scale=0, *args, **kwargs):
+        """Constructor
+
+        Args:
+            precision (int, optional): max number of digits. Defaults to 18.
+            scale (int, optional): number of digits after decimal point. Defaults to 0.
+        """
+        super().__init__(*args, **kwargs)
+        self.precision = precision
+        self.scale = scale
+        self.DESCRIPTOR = "DECIMAL({},{})".format(precision, scale)
+
+    def fromText(self, text):
+        try:
+            return decimal.Decimal(text.strip())
+        except decimal.InvalidOperation:
+            raise ValueError("Not a decimal value: {}".format(text))
+
+    def toText(self, value):
+        return str(value)
+
+    def isValueOK(self):
+        if(self.isNull is True and self.getValue() is None):
+            return True
+        value = self.getValue()
+        if(isinstance(value, decimal.Decimal) and not value.is_finite()):
+            return False
+        if(isinstance(value, (decimal.Decimal, int)) and not isinstance(value, bool)):
+            return abs(value) < 10 ** (self.precision - self.scale)
+        return False
+
+
+class MSFloat(MSType):
+    """Class for MSSQL FLOAT and REAL types"""
+
+    DESCRIPTOR = "FLOAT"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    def fromText(self, text):
+        return float(text)
+
+    def isValueOK(self):
+        if(self.isNull is True and self.getValue() is None):
+            return True
+        if(isinstance(self.getValue(), (float, int)) and not isinstance(self.getValue(), bool)):
+            return True
+        return False
+
+
+class MSUniqueIdentifier(MSType):
+    """Class for MSSQL UNIQUEIDENTIFIER type, values are uuid.UUID"""
+
+    DESCRIPTOR = "UNIQUEIDENTIFIER"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    def fromText(self, text):
+        return uuid.UUID(text.strip())
+
+    def toText(self, value):
+        return str(value)
+
+    def isValueOK(self):
+        if(self.isNull is True and self.getValue() is None):
+            return True
+        if(isinstance(self.getValue(), uuid.UUID)):
+            return True
+        return False
+
+
+class MSVarbinary(MSType):
+    """Class for MSSQL VARBINARY and BINARY types, values are bytes. Text form is hex, optionally with 0x prefix"""
+
+    def __init__(self, maxsize=255, *args, **kwargs):
+        """Constructor
+
+        Args:
+            maxsize (int, optional): max number of bytes. Defaults to 255.
+        """
+        super().__init__(*args, **kwargs)
+        self.maxsize = maxsize
+        self.DESCRIPTOR = "VARBINARY({})".format(maxsize)
+
+    def fromText(self, text):
+        text = text.strip()
+        if(text[:2].lower() == "0x"):
+            text = text[2:]
+        return bytes.fromhex(text)
+
+    def toText(self, value):
+        return value.hex()
+
+    def isValueOK(self):
+        if(self.isNull is True and self.getValue() is None):
+            return True
+        if(isinstance(self.getValue(), bytes) and len(self.getValue()) <= self.maxsize):
+            return True
+        return False
+
+
+def compile_statements(table_name, field_names, pk_name, version_field=None):
+    """builds statements of schema class, which don't depend on values. Used for precomputed class attributes,
+    see SchemaObject.__init_subclass__ and codegen.py.
 
-        return self.getValue()
+    Args:
+        table_name (string): name of SQL table
+        field_names (list[string]): field names in order of fields
+        pk_name (string): name of PK field, None if table has no PK
+        version_field (string, optional): name of row version field. Defaults to None.
+
+    Returns:
+        OrderedDict{string:value}: names and values of class attributes
+    """
+    statements = OrderedDict([
+        ('PK_NAME', pk_name),
+        ('FIELD_NAMES', tuple(field_names)),
+        ('INSERT_QUERY', "INSERT INTO {} ({}) VALUES ({})".format(
+            table_name, ",".join(field_names), ",".join(["%s"] * len(field_names)))),
+        ('UPDATE_QUERY', None),
+        ('UPDATE_OPTIMISTIC_QUERY', None),
+        ('DELETE_QUERY', None),
+        ('DELETE_OPTIMISTIC_QUERY', None)
+    ])
+    if(pk_name is None):
+        return statements
+
+    statements['UPDATE_QUERY'] = "UPDATE {} SET {} WHERE {}=%s".format(
+        table_name, ", ".join("{}=%s".format(name) for name in field_names), pk_name)
+    statements['DELETE_QUERY'] = "DELETE FROM {} WHERE {}=%s".format(table_name, pk_name)
+    if(version_field is not None):
+        statements['UPDATE_OPTIMISTIC_QUERY'] = "UPDATE {} SET {} WHERE {}=%s AND {}=%s".format(
+            table_name, ", ".join("{0}={0}+1".format(name) if name == version_field else "{}=%s".format(name)
+                                  for name in field_names), pk_name, version_field)
+        statements['DELETE_OPTIMISTIC_QUERY'] = "DELETE FROM {} WHERE {}=%s AND {}=%s".format(
+            table_name, pk_name, version_field)
+    return statements
 
 
 class SchemaObject(ABC):
@@ -177,8 +529,38 @@ class SchemaObject(ABC):
     
         Each inherited class should contain variable TABLE_NAME, fields as OrderedDict.
         See examples.
+
+    Vals:
+        VERSION_FIELD (string): name of row version field, used for optimistic concurrency. None if table has no such field.
+        SEARCH_FIELDS (tuple[string]): names of text fields used for search in GUI
+        SECRET_FIELDS (tuple[string]): names of fields with passwords, which can be masked in exports
+        FOREIGN_KEYS (dict{string:string}): FK field names and table names of referenced schemas
+        PK_NAME, FIELD_NAMES, *_QUERY: precomputed metadata and statements, see compile_statements
     """
 
+    VERSION_FIELD = None
+    SEARCH_FIELDS = ()
+    SECRET_FIELDS = ()
+    FOREIGN_KEYS = {}
+
+    PK_NAME = None
+    FIELD_NAMES = ()
+    INSERT_QUERY = None
+    UPDATE_QUERY = None
+    UPDATE_OPTIMISTIC_QUERY = None
+    DELETE_QUERY = None
+    DELETE_OPTIMISTIC_QUERY = None
+
+    def __init_subclass__(cls, **kwargs):
+        """precomputes metadata and statements of schema class. Generated classes (see codegen.py) already contain them."""
+        super().__init_subclass__(**kwargs)
+        if('fields' not in cls.__dict__ or 'PK_NAME' in cls.__dict__):
+            return
+
+        pk_name = next((name for name, field_type in cls.fields.items() if field_type.isPK is True), None)
+        for name, value in compile_statements(cls.TABLE_NAME, list(cls.fields.keys()), pk_name, cls.VERSION_FIELD).items():
+            setattr(cls, name, value)
+
     @classmethod
     def GetPK(baseclass):
         """Finds primary key name and associated MSType object
@@ -192,11 +574,10 @@ class SchemaObject(ABC):
         Returns:
             tuple(string, MSType): returns primary key field name, and MSType that holds value
         """
-        for field_name, field_type in baseclass.fields.items():
-            if(field_type.isPK is True):
-                return (field_name, field_type)
+        if(baseclass.PK_NAME is None):
+            raise ValueError("PK Key not defined")
 
-        raise ValueError("PK Key not defined")
+        return (baseclass.PK_NAME, baseclass.fields[baseclass.PK_NAME])
 
     def __init__(self, fields, table_name, fields_dict={}):
         """Constuctor
@@ -212,15 +593,19 @@ class SchemaObject(ABC):
             self.setField(key, value)
 
         self.TABLE_NAME = table_name
+        self.refreshClone()
+
+    def refreshClone(self):
+        """stores deep copy of current state as clone (last saved state of object). Clone has no clone."""
+        self.clone = None
         self.clone = copy.deepcopy(self)
 
     def getPK(self):
         """object version of GetPK method"""
-        for field_name, field_type in self.fields.items():
-            if(field_type.isPK is True):
-                return (field_name, field_type)
+        if(self.PK_NAME is None):
+            raise ValueError("PK Key not defined")
 
-        raise ValueError("PK Key not defined")
+        return (self.PK_NAME, self.fields[self.PK_NAME])
 
     def getPKname(self):
         """returns name of primary key field
@@ -244,7 +629,7 @@ class SchemaObject(ABC):
         Returns:
             list[string]: list of field names
         """
-        return [key for key, _ in self.fields.items()]
+        return list(self.FIELD_NAMES)
 
     def getFieldValuesSQL(self):
         """returns all values of this object in sql format
@@ -285,37 +670,111 @@ class SchemaObject(ABC):
         """
         return self.fields[name].getValue()
 
-    def updateObject(self, connection_parameters):
+    def generateUpdateQuery(self, optimistic=False):
+        """generates UPDATE query for this object. Row is matched by PK of clone (last saved state).
+
+        Args:
+            optimistic (bool, optional): if True and schema has VERSION_FIELD, row is also matched by version of clone and version is incremented. Defaults to False.
+
+        Returns:
+            tuple(string, tuple): query and its parameters
+        """
+        if(optimistic and self.VERSION_FIELD is not None):
+            field_values = [field_type.getValueSQL() for field_name, field_type in self.fields.items()
+                            if field_name != self.VERSION_FIELD]
+            field_values.append(self.clone.getPKfield().getValueSQL())
+            field_values.append(self.clone.fields[self.VERSION_FIELD].getValueSQL())
+            return (self.UPDATE_OPTIMISTIC_QUERY, tuple(field_values))
+
+        field_values = self.getFieldValuesSQL()
+        field_values.append(self.clone.getPKfield().getValueSQL())
+        return (self.UPDATE_QUERY, tuple(field_values))
+
+    def generateDeleteQuery(self, optimistic=False):
+        """generates DELETE query for this object
+
+        Args:
+            optimistic (bool, optional): if True and schema has VERSION_FIELD, row is matched by PK and version of clone. Defaults to False.
+
+        Returns:
+            tuple(string, tuple): query and its parameters
+        """
+        if(optimistic and self.VERSION_FIELD is not None):
+            return (self.DELETE_OPTIMISTIC_QUERY,
+                    (self.clone.getPKfield().getValueSQL(), self.clone.fields[self.VERSION_FIELD].getValueSQL()))
+
+        return (self.DELETE_QUERY, (self.getPKfield().getValueSQL(),))
+
+    def saved(self, optimistic=False):
+        """marks object as saved after update -> increments version if it was incremented in DB and refreshes clone
+
+        Args:
+            optimistic (bool, optional): if True, update was optimistic. Defaults to False.
+        """
+        if(optimistic and self.VERSION_FIELD is not None):
+            self.setField(self.VERSION_FIELD, self.clone.getField(self.VERSION_FIELD) + 1)
+
+        self.refreshClone()
+
+    def updateObject(self, connection_parameters, optimistic=False):
         """updates objects in SQL DB
 
         Args:
             connection_parameters (kwargs dict): pymssql connection parameters
+            optimistic (bool, optional): if True, update fails when row was changed or deleted after this object was fetched. Defaults to False.
+
+        Raises:
+            ConcurrencyConflict: raised if optimistic is used and row was changed or deleted
 
         Returns:
             int: number of updated rows
         """
-        testStr = "UPDATE {} SET".format(self.TABLE_NAME)
-
-        field_values = []
+        return self.UpdateObjects(connection_parameters, [self], optimistic)
 
-        for field_name, field_type in self.fields.items():
-            field_values.append(field_type.getValueSQL())
-            testStr += " {}=%s,".format(field_name)
+    def renameObject(self, connection_parameters, optimistic=False):
+        """saves object whose PK was changed, when other objects reference it (see FOREIGN_KEYS). In single transaction
+        row with new PK is inserted, referencing rows are moved to it and row with old PK is deleted.
 
-        testStr = testStr[:-1] + " WHERE {}=%s".format(self.getPKname())
-        field_values.append(self.clone.getPKfield().getValueSQL())
+        Args:
+            connection_parameters (kwargs dict): pymssql connection parameters
+            optimistic (bool, optional): if True, rename fails when row was changed or deleted after this object was fetched. Defaults to False.
 
-        affected_rows = 0
+        Raises:
+            ConcurrencyConflict: raised if optimistic is used and row was changed or deleted, nothing is changed
 
-        with pymssql.connect(**connection_parameters) as conn:
+        Returns:
+            int: number of inserted rows
+        """
+        old_pk = self.clone.getPKfield().getValueSQL()
+        new_pk = self.getPKfield().getValueSQL()
+        values = self.getFieldValuesSQL()
+        optimistic = optimistic and self.VERSION_FIELD is not None
+        if(optimistic):
+            values[self.FIELD_NAMES.index(self.VERSION_FIELD)] = self.clone.getField(self.VERSION_FIELD) + 1
+
+        with connect(connection_parameters) as conn:
             with conn.cursor(as_dict=True) as cursor:
-                cursor.execute(testStr, tuple(field_values))
+                cursor.execute(self.INSERT_QUERY, tuple(values))
                 affected_rows = cursor.rowcount
-                conn.commit()
-
-        self.clone = copy.deepcopy(self)
+                for schema_class in SCHEMA_CLASSES.values():
+                    for field_name, table_name in schema_class.FOREIGN_KEYS.items():
+                        if(table_name == self.TABLE_NAME):
+                            cursor.execute("UPDATE {0} SET {1}=%s WHERE {1}=%s".format(
+                                schema_class.TABLE_NAME, field_name), (new_pk, old_pk))
+
+                if(optimistic):
+                    cursor.execute(self.DELETE_OPTIMISTIC_QUERY,
+                                   (old_pk, self.clone.fields[self.VERSION_FIELD].getValueSQL()))
+                else:
+                    cursor.execute(self.DELETE_QUERY, (old_pk,))
+                if(optimistic and cursor.rowcount == 0):
+                    current = self._fetchIn(cursor, self.getPKname(), [old_pk])
+                    conn.rollback()
+                    raise ConcurrencyConflict([(self, current[0] if current else None)])
 
+                conn.commit()
 
+        self.saved(optimistic)
         return affected_rows
 
     def insertObject(self, connection_parameters):
@@ -328,38 +787,37 @@ class SchemaObject(ABC):
             int: number of affected rows
         """
 
-        leftsideQuery = "(" + (",".join(self.getFieldNames())) + ")"
-
-        rightsideQuery = self.generatePlaceholderString()
-
-        completeStr = "INSERT INTO {} {} VALUES {}".format(
-            self.TABLE_NAME, leftsideQuery, rightsideQuery)
-
         affected_rows = 0
-        with pymssql.connect(**connection_parameters) as conn:
+        with connect(connection_parameters) as conn:
             with conn.cursor(as_dict=True) as cursor:
-                cursor.execute(completeStr, tuple(self.getFieldValuesSQL()))
+                cursor.execute(self.INSERT_QUERY, tuple(self.getFieldValuesSQL()))
                 affected_rows = cursor.rowcount
                 conn.commit()
 
-        self.clone = copy.deepcopy(self)
+        self.refreshClone()
 
         return affected_rows
 
-    def deleteObject(self, connection_parameters):
+    def deleteObject(self, connection_parameters, optimistic=False):
         """deletes object from SQL DB
 
         Args:
             connection_parameters (kwargs dict): pymssql connection parameters
+            optimistic (bool, optional): if True, delete fails when row was changed or deleted after this object was fetched. Defaults to False.
+
+        Raises:
+            ConcurrencyConflict: raised if optimistic is used and row was changed or deleted
 
         Returns:
             int: number of affected rows
         """
+        if(optimistic):
+            return self.DeleteObjects(connection_parameters, [self], optimistic)
 
         # (internal?) BUG: when param is 0
         if(self.getPKfield().getValueSQL() == 0):
             affected_rows = 0
-            with pymssql.connect(**connection_parameters) as conn:
+            with connect(connection_parameters) as conn:
                 with conn.cursor(as_dict=True) as cursor:
                     cursor.execute("DELETE FROM {} WHERE {}=0".format(
                         self.TABLE_NAME, self.getPKname()))
@@ -368,13 +826,10 @@ class SchemaObject(ABC):
 
             return affected_rows
 
-        completeStr = "DELETE FROM {} WHERE {}=%s".format(
-            self.TABLE_NAME, self.getPKname())
-
         affected_rows = 0
-        with pymssql.connect(**connection_parameters) as conn:
+        with connect(connection_parameters) as conn:
             with conn.cursor(as_dict=True) as cursor:
-                cursor.execute(completeStr, self.getPKfield().getValueSQL())
+                cursor.execute(self.DELETE_QUERY, self.getPKfield().getValueSQL())
                 affected_rows = cursor.rowcount
                 conn.commit()
 
@@ -389,66 +844,1160 @@ class SchemaObject(ABC):
         return "Info"
 
     @classmethod
-    def FetchAllObjects(baseClass, connection_parameters):
-        """fetches all objects for this schema from SQL DB
+    def UpdateObjects(baseClass, connection_parameters, objects, optimistic=False):
+        """updates multiple objects in single transaction
 
         Args:
             baseClass (baseClass): inherited class
             connection_parameters (kwargs dict): pymssql connection parameters
+            objects (list): objects to update
+            optimistic (bool, optional): if True, objects with rows changed or deleted after fetch are not updated. Defaults to False.
+
+        Raises:
+            ConcurrencyConflict: raised if optimistic is used and any row was changed or deleted. Contains all conflicts, nothing is updated.
 
         Returns:
-            list: list of baseClass objects
-        """     
-        query = "SELECT * FROM {}".format(baseClass.TABLE_NAME)
+            int: number of updated rows
+        """
+        affected_rows = baseClass._executeAll(
+            connection_parameters, objects, [obj.generateUpdateQuery(optimistic) for obj in objects], optimistic)
 
-        results = []
-        with pymssql.connect(**connection_parameters) as conn:
-            with conn.cursor(as_dict=True) as cursor:
-                cursor.execute(query)
-                for row in cursor.fetchall():
-                    results.append(baseClass(row))
-                conn.commit()
+        for obj in objects:
+            obj.saved(optimistic)
 
-        return results
+        return affected_rows
 
     @classmethod
-    def FetchObjectsWhere(baseClass, connection_parameters, filter_dict):
-        """fetches all objects matching filter
+    def DeleteObjects(baseClass, connection_parameters, objects, optimistic=False):
+        """deletes multiple objects in single transaction
 
         Args:
             baseClass (baseClass): inherited class
             connection_parameters (kwargs dict): pymssql connection parameters
-            filter_dict (dict{string:value}): dict containing field names and values as filter 
+            objects (list): objects to delete
+            optimistic (bool, optional): if True, objects with rows changed or deleted after fetch are not deleted. Defaults to False.
+
+        Raises:
+            ConcurrencyConflict: raised if optimistic is used and any row was changed or deleted. Contains all conflicts, nothing is deleted.
 
         Returns:
-            list: list of baseClass objects
+            int: number of deleted rows
         """
-        query = "SELECT * FROM {} WHERE".format(baseClass.TABLE_NAME)
+        return baseClass._executeAll(
+            connection_parameters, objects, [obj.generateDeleteQuery(optimistic) for obj in objects], optimistic)
 
-        parameter_list = []
-        for key, ms_value in filter_dict.items():
-            query += " {}=%s,".format(key)
-            parameter_list.append(ms_value)
+    @classmethod
+    def DeleteObjectsWhere(baseClass, connection_parameters, conditions):
+        """deletes all objects matching filter and objects referencing them (see FOREIGN_KEYS), with set-based
+        DELETE statements in single transaction. Referencing objects are deleted first.
 
-        results = []
-        with pymssql.connect(**connection_parameters) as conn:
+        Args:
+            baseClass (baseClass): inherited class
+            connection_parameters (kwargs dict): pymssql connection parameters
+            conditions (list): filter conditions, see compile_filter. Empty list deletes all objects.
+
+        Returns:
+            dict{string:int}: number of deleted rows of each table
+        """
+        where, params = compile_filter(baseClass, conditions)
+        QUERY_LOG.record(baseClass.TABLE_NAME, filter_pattern(conditions))
+        deleted = OrderedDict()
+        with connect(connection_parameters) as conn:
+            with conn.cursor() as cursor:
+                baseClass._cascadeDelete(cursor, where, params, deleted)
+                conn.commit()
+
+        return deleted
+
+    @classmethod
+    def _cascadeDelete(baseClass, cursor, where, params, deleted):
+        """deletes rows matching WHERE clause, after rows of classes referencing them"""
+        pk_name = baseClass.GetPK()[0]
+        for schema_class in SCHEMA_CLASSES.values():
+            for field_name, table_name in schema_class.FOREIGN_KEYS.items():
+                if(table_name == baseClass.TABLE_NAME):
+                    QUERY_LOG.record(schema_class.TABLE_NAME, [(field_name, "eq")])
+                    schema_class._cascadeDelete(cursor, "WHERE {} IN (SELECT {} FROM {} {})".format(
+                        field_name, pk_name, baseClass.TABLE_NAME, where), params, deleted)
+
+        cursor.execute("DELETE FROM {} {}".format(baseClass.TABLE_NAME, where), params)
+        deleted[baseClass.TABLE_NAME] = deleted.get(baseClass.TABLE_NAME, 0) + cursor.rowcount
+
+    @classmethod
+    def UpdateObjectsByPK(baseClass, connection_parameters, pks, field_values):
+        """sets same values of fields to all objects with given PKs, with set-based UPDATE statements in single transaction.
+        Version field is incremented, unless it's set.
+
+        Args:
+            baseClass (baseClass): inherited class
+            connection_parameters (kwargs dict): pymssql connection parameters
+            pks (list): PKs of updated objects
+            field_values (dict{string:value}): field names and SQL values, PK can't be changed
+
+        Raises:
+            ValueError: raised if field doesn't exist or it's PK
+
+        Returns:
+            int: number of updated rows
+        """
+        pk_name = baseClass.GetPK()[0]
+        for field_name in field_values.keys():
+            if(field_name not in baseClass.fields or field_name == pk_name):
+                raise ValueError("Field {} can't be updated".format(field_name))
+
+        assignments = ["{}=%s".format(field_name) for field_name in field_values.keys()]
+        if(baseClass.VERSION_FIELD is not None and baseClass.VERSION_FIELD not in field_values):
+            assignments.append("{0}={0}+1".format(baseClass.VERSION_FIELD))
+        query = "UPDATE {} SET {} WHERE {} IN ".format(baseClass.TABLE_NAME, ",".join(assignments), pk_name)
+
+        pks = list(pks)
+        chunk_size = max(1, min(1000, MAX_PARAMETERS - len(field_values)))
+        affected_rows = 0
+        with connect(connection_parameters) as conn:
             with conn.cursor(as_dict=True) as cursor:
-                cursor.execute(query[:-1], tuple(parameter_list))
-                for row in cursor.fetchall():
-                    results.append(baseClass(row))
+                for start in range(0, len(pks), chunk_size):
+                    chunk = pks[start:start + chunk_size]
+                    cursor.execute(query + "(" + ",".join(["%s" for _ in chunk]) + ")",
+                                   tuple(field_values.values()) + tuple(chunk))
+                    affected_rows += cursor.rowcount
                 conn.commit()
 
-        return results
+        return affected_rows
 
+    @classmethod
+    def FetchObjectsByPK(baseClass, connection_parameters, pks, connection=None):
+        """fetches objects with given PKs, with IN queries
 
-class TronPosOdooExchangeUp(SchemaObject):
+        Args:
+            baseClass (baseClass): inherited class
+            connection_parameters (kwargs dict): pymssql connection parameters
+            pks (list): PKs of objects
+            connection (pymssql.Connection, optional): already opened connection to use. Defaults to None.
 
-    """Schema class for TronPosOdooExchangeUp"""
+        Returns:
+            list: list of baseClass objects, deleted objects are missing
+        """
+        with reuse_connection(connection_parameters, connection) as conn:
+            with conn.cursor(as_dict=True) as cursor:
+                results = baseClass._fetchIn(cursor, baseClass.GetPK()[0], pks)
+                conn.commit()
 
-    TABLE_NAME = "TronPosOdooExchangeUp"
+        return results
 
-    fields = OrderedDict([
-        ('tpfirm_id', MSInt(isPK=True)),
+    @classmethod
+    def _executeAll(baseClass, connection_parameters, objects, queries, optimistic):
+        """executes query for each object in single transaction, collects conflicts if optimistic"""
+        affected_rows = 0
+        stale = []
+
+        with connect(connection_parameters) as conn:
+            with conn.cursor(as_dict=True) as cursor:
+                for obj, (query, params) in zip(objects, queries):
+                    cursor.execute(query, params)
+                    if(cursor.rowcount == 0):
+                        stale.append(obj)
+                    affected_rows += cursor.rowcount
+
+                if(optimistic and len(stale) > 0):
+                    current = {obj.getField(obj.getPKname()): obj for obj in baseClass._fetchIn(
+                        cursor, baseClass.GetPK()[0], [obj.clone.getPKfield().getValueSQL() for obj in stale])}
+                    conn.rollback()
+                    raise ConcurrencyConflict(
+                        [(obj, current.get(obj.clone.getPKfield().getValueSQL())) for obj in stale])
+
+                conn.commit()
+
+        return affected_rows
+
+    @classmethod
+    def _fetchIn(baseClass, cursor, field_name, values, chunk_size=1000):
+        """fetches objects with field value in values, using opened cursor"""
+        values = list(values)
+        results = []
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start:start + chunk_size]
+            QUERY_LOG.record(baseClass.TABLE_NAME, [(field_name, "eq")])
+            cursor.execute("SELECT * FROM {} WHERE {} IN ({})".format(
+                baseClass.TABLE_NAME, field_name, ",".join(["%s" for _ in chunk])), tuple(chunk))
+            for row in cursor.fetchall():
+                results.append(baseClass(row))
+        return results
+
+    @classmethod
+    def _existingKeys(baseClass, cursor, field_name, values, chunk_size=1000, lock=False):
+        """returns values of field which exist in table, using opened cursor. With lock, checked keys stay
+        locked until end of transaction (UPDLOCK, HOLDLOCK also locks missing keys), so other transaction
+        can't insert or delete them in between."""
+        values = list(values)
+        existing = set()
+        hints = " WITH (UPDLOCK, HOLDLOCK)" if lock else ""
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start:start + chunk_size]
+            QUERY_LOG.record(baseClass.TABLE_NAME, [(field_name, "eq")])
+            cursor.execute("SELECT {0} AS value FROM {1}{3} WHERE {0} IN ({2})".format(
+                field_name, baseClass.TABLE_NAME, ",".join(["%s" for _ in chunk]), hints), tuple(chunk))
+            existing.update(row['value'] for row in cursor.fetchall())
+        return existing
+
+    @classmethod
+    def UpsertValues(baseClass, cursor, rows):
+        """inserts new rows and updates existing rows (matched by PK) using opened cursor, transaction is not committed.
+        New rows are inserted with multi-row INSERT statements of at most MAX_PARAMETERS parameters.
+        Version field of updated rows is incremented, so optimistic updates of other users fail.
+
+        Args:
+            baseClass (baseClass): inherited class
+            cursor (pymssql.Cursor): opened cursor with as_dict
+            rows (list[list]): SQL values in order of fields, with unique PKs
+
+        Returns:
+            tuple(int, int): number of inserted and updated rows
+        """
+        field_names = list(baseClass.fields.keys())
+        pk_name = baseClass.GetPK()[0]
+        pk_index = field_names.index(pk_name)
+
+        # keys are locked, so rows can't be inserted or deleted by other transaction before INSERT/UPDATE
+        existing = baseClass._existingKeys(cursor, pk_name, [row[pk_index] for row in rows], lock=True)
+        new_rows = [row for row in rows if row[pk_index] not in existing]
+        old_rows = [row for row in rows if row[pk_index] in existing]
+
+        rows_per_insert = max(1, min(1000, MAX_PARAMETERS // len(field_names)))
+        placeholders = "(" + ",".join(["%s" for _ in field_names]) + ")"
+        for start in range(0, len(new_rows), rows_per_insert):
+            chunk = new_rows[start:start + rows_per_insert]
+            cursor.execute("INSERT INTO {} ({}) VALUES {}".format(
+                baseClass.TABLE_NAME, ",".join(field_names), ",".join([placeholders] * len(chunk))),
+                tuple(value for row in chunk for value in row))
+
+        if(len(old_rows) > 0):
+            assignments = []
+            positions = []
+            for i, field_name in enumerate(field_names):
+                if(field_name == pk_name):
+                    continue
+                if(field_name == baseClass.VERSION_FIELD):
+                    assignments.append("{0}={0}+1".format(field_name))
+                    continue
+                assignments.append("{}=%s".format(field_name))
+                positions.append(i)
+            cursor.executemany("UPDATE {} SET {} WHERE {}=%s".format(
+                baseClass.TABLE_NAME, ",".join(assignments), pk_name),
+                [tuple(row[i] for i in positions) + (row[pk_index],) for row in old_rows])
+
+        return (len(new_rows), len(old_rows))
+
+    @classmethod
+    def FetchAllObjects(baseClass, connection_parameters, connection=None):
+        """fetches all objects for this schema from SQL DB
+
+        Args:
+            baseClass (baseClass): inherited class
+            connection_parameters (kwargs dict): pymssql connection parameters
+            connection (pymssql.Connection, optional): already opened connection to use. Defaults to None.
+
+        Returns:
+            list: list of baseClass objects
+        """     
+        query = "SELECT * FROM {}".format(baseClass.TABLE_NAME)
+
+        results = []
+        with reuse_connection(connection_parameters, connection) as conn:
+            with conn.cursor(as_dict=True) as cursor:
+                cursor.execute(query)
+                for row in cursor.fetchall():
+                    results.append(baseClass(row))
+                conn.commit()
+
+        return results
+
+    @classmethod
+    def IterAllObjects(baseClass, connection_parameters, chunk_size=500, connection=None):
+        """fetches all objects for this schema in chunks, objects are created while rows are still being received
+
+        Args:
+            baseClass (baseClass): inherited class
+            connection_parameters (kwargs dict): pymssql connection parameters
+            chunk_size (int, optional): max number of objects in chunk. Defaults to 500.
+            connection (pymssql.Connection, optional): already opened connection to use. Defaults to None.
+
+        Yields:
+            list: list of baseClass objects
+        """
+        query = "SELECT * FROM {}".format(baseClass.TABLE_NAME)
+
+        with reuse_connection(connection_parameters, connection) as conn:
+            with conn.cursor(as_dict=True) as cursor:
+                cursor.execute(query)
+                while(True):
+                    rows = cursor.fetchmany(chunk_size)
+                    if(len(rows) == 0):
+                        break
+                    yield [baseClass(row) for row in rows]
+                conn.commit()
+
+    @classmethod
+    def CountObjects(baseClass, connection_parameters, connection=None):
+        """counts all objects for this schema in SQL DB
+
+        Args:
+            baseClass (baseClass): inherited class
+            connection_parameters (kwargs dict): pymssql connection parameters
+            connection (pymssql.Connection, optional): already opened connection to use. Defaults to None.
+
+        Returns:
+            int: number of rows in table
+        """
+        with reuse_connection(connection_parameters, connection) as conn:
+            with conn.cursor(as_dict=True) as cursor:
+                cursor.execute("SELECT COUNT(*) AS count FROM {}".format(baseClass.TABLE_NAME))
+                count = cursor.fetchone()['count']
+                conn.commit()
+
+        return count
+
+    @classmethod
+    def FetchObjectsWhere(baseClass, connection_parameters, filter_dict, connection=None):
+        """fetches all objects matching filter
+
+        Args:
+            baseClass (baseClass): inherited class
+            connection_parameters (kwargs dict): pymssql connection parameters
+            filter_dict (dict{string:value}): dict containing field names and values as filter 
+            connection (pymssql.Connection, optional): already opened connection to use. Defaults to None.
+
+        Returns:
+            list: list of baseClass objects
+        """
+        query, parameters = baseClass.generateWhereQuery(filter_dict)
+        QUERY_LOG.record(baseClass.TABLE_NAME, [(key, "eq") for key in filter_dict.keys()])
+
+        results = []
+        with reuse_connection(connection_parameters, connection) as conn:
+            with conn.cursor(as_dict=True) as cursor:
+                cursor.execute(query, parameters)
+                for row in cursor.fetchall():
+                    results.append(baseClass(row))
+                conn.commit()
+
+        return results
+
+    @classmethod
+    def IterObjectsWhere(baseClass, connection_parameters, filter_dict, chunk_size=500, connection=None):
+        """fetches all objects matching filter in chunks, objects are created while rows are still being received
+
+        Args:
+            baseClass (baseClass): inherited class
+            connection_parameters (kwargs dict): pymssql connection parameters
+            filter_dict (dict{string:value}): dict containing field names and values as filter
+            chunk_size (int, optional): max number of objects in chunk. Defaults to 500.
+            connection (pymssql.Connection, optional): already opened connection to use. Defaults to None.
+
+        Yields:
+            list: list of baseClass objects
+        """
+        query, parameters = baseClass.generateWhereQuery(filter_dict)
+        QUERY_LOG.record(baseClass.TABLE_NAME, [(key, "eq") for key in filter_dict.keys()])
+
+        with reuse_connection(connection_parameters, connection) as conn:
+            with conn.cursor(as_dict=True) as cursor:
+                cursor.execute(query, parameters)
+                while(True):
+                    rows = cursor.fetchmany(chunk_size)
+                    if(len(rows) == 0):
+                        break
+                    yield [baseClass(row) for row in rows]
+                conn.commit()
+
+    @classmethod
+    def IterValues(baseClass, connection_parameters, conditions=(), chunk_size=500, connection=None):
+        """fetches SQL values of objects in chunks without creating objects, used for streaming large tables.
+        Values are converted with MSType.toSQL, same as getFieldValuesSQL of fetched objects.
+
+        Args:
+            baseClass (baseClass): inherited class
+            connection_parameters (kwargs dict): pymssql connection parameters
+            conditions (list, optional): filter conditions, see compile_filter. Defaults to (), all objects.
+            chunk_size (int, optional): max number of rows in chunk. Defaults to 500.
+            connection (pymssql.Connection, optional): already opened connection to use. Defaults to None.
+
+        Yields:
+            list[list]: values of each row in order of fields
+        """
+        where, parameters = compile_filter(baseClass, conditions)
+        query = "SELECT {} FROM {} {}".format(",".join(baseClass.fields.keys()), baseClass.TABLE_NAME, where)
+        # only fields whose type changes values are converted
+        converters = [(i, field_type.toSQL) for i, field_type in enumerate(baseClass.fields.values())
+                      if type(field_type).toSQL is not MSType.toSQL]
+
+        with reuse_connection(connection_parameters, connection) as conn:
+            with conn.cursor() as cursor:
+                QUERY_LOG.record(baseClass.TABLE_NAME, filter_pattern(conditions))
+                cursor.execute(query, parameters)
+                while(True):
+                    rows = [list(row) for row in cursor.fetchmany(chunk_size)]
+                    if(len(rows) == 0):
+                        break
+                    for row in rows:
+                        for i, convert in converters:
+                            row[i] = convert(row[i])
+                    yield rows
+                conn.commit()
+
+    @classmethod
+    def generateWhereQuery(baseClass, filter_dict):
+        """generates SELECT query for objects matching all values in filter
+
+        Args:
+            baseClass (baseClass): inherited class
+            filter_dict (dict{string:value}): dict containing field names and values as filter
+
+        Returns:
+            tuple(string, tuple): query and its parameters
+        """
+        query = "SELECT * FROM {} WHERE ".format(baseClass.TABLE_NAME)
+        query += " AND ".join("{}=%s".format(key) for key in filter_dict.keys())
+
+        return (query, tuple(filter_dict.values()))
+
+
+FILTER_OPERATORS = ("=", "!=", "<", "<=", ">", ">=", "prefix", "contains", "in")
+
+
+def escape_like(text):
+    """escapes LIKE wildcards in text, used with ESCAPE '\\'
+
+    Args:
+        text (string): text
+
+    Returns:
+        string: escaped text
+    """
+    for char in ("\\", "%", "_", "["):
+        text = text.replace(char, "\\" + char)
+    return text
+
+
+def compile_filter(schema_class, conditions):
+    """compiles filter conditions to parameterized WHERE clause. Conditions are joined with AND.
+
+    Args:
+        schema_class (schema class): class of filtered objects
+        conditions (list[tuple(string or tuple[string], string, value)]): field name, operator from FILTER_OPERATORS and value.
+            If tuple of field names is given, condition matches when it matches any of fields. Value of "in" is list of values.
+
+    Raises:
+        ValueError: raised if field or operator is not known
+
+    Returns:
+        tuple(string, tuple): WHERE clause (empty string if there are no conditions) and its parameters
+    """
+    parts = []
+    params = []
+    for field_names, operator, value in conditions:
+        if(isinstance(field_names, str)):
+            field_names = (field_names,)
+        if(operator not in FILTER_OPERATORS):
+            raise ValueError("Unknown operator {}".format(operator))
+
+        alternatives = []
+        for field_name in field_names:
+            if(field_name not in schema_class.fields):
+                raise ValueError("Unknown field {}".format(field_name))
+            if(operator == "prefix"):
+                alternatives.append("{} LIKE %s ESCAPE '\\'".format(field_name))
+                params.append(escape_like(value) + "%")
+            elif(operator == "contains"):
+                alternatives.append("{} LIKE %s ESCAPE '\\'".format(field_name))
+                params.append("%" + escape_like(value) + "%")
+            elif(operator == "in"):
+                values = list(value)
+                alternatives.append("{} IN ({})".format(field_name, ",".join(["%s"] * len(values))) if values else "1=0")
+                params.extend(values)
+            elif(value is None):
+                alternatives.append("{} IS {}NULL".format(field_name, "NOT " if operator == "!=" else ""))
+            else:
+                alternatives.append("{} {} %s".format(field_name, "<>" if operator == "!=" else operator))
+                params.append(value)
+
+        parts.append("(" + " OR ".join(alternatives) + ")")
+
+    if(len(parts) == 0):
+        return ("", ())
+    return ("WHERE " + " AND ".join(parts), tuple(params))
+
+
+def filter_pattern(conditions):
+    """returns QueryLog pattern of filter conditions, conditions which can't use index are left out.
+    Pattern is recorded by caller each time query with compiled filter is executed.
+
+    Args:
+        conditions (list): filter conditions, see compile_filter
+
+    Returns:
+        list[tuple(string, string)]: column names and kinds of conditions
+    """
+    pattern = []
+    for field_names, operator, value in conditions:
+        if(isinstance(field_names, str)):
+            field_names = (field_names,)
+        if(len(field_names) == 1 and operator not in ("!=", "contains")):
+            pattern.append((field_names[0], "eq" if operator in ("=", "in") else "range"))
+    return pattern
+
+
+def parse_filter_text(schema_class, text, search_fields=None):
+    """parses filter text to filter conditions (see compile_filter).
+
+    Words like field=value, field!=value, field>=value, field<value or field:value are conditions on field,
+    value is converted with MSType.fromText and NULL matches NULL. Other words, also words like http://x whose
+    part before operator is not a field, must be prefix of any search field. Values with spaces can be quoted.
+
+    Args:
+        schema_class (schema class): class of filtered objects
+        text (string): filter text, ex. 'tpfirmActive=1 recDate>=2020-01-01 odoo'
+        search_fields (list[string], optional): fields searched by plain words. Defaults to SEARCH_FIELDS of schema.
+
+    Raises:
+        ValueError: raised if value can't be converted or word is searched, but there are no search fields
+
+    Returns:
+        list: conditions
+    """
+    if(search_fields is None):
+        search_fields = schema_class.SEARCH_FIELDS
+
+    conditions = []
+    for word in shlex.split(text):
+        match = re.match(r"^(\w+)(!=|<=|>=|=|<|>|:)(.*)$", word)
+        if(match is None or match.group(1) not in schema_class.fields):
+            if(len(search_fields) == 0):
+                raise ValueError("No search fields")
+            conditions.append((tuple(search_fields), "prefix", word))
+            continue
+
+        field_name, operator, value = match.groups()
+        if(operator == ":"):
+            operator = "="
+        if(value.upper() == "NULL"):
+            value = None
+        else:
+            value = schema_class.fields[field_name].fromText(value)
+            if(isinstance(schema_class.fields[field_name], MSBit)):
+                value = 1 if value else 0
+        conditions.append((field_name, operator, value))
+
+    return conditions
+
+
+class ObjectPageSource:
+    """Source of objects in pages, used when table is too large to be loaded at once.
+    Pages are fetched with OFFSET/FETCH on demand and last used pages are cached.
+    Queries use single connection, which is kept open until close. Pages can be fetched in background
+    thread, while main thread reads cached pages with cachedRows. Cache has its own lock, so reading it
+    doesn't wait for running query.
+    """
+
+    def __init__(self, schema_class, connection_parameters, page_size=200, cache_pages=20):
+        """Constructor
+
+        Args:
+            schema_class (schema class): class of fetched objects
+            connection_parameters (kwargs dict): pymssql connection parameters
+            page_size (int, optional): number of objects in page. Defaults to 200.
+            cache_pages (int, optional): max number of cached pages. Defaults to 20.
+        """
+        self.schema_class = schema_class
+        self.connection_parameters = connection_parameters
+        self.page_size = page_size
+        self.cache_pages = cache_pages
+        self.order_by = schema_class.GetPK()[0]
+        self.reverse = False
+        self.pages = OrderedDict()
+        self.total = None
+        self.conditions = []
+        self.where = ("", ())
+        self.pattern = []
+        self.connection = None
+        self.lock = threading.Lock()
+        self.pages_lock = threading.Lock()
+        self.generation = 0
+
+    def withFilter(self, conditions):
+        """returns new page source with same ordering, which returns only objects matching filter
+
+        Args:
+            conditions (list): filter conditions, see compile_filter
+
+        Returns:
+            ObjectPageSource: filtered page source
+        """
+        source = ObjectPageSource(self.schema_class, self.connection_parameters, self.page_size, self.cache_pages)
+        source.order_by = self.order_by
+        source.reverse = self.reverse
+        source.conditions = conditions
+        source.where = compile_filter(self.schema_class, conditions)
+        source.pattern = filter_pattern(conditions)
+        return source
+
+    def query(self, query, params):
+        """runs query on connection of page source, connection is opened on first query
+        and reopened after error
+
+        Args:
+            query (string): query with pymssql placeholders
+            params (tuple): query parameters
+
+        Returns:
+            list[dict]: fetched rows
+        """
+        with self.lock:
+            if(self.connection is None):
+                self.connection = connect(self.connection_parameters)
+            try:
+                with self.connection.cursor(as_dict=True) as cursor:
+                    cursor.execute(query, params)
+                    rows = cursor.fetchall()
+                self.connection.commit()
+            except Exception:
+                self.connection.close()
+                self.connection = None
+                raise
+        return rows
+
+    def close(self):
+        """closes connection of page source, next query opens new one"""
+        with self.lock:
+            if(self.connection is not None):
+                self.connection.close()
+                self.connection = None
+
+    def invalidate(self):
+        """drops cached pages and count, called when objects in SQL DB were changed"""
+        with self.pages_lock:
+            self.pages.clear()
+            self.generation += 1
+            self.total = None
+
+    def setOrder(self, field_name, reverse=False):
+        """sets ordering of objects
+
+        Args:
+            field_name (string): name of field to order by
+            reverse (bool, optional): if True, descending order. Defaults to False.
+
+        Raises:
+            ValueError: raised if field doesn't exist
+        """
+        if(field_name not in self.schema_class.fields):
+            raise ValueError("Unknown field {}".format(field_name))
+        with self.pages_lock:
+            self.order_by = field_name
+            self.reverse = reverse
+            self.pages.clear()
+            self.generation += 1
+
+    def count(self):
+        """returns number of objects
+
+        Returns:
+            int: number of objects
+        """
+        if(self.total is None):
+            QUERY_LOG.record(self.schema_class.TABLE_NAME, self.pattern)
+            self.total = self.query("SELECT COUNT(*) AS count FROM {} {}".format(
+                self.schema_class.TABLE_NAME, self.where[0]), self.where[1])[0]['count']
+        return self.total
+
+    def orderClause(self):
+        """generates ORDER BY clause, PK is added so order is stable
+
+        Returns:
+            string: ORDER BY clause
+        """
+        direction = "DESC" if self.reverse else "ASC"
+        pk_name = self.schema_class.GetPK()[0]
+        clause = "ORDER BY {} {}".format(self.order_by, direction)
+        if(self.order_by != pk_name):
+            clause += ", {} {}".format(pk_name, direction)
+        return clause
+
+    def getPage(self, number):
+        """returns page of objects, fetches it if it's not cached
+
+        Args:
+            number (int): page number, starting with 0
+
+        Returns:
+            list: objects in page
+        """
+        with self.pages_lock:
+            if(number in self.pages):
+                self.pages.move_to_end(number)
+                return self.pages[number]
+            generation = self.generation
+            query = "SELECT * FROM {} {} {} OFFSET %s ROWS FETCH NEXT %s ROWS ONLY".format(
+                self.schema_class.TABLE_NAME, self.where[0], self.orderClause())
+
+        QUERY_LOG.record(self.schema_class.TABLE_NAME, self.pattern)
+        page = [self.schema_class(row) for row in
+                self.query(query, self.where[1] + (number * self.page_size, self.page_size))]
+
+        with self.pages_lock:
+            # page fetched before invalidate or setOrder is returned, but not cached
+            if(generation == self.generation):
+                self.pages[number] = page
+                if(len(self.pages) > self.cache_pages):
+                    self.pages.popitem(last=False)
+
+        return page
+
+    def getRows(self, start, stop):
+        """returns objects at positions start..stop-1
+
+        Args:
+            start (int): position of first object
+            stop (int): position after last object
+
+        Returns:
+            list: objects
+        """
+        start = max(start, 0)
+        if(stop <= start):
+            return []
+
+        objects = []
+        first_page = start // self.page_size
+        for number in range(first_page, (stop - 1) // self.page_size + 1):
+            page = self.getPage(number)
+            objects.extend(page)
+            if(len(page) < self.page_size):
+                break
+
+        offset = start - first_page * self.page_size
+        return objects[offset:offset + stop - start]
+
+    def cachedRows(self, start, stop):
+        """returns objects at positions start..stop-1 if all their pages are cached, nothing is fetched
+
+        Args:
+            start (int): position of first object
+            stop (int): position after last object
+
+        Returns:
+            list: objects, None if any page is not cached
+        """
+        start = max(start, 0)
+        if(stop <= start):
+            return []
+
+        objects = []
+        first_page = start // self.page_size
+        with self.pages_lock:
+            for number in range(first_page, (stop - 1) // self.page_size + 1):
+                page = self.pages.get(number)
+                if(page is None):
+                    return None
+                objects.extend(page)
+                if(len(page) < self.page_size):
+                    break
+
+        offset = start - first_page * self.page_size
+        return objects[offset:offset + stop - start]
+
+
+class ChangeTracker:
+    """Detects objects inserted, changed or deleted in SQL DB by other users since last check.
+
+    Each poll first runs cheap probe (count and CHECKSUM_AGG of row checksums), only when probe differs
+    row versions are fetched and compared with previous ones, and only changed objects are fetched.
+    Row version is BINARY_CHECKSUM of all fields, RowChID alone is not enough, because it's not
+    incremented by every writer. Because checksum aggregate can miss changes, full comparison is
+    also done every FULL_CHECK_EVERY polls.
+    """
+
+    FULL_CHECK_EVERY = 10
+
+    def __init__(self, schema_class, connection_parameters, conditions=()):
+        """Constructor
+
+        Args:
+            schema_class (schema class): class of tracked objects
+            connection_parameters (kwargs dict): pymssql connection parameters
+            conditions (list, optional): filter conditions of tracked objects, see compile_filter. Defaults to (), all objects.
+        """
+        self.schema_class = schema_class
+        self.connection_parameters = connection_parameters
+        self.conditions = list(conditions)
+        self.where = compile_filter(schema_class, self.conditions)
+        self.pattern = filter_pattern(self.conditions)
+        self.pk_name = schema_class.GetPK()[0]
+        self.version_expression = "BINARY_CHECKSUM({})".format(",".join(schema_class.fields.keys()))
+        self.state = None
+        self.versions = None
+        self.polls = 0
+
+    def probe(self, cursor):
+        """returns number of tracked rows and aggregate of their checksums
+
+        Args:
+            cursor (pymssql.Cursor): opened cursor with as_dict
+
+        Returns:
+            tuple(int, int): count and checksum
+        """
+        QUERY_LOG.record(self.schema_class.TABLE_NAME, self.pattern)
+        cursor.execute("SELECT COUNT(*) AS count, CHECKSUM_AGG({}) AS checksum FROM {} {}".format(
+            self.version_expression, self.schema_class.TABLE_NAME, self.where[0]), self.where[1])
+        row = cursor.fetchone()
+        return (row['count'], row['checksum'])
+
+    def fetchVersions(self, cursor):
+        """returns versions of all tracked rows
+
+        Args:
+            cursor (pymssql.Cursor): opened cursor with as_dict
+
+        Returns:
+            dict{value:int}: PK and version of each row
+        """
+        QUERY_LOG.record(self.schema_class.TABLE_NAME, self.pattern)
+        cursor.execute("SELECT {} AS pk, {} AS version FROM {} {}".format(
+            self.pk_name, self.version_expression, self.schema_class.TABLE_NAME, self.where[0]), self.where[1])
+        return {row['pk']: row['version'] for row in cursor.fetchall()}
+
+    def reset(self, connection=None, versions=True):
+        """takes current state of tracked rows as baseline, should be called before tracked objects are fetched
+
+        Args:
+            connection (pymssql.Connection, optional): already opened connection to use. Defaults to None.
+            versions (bool, optional): if False, only probe is stored and only hasChanged can be used. Defaults to True.
+        """
+        with reuse_connection(self.connection_parameters, connection) as conn:
+            with conn.cursor(as_dict=True) as cursor:
+                self.state = self.probe(cursor)
+                self.versions = self.fetchVersions(cursor) if versions else None
+                conn.commit()
+        self.polls = 0
+
+    def restore(self, versions):
+        """uses earlier stored versions as baseline, ex. versions of objects loaded from local snapshot.
+        First poll then compares all versions and returns objects changed since versions were stored.
+
+        Args:
+            versions (dict{value:int}): PK and version of each row
+        """
+        self.state = None
+        self.versions = dict(versions)
+        self.polls = 0
+
+    def iterObjects(self, chunk_size=500, connection=None):
+        """takes baseline and fetches tracked objects in chunks, so no change after fetch is missed
+
+        Args:
+            chunk_size (int, optional): max number of objects in chunk. Defaults to 500.
+            connection (pymssql.Connection, optional): already opened connection to use. Defaults to None.
+
+        Yields:
+            list: list of tracked objects
+        """
+        with reuse_connection(self.connection_parameters, connection) as conn:
+            self.reset(connection=conn)
+            with conn.cursor(as_dict=True) as cursor:
+                QUERY_LOG.record(self.schema_class.TABLE_NAME, self.pattern)
+                cursor.execute("SELECT * FROM {} {}".format(
+                    self.schema_class.TABLE_NAME, self.where[0]), self.where[1])
+                while(True):
+                    rows = cursor.fetchmany(chunk_size)
+                    if(len(rows) == 0):
+                        break
+                    yield [self.schema_class(row) for row in rows]
+                conn.commit()
+
+    def hasChanged(self, connection=None):
+        """checks only probe, used when tracked rows are too many to keep their versions
+
+        Args:
+            connection (pymssql.Connection, optional): already opened connection to use. Defaults to None.
+
+        Returns:
+            bool: True if probe differs from last check
+        """
+        with reuse_connection(self.connection_parameters, connection) as conn:
+            with conn.cursor(as_dict=True) as cursor:
+                state = self.probe(cursor)
+                conn.commit()
+
+        changed = state != self.state
+        self.state = state
+        return changed
+
+    def poll(self, connection=None):
+        """finds changes since last poll or reset
+
+        Args:
+            connection (pymssql.Connection, optional): already opened connection to use. Defaults to None.
+
+        Returns:
+            tuple(list, list): inserted or changed objects and PKs of deleted objects
+        """
+        self.polls += 1
+        with reuse_connection(self.connection_parameters, connection) as conn:
+            with conn.cursor(as_dict=True) as cursor:
+                state = self.probe(cursor)
+                if(state == self.state and self.polls % self.FULL_CHECK_EVERY != 0):
+                    conn.commit()
+                    return ([], [])
+
+                versions = self.fetchVersions(cursor)
+                changed = [pk for pk, version in versions.items() if self.versions.get(pk) != version]
+                deleted = [pk for pk in self.versions if pk not in versions]
+                objects = self.schema_class._fetchIn(cursor, self.pk_name, changed)
+                conn.commit()
+
+        self.state = state
+        self.versions = versions
+        return (objects, deleted)
+
+
+class RowStore:
+    """In-memory store of SQL values of loaded objects, keyed by string of PK.
+    Keeps display order and caches sort keys of each sorted field.
+    """
+
+    def __init__(self, schema_class):
+        """Constructor
+
+        Args:
+            schema_class (schema class): class of stored objects
+        """
+        self.schema_class = schema_class
+        self.field_names = list(schema_class.fields.keys())
+        self.rows = {}
+        self.order = []
+        self.sort_keys = {}
+        self.indexes = []
+
+    def addIndex(self, index):
+        """adds index, which is updated whenever objects are changed. Already stored objects are indexed.
+
+        Args:
+            index (SearchIndex): index
+        """
+        for key, values in self.rows.items():
+            index.add(key, values)
+        self.indexes.append(index)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def get(self, key):
+        """returns SQL values of object
+
+        Args:
+            key (string): key of object
+
+        Returns:
+            list: values in order of fields
+        """
+        return self.rows[key]
+
+    def put(self, key, values):
+        """adds or replaces values of object. New objects are added at the end of order.
+
+        Args:
+            key (string): key of object
+            values (list): SQL values in order of fields
+        """
+        if(key not in self.rows):
+            self.order.append(key)
+        self.rows[key] = values
+
+        for index in self.indexes:
+            index.add(key, values)
+
+        for field_name, keys in self.sort_keys.items():
+            index = self.field_names.index(field_name)
+            keys[key] = self.schema_class.fields[field_name].sortKey(values[index])
+
+    def remove(self, key):
+        """removes object
+
+        Args:
+            key (string): key of object
+        """
+        if(self.rows.pop(key, None) is None):
+            return
+        for index in self.indexes:
+            index.remove(key)
+        for keys in self.sort_keys.values():
+            keys.pop(key, None)
+        if(len(self.order) > 2 * len(self.rows) + 100):
+            self.order = [k for k in self.order if k in self.rows]
+
+    def rename(self, old_key, new_key):
+        """changes key of object, position in order is kept
+
+        Args:
+            old_key (string): current key
+            new_key (string): new key
+        """
+        if(old_key == new_key or old_key not in self.rows):
+            return
+        self.rows[new_key] = self.rows.pop(old_key)
+        self.order[self.order.index(old_key)] = new_key
+        for index in self.indexes:
+            index.remove(old_key)
+            index.add(new_key, self.rows[new_key])
+        for keys in self.sort_keys.values():
+            keys[new_key] = keys.pop(old_key)
+
+    def clear(self):
+        self.rows.clear()
+        self.order = []
+        self.sort_keys.clear()
+        for index in self.indexes:
+            index.clear()
+
+    def orderedKeys(self):
+        """returns keys in display order
+
+        Returns:
+            list[string]: keys
+        """
+        if(len(self.order) != len(self.rows)):
+            self.order = [k for k in self.order if k in self.rows]
+        return self.order
+
+    def sortedKeys(self, field_name, reverse=False):
+        """sorts objects by typed value of field, sort keys are cached and sorted order becomes display order
+
+        Args:
+            field_name (string): name of field
+            reverse (bool, optional): if True, descending order. Defaults to False.
+
+        Returns:
+            list[string]: keys in sorted order
+        """
+        if(field_name not in self.sort_keys):
+            index = self.field_names.index(field_name)
+            sort_key = self.schema_class.fields[field_name].sortKey
+            self.sort_keys[field_name] = {
+                key: sort_key(values[index]) for key, values in self.rows.items()}
+
+        self.order = sorted(self.rows, key=self.sort_keys[field_name].__getitem__, reverse=reverse)
+        return self.order
+
+
+class SearchIndex:
+    """Case insensitive substring index of text fields, based on trigrams.
+    Queries shorter than trigram are answered by scanning indexed texts.
+    """
+
+    GRAM = 3
+
+    def __init__(self, schema_class, field_names):
+        """Constructor
+
+        Args:
+            schema_class (schema class): class of indexed objects
+            field_names (list[string]): names of indexed fields
+        """
+        all_fields = list(schema_class.fields.keys())
+        self.positions = OrderedDict((name, all_fields.index(name)) for name in field_names)
+        self.grams = {name: defaultdict(set) for name in field_names}
+        self.texts = {}
+
+    def makeGrams(self, text):
+        return {text[i:i + self.GRAM] for i in range(len(text) - self.GRAM + 1)}
+
+    def add(self, key, values):
+        """indexes object, previous values of same key are replaced
+
+        Args:
+            key (string): key of object
+            values (list): SQL values of object in order of fields
+        """
+        if(key in self.texts):
+            self.remove(key)
+
+        texts = {}
+        for name, position in self.positions.items():
+            value = values[position]
+            text = "" if value is None else str(value).casefold()
+            texts[name] = text
+            for gram in self.makeGrams(text):
+                self.grams[name][gram].add(key)
+        self.texts[key] = texts
+
+    def remove(self, key):
+        """removes object from index
+
+        Args:
+            key (string): key of object
+        """
+        texts = self.texts.pop(key, None)
+        if(texts is None):
+            return
+        for name, text in texts.items():
+            for gram in self.makeGrams(text):
+                keys = self.grams[name][gram]
+                keys.discard(key)
+                if(len(keys) == 0):
+                    del self.grams[name][gram]
+
+    def clear(self):
+        for grams in self.grams.values():
+            grams.clear()
+        self.texts.clear()
+
+    def search(self, text, field_names=None):
+        """finds objects which contain text in any of fields
+
+        Args:
+            text (string): searched text
+            field_names (list[string], optional): searched fields. Defaults to None, which means all indexed fields.
+
+        Returns:
+            set[string]: keys of found objects, None if text is empty
+        """
+        query = text.strip().casefold()
+        if(query == ""):
+            return None
+        if(field_names is None):
+            field_names = list(self.positions.keys())
+
+        found = set()
+        for name in field_names:
+            if(len(query) < self.GRAM):
+                found.update(key for key, texts in self.texts.items() if query in texts[name])
+                continue
+
+            postings = sorted((self.grams[name].get(gram, set()) for gram in self.makeGrams(query)), key=len)
+            candidates = set(postings[0])
+            for keys in postings[1:]:
+                candidates &= keys
+                if(len(candidates) == 0):
+                    break
+            found.update(key for key in candidates if query in self.texts[key][name])
+
+        return found
+
+
+class TronPosOdooExchangeUp(SchemaObject):
+
+    """Schema class for TronPosOdooExchangeUp"""
+
+    TABLE_NAME = "TronPosOdooExchangeUp"
+    VERSION_FIELD = "RowChID"
+    SEARCH_FIELDS = ("tpfirmName", "OdooHost", "OdooDataBase")
+    SECRET_FIELDS = ("OdooPassword", "SyncClientPassword")
+
+    fields = OrderedDict([
+        ('tpfirm_id', MSInt(isPK=True)),
         ('tpfirmName', MSVarchar(255)),
         ('tpfirmActive', MSBit()),
         ('TronRetailServerDataBase', MSVarchar(255)),
@@ -463,7 +2012,7 @@ class TronPosOdooExchangeUp(SchemaObject):
         ('SyncClientUser', MSVarchar(255, isNull=True)),
         ('SyncClientPassword', MSVarchar(1000, isNull=True)),
         ('WebClassificationTable', MSVarchar(50, isNull=True)),
-        ('TopWebClassifications', MSBit())
+        ('TopWebClassifications', MSVarchar(50, isNull=True))
     ])
 
     def __init__(self, fields_dict={}):
@@ -480,10 +2029,12 @@ class TronPosWebClassifications(SchemaObject):
     """Schema class for TronPosWebClassifications"""
 
     TABLE_NAME = "TronPosWebClassifications"
+    SEARCH_FIELDS = ("TopWebClassificationGUID", "Name")
+    FOREIGN_KEYS = {'tpfirm_id': "TronPosOdooExchangeUp"}
 
     fields = OrderedDict([
         ('id', MSInt(isPK=True)),
-        ('tpfirm_id', MSInt(isFK=True)),
+        ('tpfirm_id', MSInt(isNull=True, isFK=True)),
         ('TopWebClassificationGUID', MSVarchar(255)),
         ('Name', MSVarchar(50, isNull=True))
     ])
@@ -497,3 +2048,6 @@ class TronPosWebClassifications(SchemaObject):
 
         super().__init__(copy.deepcopy(self.fields), self.TABLE_NAME, fields_dict)
 
+
+SCHEMA_CLASSES = OrderedDict((schema_class.TABLE_NAME, schema_class)
+                             for schema_class in (TronPosOdooExchangeUp, TronPosWebClassifications))
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+"""Concurrent connectivity probe of firms' Odoo servers and retail databases.
+
+Every firm is checked twice: Odoo endpoint with JSON-RPC common.version call (OdooClient of sync.py)
+and retail database (TronRetailServerDataBase on SQL server from config) with SELECT 1. Blocking
+checks run in thread pool, all at once with asyncio, bounded by semaphore, and each has its own
+timeout, so probing all firms takes about as long as the slowest check. Checks of same Odoo server or same retail database are shared by firms.
+Results are yielded as they complete.
+
+Example:
+    python probe.py
+    python probe.py --firm 5 --firm 7 --timeout 2
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from config import CONFIG_FILE, load_connection_parameters
+from models import TronPosOdooExchangeUp, connect
+from sync import OdooClient
+
+
+ODOO = 'odoo'
+RETAIL = 'retail'
+
+ProbeTarget = namedtuple('ProbeTarget', ['firm_id', 'name', 'host', 'port', 'database', 'retail_database'])
+ProbeResult = namedtuple('ProbeResult', ['firm_id', 'kind', 'ok', 'detail', 'seconds'])
+
+
+def load_targets(connection_parameters, pks=None):
+    """reads probe targets from TronPosOdooExchangeUp
+
+    Args:
+        connection_parameters (kwargs dict): pymssql connection parameters
+        pks (list, optional): firm IDs. Defaults to None, all active firms.
+
+    Returns:
+        list[ProbeTarget]: targets
+    """
+    if(pks is None):
+        objects = TronPosOdooExchangeUp.FetchObjectsWhere(connection_parameters, {'tpfirmActive': 1})
+    else:
+        objects = TronPosOdooExchangeUp.FetchObjectsByPK(connection_parameters, pks)
+
+    return [ProbeTarget(obj.getField('tpfirm_id'), obj.getField('tpfirmName'), obj.getField('OdooHost'),
+                        obj.getField('OdooPort'), obj.getField('OdooDataBase'),
+                        obj.getField('TronRetailServerDataBase')) for obj in objects]
+
+
+def odoo_version(host, port, timeout):
+    """calls Odoo JSON-RPC common.version with OdooClient of sync, blocking
+
+    Args:
+        host (string): Odoo host
+        port (int): Odoo port, HTTPS is used same as in sync
+        timeout (float): socket timeout in seconds
+
+    Raises:
+        SyncError: raised on HTTP error or JSON-RPC error
+
+    Returns:
+        dict: version info of Odoo server
+    """
+    client = OdooClient(host, port, timeout=timeout)
+    try:
+        return client.call('common', 'version')
+    finally:
+        client.close()
+
+
+def retail_check(connection_parameters, database, timeout):
+    """opens retail database and runs trivial query, blocking
+
+    Args:
+        connection_parameters (kwargs dict): pymssql connection parameters of SQL server
+        database (string): retail database name
+        timeout (float): login timeout in seconds
+    """
+    parameters = dict(connection_parameters, database=database, login_timeout=max(1, int(timeout)))
+    with connect(parameters) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+
+
+class ConnectivityProbe:
+    """Runs connectivity checks of targets concurrently"""
+
+    MAX_CONCURRENCY = 64
+    TIMEOUT = 5.0
+
+    def __init__(self, connection_parameters, concurrency=MAX_CONCURRENCY, timeout=TIMEOUT):
+        """Constructor
+
+        Args:
+            connection_parameters (kwargs dict): pymssql connection parameters of SQL server with retail databases
+            concurrency (int, optional): max number of checks running at once. Defaults to MAX_CONCURRENCY.
+            timeout (float, optional): timeout of single check in seconds. Defaults to TIMEOUT.
+        """
+        self.connection_parameters = connection_parameters
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+    async def _check(self, coroutine_function, *args):
+        async with self.semaphore:
+            start = time.perf_counter()
+            try:
+                detail = await asyncio.wait_for(coroutine_function(*args), self.timeout)
+                ok = True
+            except asyncio.TimeoutError:
+                ok, detail = False, "timeout po {:g} s".format(self.timeout)
+            except Exception as e:
+                ok, detail = False, str(e) or type(e).__name__
+            return ok, detail, time.perf_counter() - start
+
+    async def _odoo(self, host, port):
+        result = await asyncio.get_running_loop().run_in_executor(
+            self.executor, odoo_version, host, port, self.timeout)
+        return "Odoo {}".format(result.get('server_version', '?'))
+
+    async def _retail(self, database):
+        await asyncio.get_running_loop().run_in_executor(
+            self.executor, retail_check, self.connection_parameters, database, self.timeout)
+        return "OK"
+
+    def _shared(self, key, coroutine_function, *args):
+        if(key not in self.checks):
+            self.checks[key] = asyncio.ensure_future(self._check(coroutine_function, *args))
+        return self.checks[key]
+
+    async def _result(self, target, kind, check):
+        ok, detail, seconds = await asyncio.shield(check)
+        return ProbeResult(target.firm_id, kind, ok, detail, seconds)
+
+    async def iterResults(self, targets):
+        """checks targets, results are yielded in order of completion
+
+        Args:
+            targets (list[ProbeTarget]): probed firms
+
+        Yields:
+            ProbeResult: result of single check, two for each target
+        """
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.executor = ThreadPoolExecutor(self.concurrency)
+        self.checks = {}
+
+        tasks = []
+        for target in targets:
+            tasks.append(self._result(target, ODOO, self._shared(
+                (ODOO, target.host, target.port), self._odoo, target.host, target.port)))
+            tasks.append(self._result(target, RETAIL, self._shared(
+                (RETAIL, target.retail_database), self._retail, target.retail_database)))
+
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+        finally:
+            for check in self.checks.values():
+                check.cancel()
+            self.executor.shutdown(wait=False)
+
+    def run(self, targets, on_result, cancelled=lambda: False):
+        """checks targets in new event loop, blocking. Used from threads without event loop.
+
+        Args:
+            targets (list[ProbeTarget]): probed firms
+            on_result (function): called with each ProbeResult
+            cancelled (function, optional): returns True when remaining checks should be dropped. Defaults to never.
+        """
+        async def consume():
+            async for result in self.iterResults(targets):
+                if(cancelled()):
+                    break
+                on_result(result)
+
+        asyncio.run(consume())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--firm', type=int, action='append', help='probed firm ID, defaults to all active firms')
+    parser.add_argument('--concurrency', type=int, default=ConnectivityProbe.MAX_CONCURRENCY,
+                        help='max checks running at once')
+    parser.add_argument('--timeout', type=float, default=ConnectivityProbe.TIMEOUT, help='timeout of single check')
+    parser.add_argument('--config', default=CONFIG_FILE, help='config file with connection settings')
+    args = parser.parse_args(argv)
+
+    connection_parameters = load_connection_parameters(args.config, write_default=False)
+    targets = load_targets(connection_parameters, args.firm)
+
+    failed = []
+    start = time.perf_counter()
+
+    def on_result(result):
+        if(not result.ok):
+            failed.append(result)
+        print(json.dumps(result._asdict(), ensure_ascii=False), flush=True)
+
+    ConnectivityProbe(connection_parameters, args.concurrency, args.timeout).run(targets, on_result)
+    print("Probed {} firms in {:.1f} s, {} checks failed".format(
+        len(targets), time.perf_counter() - start, len(failed)), file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
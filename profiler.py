@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+
+"""Opt-in profiler of Tk main loop, used to find what blocks UI.
+
+Every Tk callback (commands, bindings, after callbacks) is timed by wrapping tkinter.CallWrapper,
+functions decorated with profiled are timed too. Heartbeat is scheduled on main loop and watchdog
+thread checks it. When heartbeat is late more than stall threshold, main loop is stalled and watchdog
+samples stack of main thread until it recovers. Report aggregates callback latencies and stalls
+with their sampled stacks.
+
+Module is imported by gui.py for profiled decorator, so it only imports modules which Tk already loaded,
+the rest is imported when profiling is on.
+
+Usage:
+    python gui.py --profile profile.json
+    MSSQL_APP_PROFILE=profile.json python gui.py
+"""
+
+import functools
+import sys
+import threading
+import time
+import tkinter
+from collections import Counter, deque
+from os import path
+
+
+PROFILE_ENV = "MSSQL_APP_PROFILE"
+
+# profiler used by profiled functions, None when profiling is off
+ACTIVE = None
+
+
+def unwrap_callback(func):
+    """returns callback given to after(), which wraps it in local function callit"""
+    if(getattr(func, '__qualname__', '').endswith('after.<locals>.callit') and func.__closure__):
+        cells = dict(zip(func.__code__.co_freevars, func.__closure__))
+        if('func' in cells):
+            return cells['func'].cell_contents
+    return func
+
+
+def callback_name(func):
+    """returns readable name of callback, with source location for lambdas and local functions
+
+    Args:
+        func (function): callback
+
+    Returns:
+        string: name of callback
+    """
+    func = unwrap_callback(func)
+    name = getattr(func, '__qualname__', None) or repr(func)
+    code = getattr(func, '__code__', None)
+    if(code is not None and '<' in name):
+        name = "{} ({}:{})".format(name, path.basename(code.co_filename), code.co_firstlineno)
+    return name
+
+
+def profiled(func):
+    """decorator, times function when profiling is on. Used for code which is not Tk callback on its own,
+    like tree population or dialog construction.
+
+    Args:
+        func (function): function to time
+    """
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def inner_func(*args, **kwargs):
+        profiler = ACTIVE
+        if(profiler is None):
+            return func(*args, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.record(name, time.perf_counter() - start)
+
+    return inner_func
+
+
+class UIProfiler:
+    """Times Tk callbacks and detects main loop stalls"""
+
+    HEARTBEAT = 0.05
+    STALL_THRESHOLD = 0.2
+    SAMPLE_INTERVAL = 0.01
+    RECENT = 1000
+    TOP_STACKS = 3
+
+    def __init__(self, stall_threshold=STALL_THRESHOLD, heartbeat=HEARTBEAT, sample_interval=SAMPLE_INTERVAL):
+        """Constructor
+
+        Args:
+            stall_threshold (float, optional): seconds of late heartbeat counted as stall. Defaults to STALL_THRESHOLD.
+            heartbeat (float, optional): seconds between heartbeats. Defaults to HEARTBEAT.
+            sample_interval (float, optional): seconds between stack samples during stall. Defaults to SAMPLE_INTERVAL.
+        """
+        self.stall_threshold = stall_threshold
+        self.heartbeat = heartbeat
+        self.sample_interval = sample_interval
+
+        self.lock = threading.Lock()
+        self.timings = {}
+        self.stalls = []
+        self.running = []
+        self.samples = Counter()
+        self.stall_callbacks = None
+        self.original_call = None
+        self.root = None
+        self.stopped = threading.Event()
+        self.main_thread_id = threading.main_thread().ident
+        self.start_time = time.perf_counter()
+        self.last_beat = self.start_time
+
+    def install(self):
+        """starts timing of Tk callbacks and profiled functions, should be called before widgets are created"""
+        global ACTIVE
+        ACTIVE = self
+        self.original_call = tkinter.CallWrapper.__call__
+        original_call = self.original_call
+        profiler = self
+
+        def timed_call(wrapper, *args):
+            func = unwrap_callback(wrapper.func)
+            if(func == profiler.beat):
+                return original_call(wrapper, *args)
+
+            name = callback_name(func)
+            profiler.running.append(name)
+            start = time.perf_counter()
+            try:
+                return original_call(wrapper, *args)
+            finally:
+                profiler.record(name, time.perf_counter() - start)
+                profiler.running.pop()
+
+        tkinter.CallWrapper.__call__ = timed_call
+        return self
+
+    def start(self, root):
+        """starts heartbeat on main loop of root and watchdog thread
+
+        Args:
+            root (tk.Tk): root window
+        """
+        self.root = root
+        self.last_beat = time.perf_counter()
+        self.root.after(int(self.heartbeat * 1000), self.beat)
+        threading.Thread(target=self.watch, daemon=True).start()
+        return self
+
+    def stop(self):
+        """stops profiling and restores Tk"""
+        global ACTIVE
+        self.stopped.set()
+        if(self.original_call is not None):
+            tkinter.CallWrapper.__call__ = self.original_call
+            self.original_call = None
+        if(ACTIVE is self):
+            ACTIVE = None
+
+    def record(self, name, seconds):
+        with self.lock:
+            timing = self.timings.get(name)
+            if(timing is None):
+                timing = self.timings[name] = {'count': 0, 'total': 0.0, 'max': 0.0, 'recent': deque(maxlen=self.RECENT)}
+            timing['count'] += 1
+            timing['total'] += seconds
+            timing['max'] = max(timing['max'], seconds)
+            timing['recent'].append(seconds)
+
+    def beat(self):
+        """heartbeat on main loop, records stall if it was late"""
+        now = time.perf_counter()
+        late = now - self.last_beat - self.heartbeat
+        self.last_beat = now
+
+        with self.lock:
+            samples, self.samples = self.samples, Counter()
+            callbacks, self.stall_callbacks = self.stall_callbacks, None
+
+        if(late >= self.stall_threshold):
+            self.stalls.append({
+                'at': round(now - late - self.start_time, 3),
+                'duration_ms': round(late * 1000, 1),
+                'callbacks': callbacks or [],
+                'samples': samples
+            })
+
+        if(not self.stopped.is_set()):
+            try:
+                self.root.after(int(self.heartbeat * 1000), self.beat)
+            except tkinter.TclError:
+                # root was destroyed
+                pass
+
+    def watch(self):
+        """watchdog thread, samples stack of main thread while heartbeat is late"""
+        import traceback
+
+        while(not self.stopped.wait(self.sample_interval)):
+            if(time.perf_counter() - self.last_beat - self.heartbeat < self.stall_threshold):
+                continue
+
+            frame = sys._current_frames().get(self.main_thread_id)
+            if(frame is None):
+                continue
+            stack = tuple("{}:{} {}".format(path.basename(entry.filename), entry.lineno, entry.name)
+                          for entry in traceback.extract_stack(frame))
+            del frame
+
+            with self.lock:
+                self.samples[stack] += 1
+                if(self.stall_callbacks is None):
+                    self.stall_callbacks = list(self.running)
+
+    def report(self):
+        """aggregates timings and stalls
+
+        Returns:
+            dict: report, callbacks are sorted by total time
+        """
+        with self.lock:
+            callbacks = []
+            for name, timing in self.timings.items():
+                recent = sorted(timing['recent'])
+                callbacks.append({
+                    'name': name,
+                    'count': timing['count'],
+                    'total_ms': round(timing['total'] * 1000, 1),
+                    'mean_ms': round(timing['total'] * 1000 / timing['count'], 2),
+                    'p95_ms': round(recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000, 2),
+                    'max_ms': round(timing['max'] * 1000, 1)
+                })
+            callbacks.sort(key=lambda item: item['total_ms'], reverse=True)
+
+            stalls = []
+            folded = Counter()
+            for stall in self.stalls:
+                for stack, count in stall['samples'].items():
+                    folded[";".join(stack)] += count
+                stalls.append({
+                    'at': stall['at'],
+                    'duration_ms': stall['duration_ms'],
+                    'callbacks': stall['callbacks'],
+                    'stacks': [{'samples': count, 'stack': list(stack)}
+                               for stack, count in stall['samples'].most_common(self.TOP_STACKS)]
+                })
+
+        return {
+            'duration_s': round(time.perf_counter() - self.start_time, 3),
+            'stall_threshold_ms': self.stall_threshold * 1000,
+            'callbacks': callbacks,
+            'stalls': stalls,
+            # folded stacks of all stalls, input for flame graph tools
+            'stall_stacks': dict(folded.most_common())
+        }
+
+    def save(self, file_path):
+        """writes report to JSON file and prints summary
+
+        Args:
+            file_path (string): path of report
+        """
+        import json
+
+        report = self.report()
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+        print("Profile saved to {}: {} stalls, {:.0f} ms stalled".format(
+            file_path, len(report['stalls']), sum(stall['duration_ms'] for stall in report['stalls'])), file=sys.stderr)
+        for item in report['callbacks'][:10]:
+            print("  {total_ms:>10.1f} ms  {count:>7}x  max {max_ms:>8.1f} ms  {name}".format(**item), file=sys.stderr)
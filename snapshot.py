@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+"""Local on-disk snapshot of loaded tables, used for warm start of GUI.
+
+Snapshot is sqlite file with one table per schema class. Each row holds SQL values of object and
+its version from ChangeTracker, so after start only rows changed in SQL DB since snapshot was saved
+are fetched. Tables are stored with hash of schema, snapshot of changed schema is ignored.
+"""
+
+import datetime
+import hashlib
+import sqlite3
+from contextlib import contextmanager
+from os import path
+
+from models import MSType
+
+
+FORMAT_VERSION = 1
+MMAP_SIZE = 256 * 1024 * 1024
+
+
+def schema_hash(schema_class):
+    """returns hash of schema, changes when table name or any field is changed
+
+    Args:
+        schema_class (schema class): schema class
+
+    Returns:
+        string: hex digest
+    """
+    description = [str(FORMAT_VERSION), schema_class.TABLE_NAME]
+    for field_name, field_type in schema_class.fields.items():
+        description.append("{}:{}:{}:{}:{}:{}".format(
+            field_name, type(field_type).__name__, field_type.DESCRIPTOR,
+            field_type.isNull, field_type.isPK, field_type.isFK))
+    return hashlib.sha1("|".join(description).encode()).hexdigest()
+
+
+def text_fields(schema_class):
+    """returns positions and types of fields whose values are stored as text, see MSType.toText
+
+    Args:
+        schema_class (schema class): schema class
+
+    Returns:
+        list[tuple(int, MSType)]: position and type of each field
+    """
+    return [(i, field_type) for i, field_type in enumerate(schema_class.fields.values())
+            if type(field_type).toText is not MSType.toText]
+
+
+class Snapshot:
+    """Snapshot file. Each method opens its own sqlite connection, so objects can be read in background thread."""
+
+    VERSION_COLUMN = "_version"
+
+    def __init__(self, file_path):
+        """Constructor
+
+        Args:
+            file_path (string): path to snapshot file, created on first save
+        """
+        self.file_path = file_path
+
+    def connect(self):
+        conn = sqlite3.connect(self.file_path)
+        conn.execute("PRAGMA mmap_size={}".format(MMAP_SIZE))
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshot_tables (table_name TEXT PRIMARY KEY, schema_hash TEXT, saved TEXT)")
+        return conn
+
+    @contextmanager
+    def opened(self):
+        """yields connection in transaction, which is committed and closed at the end"""
+        conn = self.connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def isValid(self, conn, schema_class):
+        row = conn.execute("SELECT schema_hash FROM snapshot_tables WHERE table_name=?",
+                           (schema_class.TABLE_NAME,)).fetchone()
+        return row is not None and row[0] == schema_hash(schema_class)
+
+    def has(self, schema_class):
+        """checks if snapshot contains table of schema class with same schema
+
+        Args:
+            schema_class (schema class): schema class
+
+        Returns:
+            bool: True if table can be loaded
+        """
+        if(not path.isfile(self.file_path)):
+            return False
+        try:
+            with self.opened() as conn:
+                return self.isValid(conn, schema_class)
+        except sqlite3.Error as e:
+            print("Snapshot not readable: {}".format(e))
+            return False
+
+    def versions(self, schema_class):
+        """returns row versions stored with objects, see ChangeTracker.restore
+
+        Args:
+            schema_class (schema class): schema class
+
+        Returns:
+            dict{value:int}: PK and version of each row, version is None if it's not known
+        """
+        pk_name = schema_class.GetPK()[0]
+        pk_type = schema_class.fields[pk_name]
+        with self.opened() as conn:
+            rows = conn.execute('SELECT "{}", {} FROM "{}"'.format(
+                pk_name, self.VERSION_COLUMN, schema_class.TABLE_NAME))
+            if(type(pk_type).toText is MSType.toText):
+                return dict(rows)
+            return {pk_type.fromText(pk): version for pk, version in rows}
+
+    def iterRows(self, schema_class, chunk_size=500):
+        """reads SQL values of objects in stored order. Objects are not created, because rows are only shown in treeview.
+
+        Args:
+            schema_class (schema class): schema class
+            chunk_size (int, optional): number of rows read at once. Defaults to 500.
+
+        Yields:
+            list: SQL values in order of fields, see SchemaObject.getFieldValuesSQL
+        """
+        field_names = list(schema_class.fields.keys())
+        converted = text_fields(schema_class)
+
+        conn = self.connect()
+        try:
+            cursor = conn.execute('SELECT {} FROM "{}" ORDER BY rowid'.format(
+                ",".join('"{}"'.format(name) for name in field_names), schema_class.TABLE_NAME))
+            while(True):
+                rows = cursor.fetchmany(chunk_size)
+                if(len(rows) == 0):
+                    break
+                for row in rows:
+                    values = list(row)
+                    for i, field_type in converted:
+                        if(values[i] is not None):
+                            values[i] = field_type.fromText(values[i])
+                    yield values
+        finally:
+            conn.close()
+
+    def save(self, schema_class, rows, versions):
+        """replaces stored table with rows
+
+        Args:
+            schema_class (schema class): schema class
+            rows (iterable[list]): SQL values of objects in display order, see RowStore
+            versions (dict{value:int}): versions of rows by PK, see ChangeTracker
+        """
+        field_names = list(schema_class.fields.keys())
+        converted = text_fields(schema_class)
+
+        def stored(values):
+            values = list(values)
+            version = versions.get(values[0])
+            for i, field_type in converted:
+                if(values[i] is not None):
+                    values[i] = field_type.toText(values[i])
+            return [version] + values
+
+        with self.opened() as conn:
+            conn.execute('DROP TABLE IF EXISTS "{}"'.format(schema_class.TABLE_NAME))
+            conn.execute('CREATE TABLE "{}" ({} INTEGER, {})'.format(
+                schema_class.TABLE_NAME, self.VERSION_COLUMN, ",".join('"{}"'.format(name) for name in field_names)))
+            conn.executemany('INSERT INTO "{}" VALUES ({})'.format(
+                schema_class.TABLE_NAME, ",".join("?" for _ in range(len(field_names) + 1))),
+                (stored(values) for values in rows))
+            conn.execute("INSERT OR REPLACE INTO snapshot_tables VALUES (?, ?, ?)", (
+                schema_class.TABLE_NAME, schema_hash(schema_class),
+                datetime.datetime.now().isoformat(timespec='seconds')))
+
+    def drop(self, schema_class):
+        """removes stored table, ex. when table is too large for snapshot
+
+        Args:
+            schema_class (schema class): schema class
+        """
+        with self.opened() as conn:
+            conn.execute('DROP TABLE IF EXISTS "{}"'.format(schema_class.TABLE_NAME))
+            conn.execute("DELETE FROM snapshot_tables WHERE table_name=?", (schema_class.TABLE_NAME,))
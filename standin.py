@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+
+"""Local stand-in for MSSQL database, used for benchmarks and load tools.
+
+Backed by in-memory sqlite3 and mimics the part of pymssql API used in models.py:
+connections and cursors as context managers, "%s" placeholders, as_dict cursors
+and implicit transactions. Transactions are serialized with a single lock, so
+concurrent writers wait like they would on row locks.
+
+StubOdooServer answers Odoo JSON-RPC calls on local port, so connectivity probe can be tested
+without Odoo instance.
+
+Usage:
+    db = StandInDatabase()
+    db.createTables(['TronPosOdooExchangeUp.sql', 'TronPosWebClassifications.sql'])
+    models.set_connection_factory(db.connect)
+"""
+
+import datetime
+import json
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import path
+
+
+LOCK_TIMEOUT_ERROR = 1222
+CANNOT_OPEN_DATABASE_ERROR = 4060
+DUPLICATE_KEY_ERROR = 2627
+FK_ERROR = 547
+
+SQL_FILES = ['TronPosOdooExchangeUp.sql', 'TronPosWebClassifications.sql']
+
+
+class Error(Exception):
+    """Base stand-in error, same shape as pymssql.Error -> args are (code, message)"""
+
+
+class OperationalError(Error):
+    pass
+
+
+class IntegrityError(Error):
+    pass
+
+
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter(
+    "DATETIME", lambda value: datetime.datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("BIT", lambda value: bool(int(value)))
+
+
+def _binary_checksum(*values):
+    """BINARY_CHECKSUM replacement -> signed 32 bit crc of values"""
+    checksum = zlib.crc32(repr(values).encode())
+    return checksum - 2**32 if checksum >= 2**31 else checksum
+
+
+class _ChecksumAgg:
+    """CHECKSUM_AGG replacement -> xor of all values"""
+
+    def __init__(self):
+        self.value = 0
+
+    def step(self, value):
+        if(value is not None):
+            self.value ^= value
+
+    def finalize(self):
+        return self.value
+
+
+_OFFSET_FETCH = re.compile(
+    r"OFFSET\s+(\S+)\s+ROWS\s+FETCH\s+NEXT\s+(\S+)\s+ROWS\s+ONLY", re.IGNORECASE)
+# table hints like WITH (UPDLOCK, HOLDLOCK), transactions are serialized by transaction lock anyway
+_TABLE_HINTS = re.compile(
+    r"\s+WITH\s*\(\s*(?:UPDLOCK|HOLDLOCK|ROWLOCK|NOLOCK|READPAST|SERIALIZABLE|TABLOCK)[^)]*\)", re.IGNORECASE)
+
+
+def translate_query(query):
+    """translates T-SQL query into sqlite dialect
+
+    Args:
+        query (string): query with pymssql placeholders
+
+    Returns:
+        string: sqlite query
+    """
+    query = _TABLE_HINTS.sub("", query.replace("%s", "?"))
+    # "LIMIT skip, count" keeps order of placeholders
+    return _OFFSET_FETCH.sub(r"LIMIT \1, \2", query)
+
+
+_INLINE_FK = re.compile(r"\bFOREIGN\s+KEY\s+REFERENCES\b", re.IGNORECASE)
+
+
+def translate_ddl(ddl):
+    """translates T-SQL CREATE TABLE into sqlite dialect
+
+    Args:
+        ddl (string): DDL script
+
+    Returns:
+        string: sqlite DDL script
+    """
+    # inline "col INT FOREIGN KEY REFERENCES t(c)" is "col INT REFERENCES t(c)" in sqlite
+    return _INLINE_FK.sub("REFERENCES", ddl)
+
+
+class StandInDatabase:
+    """Shared in-memory database. Each connect() call returns new connection to same data."""
+
+    def __init__(self, lock_timeout=5.0, latency=0.0, databases=None):
+        """Constructor
+
+        Args:
+            lock_timeout (float, optional): seconds to wait for transaction lock. Defaults to 5.0.
+            latency (float, optional): simulated network round trip per statement in seconds. Defaults to 0.0.
+            databases (set[string], optional): database names that can be opened. Defaults to None, any name.
+        """
+        self.lock_timeout = lock_timeout
+        self.latency = latency
+        self.databases = databases
+        self.lock = threading.Lock()
+        self.statements = 0
+        self.connections = 0
+
+        self.db = sqlite3.connect(
+            ":memory:", check_same_thread=False, isolation_level=None,
+            detect_types=sqlite3.PARSE_DECLTYPES)
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.create_function("BINARY_CHECKSUM", -1, _binary_checksum)
+        self.db.create_aggregate("CHECKSUM_AGG", 1, _ChecksumAgg)
+
+    def createTables(self, sql_files=SQL_FILES):
+        """creates tables from DDL files
+
+        Args:
+            sql_files (list[string], optional): paths to .sql files. Defaults to files in this repository.
+        """
+        for sql_file in sql_files:
+            if(not path.isabs(sql_file)):
+                sql_file = path.join(path.dirname(path.abspath(__file__)), sql_file)
+            with open(sql_file) as f:
+                self.db.executescript(translate_ddl(f.read()))
+
+    def connect(self, *args, **kwargs):
+        """pymssql.connect replacement, connection parameters other than database are ignored
+
+        Raises:
+            OperationalError: raised if database is not one of databases
+
+        Returns:
+            StandInConnection: new connection
+        """
+        if(self.databases is not None and kwargs.get('database') not in self.databases):
+            raise OperationalError(CANNOT_OPEN_DATABASE_ERROR,
+                                   'Cannot open database "{}" requested by the login.'.format(kwargs.get('database')))
+        self.connections += 1
+        return StandInConnection(self)
+
+
+class StandInConnection:
+    """pymssql.Connection replacement"""
+
+    def __init__(self, database):
+        self.database = database
+        self.in_transaction = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def cursor(self, as_dict=False):
+        return StandInCursor(self, as_dict)
+
+    def begin(self):
+        """starts implicit transaction, waits for lock held by other transactions"""
+        if(self.in_transaction):
+            return
+        if(not self.database.lock.acquire(timeout=self.database.lock_timeout)):
+            raise OperationalError(LOCK_TIMEOUT_ERROR, "Lock request time out period exceeded.")
+        self.in_transaction = True
+        self.database.db.execute("BEGIN")
+
+    def _finish(self, statement):
+        if(not self.in_transaction):
+            return
+        try:
+            self.database.db.execute(statement)
+        finally:
+            self.in_transaction = False
+            self.database.lock.release()
+
+    def commit(self):
+        self._finish("COMMIT")
+
+    def rollback(self):
+        self._finish("ROLLBACK")
+
+    def close(self):
+        self.rollback()
+
+
+class StandInCursor:
+    """pymssql.Cursor replacement"""
+
+    def __init__(self, connection, as_dict):
+        self.connection = connection
+        self.as_dict = as_dict
+        self.cursor = None
+        self.rowcount = -1
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if(self.cursor is not None):
+            self.cursor.close()
+            self.cursor = None
+
+    def _run(self, method, query, params):
+        database = self.connection.database
+        self.connection.begin()
+        if(database.latency > 0):
+            time.sleep(database.latency)
+        database.statements += 1
+        try:
+            self.cursor = getattr(database.db, method)(translate_query(query), params)
+        except sqlite3.IntegrityError as e:
+            if("FOREIGN KEY" in str(e)):
+                raise IntegrityError(FK_ERROR, str(e))
+            raise IntegrityError(DUPLICATE_KEY_ERROR, str(e))
+        except sqlite3.Error as e:
+            raise OperationalError(0, str(e))
+
+        self.rowcount = self.cursor.rowcount
+        self.description = self.cursor.description
+
+    def execute(self, query, params=None):
+        if(params is None):
+            params = ()
+        elif(not isinstance(params, (tuple, list))):
+            params = (params,)
+        self._run("execute", query, params)
+
+    def executemany(self, query, seq_of_params):
+        self._run("executemany", query, [tuple(params) for params in seq_of_params])
+
+    def _convert(self, row):
+        if(self.as_dict):
+            return {column[0]: value for column, value in zip(self.description, row)}
+        return row
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        return None if row is None else self._convert(row)
+
+    def fetchmany(self, size=1):
+        return [self._convert(row) for row in self.cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._convert(row) for row in self.cursor.fetchall()]
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+
+class StubOdooServer:
+    """Local stand-in for Odoo JSON-RPC endpoint (POST /jsonrpc), runs in background threads.
+    Calls are dispatched to handlers by (service, method). Answers common.version, common.authenticate
+    and object.execute_kw with model method load, which creates or updates records by external ID
+    like Odoo does. Loaded records are kept in records[(database, model)][external ID].
+
+    Usage:
+        with StubOdooServer(delay=0.5) as server:
+            host, port = server.address
+    """
+
+    def __init__(self, delay=0.0, version="16.0", host="127.0.0.1", port=0):
+        """Constructor, server is started with start() or as context manager
+
+        Args:
+            delay (float, optional): seconds to wait before each response. Defaults to 0.0.
+            version (string, optional): reported server_version. Defaults to "16.0".
+            host (string, optional): listening address. Defaults to "127.0.0.1".
+            port (int, optional): listening port. Defaults to 0, any free port.
+        """
+        self.delay = delay
+        self.requests = 0
+        self.password = None
+        self.records = {}
+        self.loads = []
+        self.records_lock = threading.Lock()
+        self.handlers = {
+            ('common', 'version'): lambda *args: {'server_version': version, 'protocol_version': 1},
+            ('common', 'authenticate'): self.authenticate,
+            ('common', 'login'): lambda database, login, password: self.authenticate(database, login, password, {}),
+            ('object', 'execute_kw'): self.execute_kw
+        }
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                stub.requests += 1
+                if(stub.delay > 0):
+                    time.sleep(stub.delay)
+                if(self.path != "/jsonrpc"):
+                    self.send_error(404)
+                    return
+
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                params = request.get('params', {})
+                handler = stub.handlers.get((params.get('service'), params.get('method')))
+                if(handler is None):
+                    response = {'error': {'code': 200, 'message': 'Odoo Server Error',
+                                          'data': {'message': 'Unknown method {}.{}'.format(
+                                              params.get('service'), params.get('method'))}}}
+                else:
+                    try:
+                        response = {'result': handler(*params.get('args', []))}
+                    except Exception as e:
+                        response = {'error': {'code': 200, 'message': 'Odoo Server Error',
+                                              'data': {'message': str(e)}}}
+
+                response.update({'jsonrpc': '2.0', 'id': request.get('id')})
+                body = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            # many clients connect at once
+            request_queue_size = 1024
+            daemon_threads = True
+
+        self.server = Server((host, port), Handler)
+        self.address = self.server.server_address[:2]
+
+    def authenticate(self, database, login, password, user_agent_env):
+        """returns uid, or False if password is set and doesn't match"""
+        if(self.password is not None and password != self.password):
+            return False
+        return 2
+
+    def execute_kw(self, database, uid, password, model, method, args, kwargs=None):
+        if(self.authenticate(database, None, password, {}) is False or uid is False):
+            raise PermissionError("Access Denied")
+        if(method != 'load'):
+            raise ValueError("Method {} is not supported by stub".format(method))
+
+        fields, rows = args
+        with self.records_lock:
+            self.loads.append((database, model, len(rows)))
+            records = self.records.setdefault((database, model), {})
+            ids = []
+            for row in rows:
+                values = dict(zip(fields, row))
+                record = records.setdefault(values.pop('id'), {'id': len(records) + 1})
+                record.update(values)
+                ids.append(record['id'])
+        return {'ids': ids, 'messages': []}
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+
+"""Sync of web classifications to Odoo of each firm.
+
+Classifications of all active firms are read with single streamed query (joined with firm settings)
+and compared with state pushed by previous run, kept in local checkpoint database. Only new and
+changed classifications are sent, with Odoo load method in batches, which creates or updates records
+by external ID. Firms are synced in parallel by worker pool, calls to same Odoo host are rate limited.
+
+Checkpoint keeps Odoo endpoint of each firm and content hash of each pushed classification.
+Classifications have no version column, so they are compared by hash. If firm points to other
+Odoo host, database, model or GUID field than in previous run, all its classifications are sent again.
+Records are matched in Odoo by external ID made from classification id. Firm's TopWebClassifications
+names Odoo field of model (WebClassificationTable), which receives TopWebClassificationGUID.
+
+Example:
+    python sync.py
+    python sync.py --firm 5 --workers 4 --rate 5
+"""
+
+import argparse
+import hashlib
+import http.client
+import itertools
+import json
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from config import CONFIG_FILE, load_connection_parameters
+from models import MAX_PARAMETERS, QUERY_LOG, connect
+
+
+CHECKPOINT_FILE = "sync_checkpoint.db"
+DEFAULT_MODEL = "product.public.category"
+XMLID_FORMAT = "__import__.tronpos_web_classification_{}"
+LOAD_FIELDS = ['id', 'name']
+
+SyncFirm = namedtuple('SyncFirm', ['firm_id', 'host', 'port', 'database', 'user', 'password', 'model', 'guid_field'])
+SyncResult = namedtuple('SyncResult', ['firm_id', 'ok', 'sent', 'unchanged', 'detail', 'seconds'])
+
+
+class SyncError(Exception):
+    """Raised when Odoo rejects call or loaded records"""
+
+
+class TokenBucket:
+    """Rate limiter, allows rate calls per second on average and burst calls at once"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """takes one token, waits until token is available"""
+        while(True):
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if(self.tokens >= 1):
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class OdooClient:
+    """Odoo JSON-RPC client, keeps single HTTP connection open (HTTPS on port 443)"""
+
+    def __init__(self, host, port, timeout=30.0):
+        connection_class = http.client.HTTPSConnection if port == 443 else http.client.HTTPConnection
+        self.connection = connection_class(host, port, timeout=timeout)
+        self.call_id = itertools.count(1)
+
+    def call(self, service, method, *args):
+        """calls method of JSON-RPC service
+
+        Raises:
+            SyncError: raised on HTTP error or JSON-RPC error
+
+        Returns:
+            object: result of call
+        """
+        body = json.dumps({'jsonrpc': '2.0', 'method': 'call', 'id': next(self.call_id),
+                           'params': {'service': service, 'method': method, 'args': list(args)}})
+        self.connection.request("POST", "/jsonrpc", body, {'Content-Type': 'application/json'})
+        response = self.connection.getresponse()
+        content = response.read()
+        if(response.status != 200):
+            raise SyncError("HTTP {} {}".format(response.status, response.reason))
+
+        data = json.loads(content)
+        if('error' in data):
+            error = data['error']
+            raise SyncError(error.get('data', {}).get('message') or error.get('message'))
+        return data['result']
+
+    def close(self):
+        self.connection.close()
+
+
+class Checkpoint:
+    """Local sqlite database with state pushed to Odoo, shared by workers"""
+
+    def __init__(self, file_path=CHECKPOINT_FILE):
+        self.db = sqlite3.connect(file_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.db.execute("CREATE TABLE IF NOT EXISTS sync_firms (firm_id INTEGER PRIMARY KEY, endpoint TEXT)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS sync_rows "
+                            "(firm_id INTEGER, id INTEGER, hash TEXT, PRIMARY KEY(firm_id, id)) WITHOUT ROWID")
+            self.db.commit()
+
+    def begin(self, firm):
+        """returns hashes pushed to firm's endpoint and records endpoint.
+        If endpoint of firm has changed, pushed hashes are dropped.
+
+        Args:
+            firm (SyncFirm): synced firm
+
+        Returns:
+            dict{int:string}: content hash of each pushed classification
+        """
+        endpoint = json.dumps([firm.host, firm.port, firm.database, firm.model, firm.guid_field])
+        with self.lock:
+            row = self.db.execute("SELECT endpoint FROM sync_firms WHERE firm_id = ?", (firm.firm_id,)).fetchone()
+            if(row is None or row[0] != endpoint):
+                self.db.execute("DELETE FROM sync_rows WHERE firm_id = ?", (firm.firm_id,))
+                # column names are given, checkpoints of older version also have row_version column
+                self.db.execute("INSERT OR REPLACE INTO sync_firms (firm_id, endpoint) VALUES (?, ?)",
+                                (firm.firm_id, endpoint))
+                self.db.commit()
+
+            return dict(self.db.execute("SELECT id, hash FROM sync_rows WHERE firm_id = ?", (firm.firm_id,)))
+
+    def record(self, firm_id, hashes):
+        """records pushed classifications
+
+        Args:
+            firm_id (int): firm ID
+            hashes (list[tuple(int, string)]): ID and content hash of each pushed classification
+        """
+        with self.lock:
+            self.db.executemany("INSERT OR REPLACE INTO sync_rows VALUES (?, ?, ?)",
+                                [(firm_id, pk, content_hash) for pk, content_hash in hashes])
+            self.db.commit()
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM sync_rows")
+            self.db.execute("DELETE FROM sync_firms")
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+def content_hash(guid, name):
+    return hashlib.sha1(json.dumps([guid, name], ensure_ascii=False).encode()).hexdigest()
+
+
+def iter_firm_rows(connection_parameters, pks=None, chunk_size=1000):
+    """reads classifications with settings of their firms in single query, grouped by firm
+
+    Args:
+        connection_parameters (kwargs dict): pymssql connection parameters
+        pks (list, optional): firm IDs. Defaults to None, all active firms.
+        chunk_size (int, optional): number of rows fetched at once. Defaults to 1000.
+
+    Yields:
+        tuple(SyncFirm, list[tuple(int, string, string)]): firm and ID, GUID and name of its classifications
+    """
+    query = ("SELECT f.tpfirm_id, f.OdooHost, f.OdooPort, f.OdooDataBase, f.OdooUserName, "
+             "f.OdooPassword, f.WebClassificationTable, f.TopWebClassifications, c.id, c.TopWebClassificationGUID, c.Name "
+             "FROM TronPosOdooExchangeUp f JOIN TronPosWebClassifications c ON c.tpfirm_id = f.tpfirm_id "
+             "WHERE {} ORDER BY f.tpfirm_id, c.id")
+    if(pks is None):
+        statements = [(query.format("f.tpfirmActive = 1"), ())]
+    else:
+        pks = sorted(set(pks))
+        statements = []
+        for i in range(0, len(pks), MAX_PARAMETERS):
+            chunk = tuple(pks[i:i + MAX_PARAMETERS])
+            statements.append((query.format("f.tpfirm_id IN ({})".format(", ".join(["%s"] * len(chunk)))), chunk))
+
+    with connect(connection_parameters) as conn:
+        with conn.cursor() as cursor:
+            for statement, parameters in statements:
+                QUERY_LOG.record("TronPosWebClassifications", [("tpfirm_id", "eq")])
+                cursor.execute(statement, parameters)
+                rows = itertools.chain.from_iterable(iter(lambda: cursor.fetchmany(chunk_size), []))
+                for _, firm_rows in itertools.groupby(rows, key=lambda row: row[0]):
+                    firm_rows = list(firm_rows)
+                    first = firm_rows[0]
+                    firm = SyncFirm(*first[:6], first[6] or DEFAULT_MODEL, first[7] or None)
+                    yield firm, [row[8:] for row in firm_rows]
+            conn.commit()
+
+
+class SyncEngine:
+    """Pushes classifications of firms to Odoo"""
+
+    WORKERS = 8
+    BATCH_SIZE = 500
+    RATE = 10.0
+    BURST = 5
+
+    def __init__(self, connection_parameters, checkpoint, workers=WORKERS, batch_size=BATCH_SIZE,
+                 rate=RATE, burst=BURST, timeout=30.0):
+        """Constructor
+
+        Args:
+            connection_parameters (kwargs dict): pymssql connection parameters
+            checkpoint (Checkpoint): pushed state
+            workers (int, optional): number of firms synced at once. Defaults to WORKERS.
+            batch_size (int, optional): number of classifications sent in single load call. Defaults to BATCH_SIZE.
+            rate (float, optional): max calls per second to single Odoo host. Defaults to RATE.
+            burst (int, optional): max calls at once to single Odoo host. Defaults to BURST.
+            timeout (float, optional): timeout of single call in seconds. Defaults to 30.0.
+        """
+        self.connection_parameters = connection_parameters
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.batch_size = batch_size
+        self.rate = rate
+        self.burst = burst
+        self.timeout = timeout
+        self.buckets = {}
+        self.buckets_lock = threading.Lock()
+
+    def bucket(self, host, port):
+        with self.buckets_lock:
+            if((host, port) not in self.buckets):
+                self.buckets[(host, port)] = TokenBucket(self.rate, self.burst)
+            return self.buckets[(host, port)]
+
+    def syncFirm(self, firm, rows):
+        """sends new and changed classifications of firm
+
+        Args:
+            firm (SyncFirm): firm
+            rows (list[tuple(int, string, string)]): ID, GUID and name of firm's classifications
+
+        Returns:
+            SyncResult: result of firm
+        """
+        start = time.perf_counter()
+        sent = 0
+        unchanged = 0
+        try:
+            pushed = self.checkpoint.begin(firm)
+            changed = []
+            for pk, guid, name in rows:
+                row_hash = content_hash(guid, name)
+                if(pushed.get(pk) != row_hash):
+                    changed.append((pk, guid, name, row_hash))
+            unchanged = len(rows) - len(changed)
+
+            if(len(changed) > 0):
+                bucket = self.bucket(firm.host, firm.port)
+                client = OdooClient(firm.host, firm.port, self.timeout)
+                try:
+                    bucket.acquire()
+                    uid = client.call('common', 'authenticate', firm.database, firm.user, firm.password, {})
+                    if(not uid):
+                        raise SyncError("Prijava v Odoo ni uspela")
+
+                    fields = LOAD_FIELDS + ([firm.guid_field] if firm.guid_field else [])
+                    for i in range(0, len(changed), self.batch_size):
+                        batch = changed[i:i + self.batch_size]
+                        values = [[XMLID_FORMAT.format(pk), name if name is not None else guid] +
+                                  ([guid] if firm.guid_field else []) for pk, guid, name, _ in batch]
+                        bucket.acquire()
+                        result = client.call('object', 'execute_kw', firm.database, uid, firm.password,
+                                             firm.model, 'load', [fields, values])
+                        errors = [message.get('message') for message in result.get('messages', [])
+                                  if message.get('type') == 'error']
+                        if(not result.get('ids') or len(errors) > 0):
+                            raise SyncError("; ".join(errors) or "Odoo ni sprejel zapisov")
+
+                        self.checkpoint.record(firm.firm_id, [(pk, row_hash) for pk, _, _, row_hash in batch])
+                        sent += len(batch)
+                finally:
+                    client.close()
+
+            return SyncResult(firm.firm_id, True, sent, unchanged, "OK", time.perf_counter() - start)
+        except Exception as e:
+            return SyncResult(firm.firm_id, False, sent, unchanged, str(e) or type(e).__name__,
+                              time.perf_counter() - start)
+
+    def run(self, pks=None, on_result=None, cancelled=lambda: False):
+        """syncs firms, blocking. Firms are read from SQL DB while earlier firms are already being synced.
+
+        Args:
+            pks (list, optional): firm IDs. Defaults to None, all active firms.
+            on_result (function, optional): called with SyncResult of each firm, from worker thread. Defaults to None.
+            cancelled (function, optional): returns True when remaining firms should be skipped. Defaults to never.
+
+        Returns:
+            list[SyncResult]: results of firms
+        """
+        results = []
+        # bounds number of firms read ahead of workers
+        slots = threading.BoundedSemaphore(self.workers * 2)
+
+        def job(firm, rows):
+            try:
+                if(cancelled()):
+                    return
+                result = self.syncFirm(firm, rows)
+                results.append(result)
+                if(on_result is not None):
+                    on_result(result)
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(self.workers) as executor:
+            for firm, rows in iter_firm_rows(self.connection_parameters, pks):
+                if(cancelled()):
+                    break
+                slots.acquire()
+                executor.submit(job, firm, rows)
+
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--firm', type=int, action='append', help='synced firm ID, defaults to all active firms')
+    parser.add_argument('--workers', type=int, default=SyncEngine.WORKERS, help='firms synced at once')
+    parser.add_argument('--batch-size', type=int, default=SyncEngine.BATCH_SIZE, help='classifications per call')
+    parser.add_argument('--rate', type=float, default=SyncEngine.RATE, help='max calls per second to single host')
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILE, help='local database with pushed state')
+    parser.add_argument('--full', action='store_true', help='ignore checkpoint and send all classifications')
+    parser.add_argument('--config', default=CONFIG_FILE, help='config file with connection settings')
+    args = parser.parse_args(argv)
+
+    checkpoint = Checkpoint(args.checkpoint)
+    if(args.full):
+        checkpoint.clear()
+
+    start = time.perf_counter()
+    print_lock = threading.Lock()
+
+    def on_result(result):
+        with print_lock:
+            print(json.dumps(result._asdict(), ensure_ascii=False), flush=True)
+
+    try:
+        engine = SyncEngine(load_connection_parameters(args.config, write_default=False), checkpoint,
+                            args.workers, args.batch_size, args.rate)
+        results = engine.run(args.firm, on_result)
+    finally:
+        checkpoint.close()
+
+    print("Synced {} firms in {:.1f} s, sent {} classifications, {} firms failed".format(
+        len(results), time.perf_counter() - start, sum(result.sent for result in results),
+        sum(not result.ok for result in results)), file=sys.stderr)
+    return 1 if any(not result.ok for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
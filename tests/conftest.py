@@ -0,0 +1,58 @@
+"""Fixtures for tests of model layer, run against in-memory stand-in database (standin.py)."""
+
+import sys
+from os import path
+
+import pytest
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import models
+from bench import CONNECTION_PARAMETERS, make_row
+from models import TronPosOdooExchangeUp, TronPosWebClassifications
+from standin import StandInDatabase
+
+
+@pytest.fixture
+def db():
+    """stand-in database with tables of this repository, used by all model calls of the test"""
+    database = StandInDatabase()
+    database.createTables()
+    factory = models.CONNECTION_FACTORY
+    models.set_connection_factory(database.connect)
+    yield database
+    models.set_connection_factory(factory)
+
+
+@pytest.fixture
+def cp():
+    return dict(CONNECTION_PARAMETERS)
+
+
+def firm_values(pk, **changes):
+    """returns SQL values of TronPosOdooExchangeUp row in field order
+
+    Args:
+        pk (int): primary key value
+        changes: values which replace generated ones
+    """
+    row = make_row(pk)
+    row.update(changes)
+    return [int(value) if isinstance(value, bool) else value for value in row.values()]
+
+
+def insert_firms(pks, classifications_per_firm=0):
+    """inserts firms and their classifications with single transaction
+
+    Args:
+        pks (iterable[int]): firm IDs
+        classifications_per_firm (int, optional): number of classifications of each firm. Defaults to 0.
+    """
+    pks = list(pks)
+    with models.connect(CONNECTION_PARAMETERS) as conn:
+        with conn.cursor() as cursor:
+            cursor.executemany(TronPosOdooExchangeUp.INSERT_QUERY, [tuple(firm_values(pk)) for pk in pks])
+            cursor.executemany(TronPosWebClassifications.INSERT_QUERY, [
+                (pk * 1000 + i, pk, "guid-{}-{}".format(pk, i), "Name {}".format(i))
+                for pk in pks for i in range(classifications_per_firm)])
+        conn.commit()
@@ -0,0 +1,29 @@
+import pytest
+
+from conftest import insert_firms
+from models import MAX_PARAMETERS, ConcurrencyConflict, TronPosOdooExchangeUp
+
+
+def test_update_objects_by_pk(db, cp):
+    count = MAX_PARAMETERS + 100
+    insert_firms(range(1, count + 1))
+    loaded = TronPosOdooExchangeUp.FetchObjectsWhere(cp, {'tpfirm_id': 2})[0]
+
+    pks = list(range(2, count + 1))
+    assert TronPosOdooExchangeUp.UpdateObjectsByPK(cp, pks, {'OdooPort': 1, 'recDate': None}) == count - 1
+
+    firms = {firm.getField('tpfirm_id'): firm for firm in TronPosOdooExchangeUp.FetchAllObjects(cp)}
+    assert firms[1].getField('OdooPort') == 8069
+    assert all(firms[pk].getField('OdooPort') == 1 and firms[pk].getField('recDate') is None for pk in pks)
+
+    # version was incremented, so optimistic update of copy loaded before fails
+    loaded.setField('OdooPort', 2)
+    with pytest.raises(ConcurrencyConflict):
+        loaded.updateObject(cp, optimistic=True)
+
+
+def test_update_objects_by_pk_rejects_pk(db, cp):
+    with pytest.raises(ValueError):
+        TronPosOdooExchangeUp.UpdateObjectsByPK(cp, [1], {'tpfirm_id': 2})
+    with pytest.raises(ValueError):
+        TronPosOdooExchangeUp.UpdateObjectsByPK(cp, [1], {'missing': 2})
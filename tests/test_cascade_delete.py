@@ -0,0 +1,22 @@
+from conftest import insert_firms
+from models import TronPosOdooExchangeUp, TronPosWebClassifications
+
+
+def test_delete_where_cascades_to_referencing_rows(db, cp):
+    insert_firms(range(1, 6), classifications_per_firm=3)
+
+    deleted = TronPosOdooExchangeUp.DeleteObjectsWhere(cp, [('tpfirm_id', 'in', [2, 4])])
+    assert dict(deleted) == {'TronPosWebClassifications': 6, 'TronPosOdooExchangeUp': 2}
+    # referencing rows are deleted first
+    assert list(deleted) == ['TronPosWebClassifications', 'TronPosOdooExchangeUp']
+
+    assert TronPosOdooExchangeUp.CountObjects(cp) == 3
+    remaining = {obj.getField('tpfirm_id') for obj in TronPosWebClassifications.FetchAllObjects(cp)}
+    assert remaining == {1, 3, 5}
+
+
+def test_delete_where_with_range_condition(db, cp):
+    insert_firms(range(1, 6), classifications_per_firm=2)
+    deleted = TronPosOdooExchangeUp.DeleteObjectsWhere(cp, [('tpfirm_id', '>=', 4)])
+    assert dict(deleted) == {'TronPosWebClassifications': 4, 'TronPosOdooExchangeUp': 2}
+    assert TronPosWebClassifications.CountObjects(cp) == 6
@@ -0,0 +1,55 @@
+from conftest import insert_firms
+from models import ChangeTracker, TronPosOdooExchangeUp
+
+
+def fetch_firm(cp, pk):
+    return TronPosOdooExchangeUp.FetchObjectsWhere(cp, {'tpfirm_id': pk})[0]
+
+
+def test_poll_finds_inserted_changed_and_deleted(db, cp):
+    insert_firms(range(1, 11))
+    tracker = ChangeTracker(TronPosOdooExchangeUp, cp)
+    tracker.reset()
+    assert tracker.poll() == ([], [])
+
+    firm = fetch_firm(cp, 2)
+    firm.setField('tpfirmName', 'Changed')
+    firm.updateObject(cp)
+    fetch_firm(cp, 3).deleteObject(cp)
+    insert_firms([11])
+
+    changed, deleted = tracker.poll()
+    assert sorted(obj.getField('tpfirm_id') for obj in changed) == [2, 11]
+    assert deleted == [3]
+    assert tracker.poll() == ([], [])
+
+
+def test_has_changed_and_conditions(db, cp):
+    insert_firms(range(1, 11))
+    tracker = ChangeTracker(TronPosOdooExchangeUp, cp, [('tpfirm_id', '<=', 5)])
+    tracker.reset(versions=False)
+    assert not tracker.hasChanged()
+
+    # rows outside of filter are not tracked
+    firm = fetch_firm(cp, 8)
+    firm.setField('OdooPort', 1)
+    firm.updateObject(cp)
+    assert not tracker.hasChanged()
+
+    firm = fetch_firm(cp, 4)
+    firm.setField('OdooPort', 1)
+    firm.updateObject(cp)
+    assert tracker.hasChanged()
+
+
+def test_iter_objects_and_restore(db, cp):
+    insert_firms(range(1, 8))
+    tracker = ChangeTracker(TronPosOdooExchangeUp, cp)
+    chunks = list(tracker.iterObjects(chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert tracker.poll() == ([], [])
+
+    restored = ChangeTracker(TronPosOdooExchangeUp, cp)
+    restored.restore(dict(tracker.versions))
+    fetch_firm(cp, 1).deleteObject(cp)
+    assert restored.poll() == ([], [1])
@@ -0,0 +1,103 @@
+import decimal
+import os
+import uuid
+from os import path
+
+import pytest
+
+import codegen
+from codegen import ColumnInfo, CodegenError, field_source, load_schema_classes, parse_ddl
+from export import format_values
+from models import TronPosOdooExchangeUp, TronPosWebClassifications
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+SQL_FILES = [path.join(ROOT, name) for name in ('TronPosOdooExchangeUp.sql', 'TronPosWebClassifications.sql')]
+
+TYPED_DDL = """CREATE TABLE Payments (
+    [id] UNIQUEIDENTIFIER NOT NULL PRIMARY KEY,
+    Amount DECIMAL(12, 2) NOT NULL,
+    Fee MONEY NULL,
+    Rate FLOAT NULL,
+    Signature VARBINARY(64) NULL,
+    Payload VARBINARY(MAX) NULL
+);"""
+
+
+def test_parse_ddl_of_repository_tables():
+    tables = []
+    for sql_file in SQL_FILES:
+        with open(sql_file, encoding="utf-8-sig") as f:
+            tables.extend(parse_ddl(f.read()))
+
+    assert [table.name for table in tables] == ['TronPosOdooExchangeUp', 'TronPosWebClassifications']
+    firms, classifications = tables
+    assert [column.name for column in firms.columns] == list(TronPosOdooExchangeUp.fields.keys())
+    assert [column.name for column in classifications.columns] == list(TronPosWebClassifications.fields.keys())
+    assert [column.name for column in firms.columns if column.is_pk] == ['tpfirm_id']
+    assert {column.name: column.references for column in classifications.columns if column.references} == {
+        'tpfirm_id': 'TronPosOdooExchangeUp'}
+    assert [column.name for column in firms.columns if column.nullable] == [
+        name for name, field_type in TronPosOdooExchangeUp.fields.items() if field_type.isNull]
+
+
+def test_generated_classes_match_models(tmp_path):
+    schema_classes = load_schema_classes(SQL_FILES, cache_dir=str(tmp_path))
+    assert list(schema_classes.keys()) == ['TronPosOdooExchangeUp', 'TronPosWebClassifications']
+    assert codegen.check(schema_classes) == []
+
+
+def test_type_mapping():
+    payments = parse_ddl(TYPED_DDL)[0]
+    assert [field_source(column) for column in payments.columns] == [
+        "MSUniqueIdentifier(isPK=True)",
+        "MSDecimal(12, 2)",
+        "MSDecimal(19, 4, isNull=True)",
+        "MSFloat(isNull=True)",
+        "MSVarbinary(64, isNull=True)",
+        "MSVarbinary({}, isNull=True)".format(codegen.MAX_LENGTH)]
+
+    with pytest.raises(CodegenError):
+        field_source(ColumnInfo('Shape', 'GEOGRAPHY', None, True, False, None))
+
+
+def test_typed_values_round_trip(tmp_path):
+    ddl_file = tmp_path / "Payments.sql"
+    ddl_file.write_text(TYPED_DDL, encoding="utf-8")
+    payments = load_schema_classes([str(ddl_file)], cache_dir=str(tmp_path / "cache"))['Payments']
+
+    row = [uuid.UUID(int=1), decimal.Decimal("1234.50"), None, 0.25, b"\x01\xff", None]
+    texts = [list(row)]
+    format_values(payments, texts)
+    assert texts == [[str(uuid.UUID(int=1)), "1234.50", None, 0.25, "01ff", None]]
+
+    for field_type, value, text in zip(payments.fields.values(), row, texts[0]):
+        if(value is not None):
+            assert field_type.fromText(str(text)) == value
+            field_type.setValue(value)
+            assert field_type.isValueOK()
+
+    amount = payments.fields['Amount']
+    amount.setValue(decimal.Decimal("10000000000.00"))
+    assert not amount.isValueOK()
+    with pytest.raises(ValueError):
+        amount.fromText("12,5")
+    assert payments.fields['Signature'].fromText("0x01FF") == b"\x01\xff"
+
+
+def test_cache_prunes_older_modules(tmp_path):
+    ddl_file = tmp_path / "Payments.sql"
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    (cache_dir / "schema_0123456789abcdef.py").write_text("", encoding="utf-8")
+
+    ddl_file.write_text(TYPED_DDL, encoding="utf-8")
+    load_schema_classes([str(ddl_file)], cache_dir=str(cache_dir))
+    load_schema_classes(SQL_FILES, cache_dir=str(cache_dir))
+    first = sorted(name for name in os.listdir(cache_dir) if name.endswith(".py"))
+    assert len(first) == 2
+
+    ddl_file.write_text(TYPED_DDL.replace("Rate FLOAT NULL,", "Rate REAL NULL,"), encoding="utf-8")
+    load_schema_classes([str(ddl_file)], cache_dir=str(cache_dir))
+    second = sorted(name for name in os.listdir(cache_dir) if name.endswith(".py"))
+    assert len(second) == 2
+    assert len(set(first) & set(second)) == 1
@@ -0,0 +1,40 @@
+import datetime
+
+from conftest import firm_values, insert_firms
+from models import TronPosOdooExchangeUp, TronPosWebClassifications
+
+
+def test_insert_fetch_update_delete(db, cp):
+    firm = TronPosOdooExchangeUp(dict(zip(TronPosOdooExchangeUp.FIELD_NAMES, firm_values(1))))
+    assert firm.insertObject(cp) == 1
+
+    fetched = TronPosOdooExchangeUp.FetchObjectsWhere(cp, {'tpfirm_id': 1})
+    assert len(fetched) == 1
+    assert fetched[0].getFieldValuesSQL() == firm.getFieldValuesSQL()
+
+    fetched[0].setField('tpfirmName', 'Renamed')
+    fetched[0].updateObject(cp)
+    assert TronPosOdooExchangeUp.FetchObjectsWhere(cp, {'tpfirm_id': 1})[0].getField('tpfirmName') == 'Renamed'
+
+    assert fetched[0].deleteObject(cp) == 1
+    assert TronPosOdooExchangeUp.CountObjects(cp) == 0
+
+
+def test_datetime_values_round_trip(db, cp):
+    insert_firms([1])
+    firm = TronPosOdooExchangeUp.FetchObjectsWhere(cp, {'tpfirm_id': 1})[0]
+    assert firm.getField('recDate') == datetime.datetime(2020, 1, 1, 0, 1)
+
+
+def test_iter_values_chunks(db, cp):
+    insert_firms(range(1, 26), classifications_per_firm=2)
+    chunks = list(TronPosWebClassifications.IterValues(cp, chunk_size=10))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 10, 10, 10]
+    assert TronPosWebClassifications.CountObjects(cp) == 50
+
+
+def test_datetime_to_sql_keeps_time_of_day():
+    field_type = TronPosOdooExchangeUp.fields['recDate']
+    assert field_type.toSQL(datetime.datetime(2020, 1, 1, 13, 30)) == datetime.datetime(2020, 1, 1, 13, 30)
+    assert field_type.toSQL(datetime.date(2020, 1, 1)) == datetime.datetime(2020, 1, 1)
+    assert field_type.toSQL(None) is None
@@ -0,0 +1,63 @@
+import csv
+
+from conftest import insert_firms
+from export import MASK, export_table
+from importer import import_files
+from models import TronPosOdooExchangeUp, TronPosWebClassifications
+
+
+def all_values(cp, schema_class):
+    return sorted(values for chunk in schema_class.IterValues(cp) for values in chunk)
+
+
+def test_csv_round_trip(db, cp, tmp_path):
+    insert_firms(range(1, 11), classifications_per_firm=2)
+    firms = all_values(cp, TronPosOdooExchangeUp)
+    classifications = all_values(cp, TronPosWebClassifications)
+
+    files = {TronPosOdooExchangeUp: str(tmp_path / "firms.csv"),
+             TronPosWebClassifications: str(tmp_path / "classifications.csv")}
+    for schema_class, file_path in files.items():
+        export_table(schema_class, cp, file_path)
+
+    TronPosOdooExchangeUp.DeleteObjectsWhere(cp, [])
+    results = import_files(files, cp)
+
+    assert results['TronPosOdooExchangeUp']['inserted'] == 10
+    assert results['TronPosWebClassifications']['inserted'] == 20
+    assert all_values(cp, TronPosWebClassifications) == classifications
+    # imported rows are new, version field is not compared
+    version = TronPosOdooExchangeUp.FIELD_NAMES.index('RowChID')
+    assert [row[:version] + row[version + 1:] for row in all_values(cp, TronPosOdooExchangeUp)] == \
+        [row[:version] + row[version + 1:] for row in firms]
+
+
+def test_export_with_conditions(db, cp, tmp_path):
+    insert_firms(range(1, 11))
+    file_path = str(tmp_path / "firms.jsonl")
+    assert export_table(TronPosOdooExchangeUp, cp, file_path, conditions=[('tpfirm_id', '>', 7)]) == 3
+    with open(file_path) as f:
+        assert len(f.readlines()) == 3
+
+
+def test_masked_import_keeps_passwords(db, cp, tmp_path):
+    insert_firms(range(1, 4))
+    file_path = str(tmp_path / "firms.csv")
+    export_table(TronPosOdooExchangeUp, cp, file_path, mask=True)
+    passwords = {firm.getField('tpfirm_id'): firm.getField('OdooPassword')
+                 for firm in TronPosOdooExchangeUp.FetchAllObjects(cp)}
+
+    with open(file_path, newline="") as f:
+        records = list(csv.reader(f))
+    assert records[1][records[0].index('OdooPassword')] == MASK
+    new_record = list(records[1])
+    new_record[0] = '99'
+    with open(file_path, "a", newline="") as f:
+        csv.writer(f).writerow(new_record)
+
+    rejects = str(tmp_path / "rejects.csv")
+    results = import_files({TronPosOdooExchangeUp: file_path}, cp, rejects)
+    assert results['TronPosOdooExchangeUp']['updated'] == 3
+    assert results['TronPosOdooExchangeUp']['rejected'] == 1
+    assert {firm.getField('tpfirm_id'): firm.getField('OdooPassword')
+            for firm in TronPosOdooExchangeUp.FetchAllObjects(cp)} == passwords
@@ -0,0 +1,57 @@
+import datetime
+
+import pytest
+
+from conftest import insert_firms
+from models import TronPosOdooExchangeUp, compile_filter, parse_filter_text
+
+
+def values_where(cp, conditions):
+    return sorted(row[0] for chunk in TronPosOdooExchangeUp.IterValues(cp, conditions) for row in chunk)
+
+
+def test_compile_filter_clauses():
+    assert compile_filter(TronPosOdooExchangeUp, []) == ("", ())
+    assert compile_filter(TronPosOdooExchangeUp, [('tpfirm_id', '>=', 5), ('OdooHost', '=', None)]) == (
+        "WHERE (tpfirm_id >= %s) AND (OdooHost IS NULL)", (5,))
+    assert compile_filter(TronPosOdooExchangeUp, [(('tpfirmName', 'OdooHost'), 'prefix', '50%_')]) == (
+        "WHERE (tpfirmName LIKE %s ESCAPE '\\' OR OdooHost LIKE %s ESCAPE '\\')", ('50\\%\\_%', '50\\%\\_%'))
+
+    with pytest.raises(ValueError):
+        compile_filter(TronPosOdooExchangeUp, [('missing', '=', 1)])
+    with pytest.raises(ValueError):
+        compile_filter(TronPosOdooExchangeUp, [('tpfirm_id', '~', 1)])
+
+
+def test_filter_operators_on_database(db, cp):
+    insert_firms(range(1, 21))
+    assert values_where(cp, [('tpfirm_id', 'in', [3, 5, 99])]) == [3, 5]
+    assert values_where(cp, [('tpfirm_id', '<', 4)]) == [1, 2, 3]
+    assert values_where(cp, [('tpfirmName', 'contains', 'ma 1')]) == [1] + list(range(10, 20))
+    assert values_where(cp, [('tpfirmActive', '=', 0), ('tpfirm_id', '!=', 3)]) == [6, 9, 12, 15, 18]
+
+
+def test_parse_filter_text():
+    conditions = parse_filter_text(TronPosOdooExchangeUp, 'tpfirmActive=1 recDate>=2020-01-01 OdooHost:NULL "firma 1"')
+    assert conditions == [
+        ('tpfirmActive', '=', 1),
+        ('recDate', '>=', datetime.datetime(2020, 1, 1)),
+        ('OdooHost', '=', None),
+        (TronPosOdooExchangeUp.SEARCH_FIELDS, 'prefix', 'firma 1')]
+
+    with pytest.raises(ValueError):
+        parse_filter_text(TronPosOdooExchangeUp, 'tpfirm_id=abc')
+
+
+def test_parse_filter_text_unknown_field_is_search_word():
+    assert parse_filter_text(TronPosOdooExchangeUp, 'http://odoo', ['OdooHost']) == [
+        (('OdooHost',), 'prefix', 'http://odoo')]
+    assert parse_filter_text(TronPosOdooExchangeUp, 'a=b', ['OdooHost']) == [(('OdooHost',), 'prefix', 'a=b')]
+
+
+def test_in_with_empty_list_matches_nothing(db, cp):
+    insert_firms(range(1, 4))
+    assert compile_filter(TronPosOdooExchangeUp, [('tpfirm_id', 'in', [])]) == ("WHERE (1=0)", ())
+    assert values_where(cp, [('tpfirm_id', 'in', [])]) == []
+    assert TronPosOdooExchangeUp.DeleteObjectsWhere(cp, [('tpfirm_id', 'in', [])])['TronPosOdooExchangeUp'] == 0
+    assert TronPosOdooExchangeUp.CountObjects(cp) == 3
@@ -0,0 +1,35 @@
+import models
+from conftest import insert_firms
+from index_advisor import ddl_indexes, recommend
+from models import ChangeTracker, ObjectPageSource, QueryLog, TronPosOdooExchangeUp
+
+
+def test_indexes_from_sql_files_are_not_recommended():
+    existing = ddl_indexes()
+    assert ('tpfirm_id',) in existing['TronPosWebClassifications']
+
+    recommended = [(r.table_name, r.columns) for r in recommend(existing=existing)]
+    assert ('TronPosWebClassifications', ('tpfirm_id',)) not in recommended
+    assert ('TronPosWebClassifications', ('tpfirm_id',)) in [(r.table_name, r.columns) for r in recommend()]
+
+
+def test_query_log_counts_executed_queries(db, cp, monkeypatch):
+    monkeypatch.setattr(models, 'QUERY_LOG', QueryLog())
+    insert_firms(range(1, 26))
+    pattern = ('TronPosOdooExchangeUp', (('tpfirmActive', 'eq'),))
+
+    source = ObjectPageSource(TronPosOdooExchangeUp, cp, page_size=10)
+    filtered = source.withFilter([('tpfirmActive', '=', True)])
+    assert models.QUERY_LOG.items() == []
+
+    filtered.count()
+    filtered.getRows(0, 15)
+    filtered.getRows(0, 15)
+    assert models.QUERY_LOG.patterns[pattern] == 3
+    filtered.close()
+    source.close()
+
+    tracker = ChangeTracker(TronPosOdooExchangeUp, cp, [('tpfirmActive', '=', True)])
+    assert models.QUERY_LOG.patterns[pattern] == 3
+    tracker.reset()
+    assert models.QUERY_LOG.patterns[pattern] == 5
@@ -0,0 +1,56 @@
+import pytest
+
+from conftest import insert_firms
+from models import TronPosOdooExchangeUp, TronPosWebClassifications, ConcurrencyConflict
+
+
+def fetch_firm(cp, pk):
+    return TronPosOdooExchangeUp.FetchObjectsWhere(cp, {'tpfirm_id': pk})[0]
+
+
+def test_clone_has_no_clone(db, cp):
+    insert_firms([1])
+    assert fetch_firm(cp, 1).clone.clone is None
+
+
+def test_optimistic_update_conflict(db, cp):
+    insert_firms([1])
+    first = fetch_firm(cp, 1)
+    second = fetch_firm(cp, 1)
+
+    first.setField('OdooPort', 1)
+    assert first.updateObject(cp, optimistic=True) == 1
+
+    second.setField('OdooPort', 2)
+    with pytest.raises(ConcurrencyConflict) as conflict:
+        second.updateObject(cp, optimistic=True)
+    assert conflict.value.getCurrent().getField('OdooPort') == 1
+    assert fetch_firm(cp, 1).getField('OdooPort') == 1
+
+
+def test_rename_moves_foreign_keys(db, cp):
+    insert_firms([1], classifications_per_firm=2)
+    firm = fetch_firm(cp, 1)
+    version = firm.getField('RowChID')
+    firm.setField('tpfirm_id', 5)
+
+    assert firm.renameObject(cp, optimistic=True) == 1
+    assert firm.clone.getField('tpfirm_id') == 5
+    assert fetch_firm(cp, 5).getField('RowChID') == version + 1
+    assert TronPosOdooExchangeUp.FetchObjectsWhere(cp, {'tpfirm_id': 1}) == []
+    assert len(TronPosWebClassifications.FetchObjectsWhere(cp, {'tpfirm_id': 5})) == 2
+
+
+def test_rename_conflict_rolls_back(db, cp):
+    insert_firms([1], classifications_per_firm=2)
+    firm = fetch_firm(cp, 1)
+    other = fetch_firm(cp, 1)
+    other.setField('OdooPort', 1)
+    other.updateObject(cp, optimistic=True)
+
+    firm.setField('tpfirm_id', 5)
+    with pytest.raises(ConcurrencyConflict) as conflict:
+        firm.renameObject(cp, optimistic=True)
+    assert conflict.value.getCurrent().getField('OdooPort') == 1
+    assert TronPosOdooExchangeUp.FetchObjectsWhere(cp, {'tpfirm_id': 5}) == []
+    assert len(TronPosWebClassifications.FetchObjectsWhere(cp, {'tpfirm_id': 1})) == 2
@@ -0,0 +1,42 @@
+from conftest import insert_firms
+from models import ObjectPageSource, TronPosOdooExchangeUp
+
+
+def test_get_rows_across_pages(db, cp):
+    insert_firms(range(1, 26))
+    source = ObjectPageSource(TronPosOdooExchangeUp, cp, page_size=10, cache_pages=2)
+
+    rows = source.getRows(5, 22)
+    assert [obj.getField('tpfirm_id') for obj in rows] == list(range(6, 23))
+    assert source.count() == 25
+    assert len(source.getRows(20, 40)) == 5
+    assert len(source.pages) == 2
+    source.close()
+
+
+def test_cached_rows_and_invalidate(db, cp):
+    insert_firms(range(1, 26))
+    source = ObjectPageSource(TronPosOdooExchangeUp, cp, page_size=10)
+
+    assert source.cachedRows(0, 15) is None
+    source.getRows(0, 15)
+    statements = db.statements
+    assert [obj.getField('tpfirm_id') for obj in source.cachedRows(0, 15)] == list(range(1, 16))
+    assert db.statements == statements
+
+    source.invalidate()
+    assert source.cachedRows(0, 15) is None
+    source.close()
+
+
+def test_order_and_filter(db, cp):
+    insert_firms(range(1, 26))
+    source = ObjectPageSource(TronPosOdooExchangeUp, cp, page_size=10)
+    source.setOrder('tpfirm_id', reverse=True)
+    assert [obj.getField('tpfirm_id') for obj in source.getRows(0, 3)] == [25, 24, 23]
+
+    filtered = source.withFilter([('tpfirm_id', '<=', 12)])
+    assert filtered.count() == 12
+    assert [obj.getField('tpfirm_id') for obj in filtered.getRows(0, 2)] == [12, 11]
+    source.close()
+    filtered.close()
@@ -0,0 +1,17 @@
+from probe import ODOO, RETAIL, ConnectivityProbe, ProbeTarget
+from standin import StubOdooServer
+
+
+def test_probe_odoo_and_retail(db, cp):
+    with StubOdooServer() as server:
+        port = server.address[1]
+        targets = [ProbeTarget(1, 'a', '127.0.0.1', port, 'db', 'TronRetail1'),
+                   ProbeTarget(2, 'b', '127.0.0.1', port, 'db', 'TronRetail1'),
+                   ProbeTarget(3, 'c', '127.0.0.1', 1, 'db', 'TronRetail1')]
+        results = []
+        ConnectivityProbe(cp, timeout=2).run(targets, results.append)
+
+    odoo = {result.firm_id: result for result in results if result.kind == ODOO}
+    assert odoo[1].ok and odoo[2].ok and odoo[1].detail.startswith('Odoo ')
+    assert not odoo[3].ok
+    assert all(result.ok for result in results if result.kind == RETAIL)
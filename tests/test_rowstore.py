@@ -0,0 +1,50 @@
+from conftest import firm_values
+from models import RowStore, TronPosOdooExchangeUp
+
+
+def make_store(pks):
+    store = RowStore(TronPosOdooExchangeUp)
+    for pk in pks:
+        store.put(str(pk), firm_values(pk))
+    return store
+
+
+def test_put_keeps_order_and_replaces():
+    store = make_store([3, 1, 2])
+    store.put('1', firm_values(1, tpfirmName='Changed'))
+    assert store.orderedKeys() == ['3', '1', '2']
+    assert len(store) == 3
+    assert store.get('1')[store.field_names.index('tpfirmName')] == 'Changed'
+
+
+def test_sorted_keys_follow_changes():
+    store = make_store([3, 1, 2])
+    assert store.sortedKeys('tpfirm_id') == ['1', '2', '3']
+    assert store.sortedKeys('tpfirm_id', reverse=True) == ['3', '2', '1']
+
+    # cached sort keys are updated by put, rename and remove
+    store.put('0', firm_values(0))
+    store.rename('3', '4')
+    store.put('4', firm_values(4))
+    store.remove('2')
+    assert store.sortedKeys('tpfirm_id') == ['0', '1', '4']
+    assert '3' not in store
+
+
+def test_rename_keeps_position():
+    store = make_store([1, 2, 3])
+    store.rename('2', '20')
+    assert store.orderedKeys() == ['1', '20', '3']
+    assert store.get('20') == firm_values(2)
+
+
+def test_remove_and_clear():
+    store = make_store(range(10))
+    store.remove('5')
+    store.remove('missing')
+    assert len(store) == 9
+    assert '5' not in store.orderedKeys()
+
+    store.clear()
+    assert len(store) == 0
+    assert store.orderedKeys() == []
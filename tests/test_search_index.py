@@ -0,0 +1,42 @@
+from conftest import firm_values
+from models import RowStore, SearchIndex, TronPosOdooExchangeUp
+
+
+def make_store(pks):
+    store = RowStore(TronPosOdooExchangeUp)
+    index = SearchIndex(TronPosOdooExchangeUp, TronPosOdooExchangeUp.SEARCH_FIELDS)
+    store.addIndex(index)
+    for pk in pks:
+        store.put(str(pk), firm_values(pk))
+    return store, index
+
+
+def test_search_is_case_insensitive_substring():
+    store, index = make_store(range(1, 31))
+    assert index.search('FIRMA 2') == {'2'} | {str(pk) for pk in range(20, 30)}
+    assert index.search('rma 30') == {'30'}
+    assert index.search('  ') is None
+
+
+def test_short_query_and_field_names():
+    store, index = make_store(range(1, 31))
+    assert index.search('25', ['tpfirmName']) == {'25'}
+    assert index.search('odoo5.', ['OdooHost']) == {'5', '25'}
+    assert index.search('odoo5.', ['tpfirmName']) == set()
+
+
+def test_index_follows_store_changes():
+    store, index = make_store(range(1, 4))
+    store.put('2', firm_values(2, tpfirmName='Renamed'))
+    assert index.search('firma 2') == set()
+    assert index.search('renamed') == {'2'}
+
+    store.rename('2', '20')
+    assert index.search('renamed') == {'20'}
+    store.remove('20')
+    assert index.search('renamed') == set()
+
+    # index added later indexes already stored objects
+    late = SearchIndex(TronPosOdooExchangeUp, ['tpfirmName'])
+    store.addIndex(late)
+    assert late.search('firma') == {'1', '3'}
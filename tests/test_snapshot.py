@@ -0,0 +1,54 @@
+from collections import OrderedDict
+
+from conftest import insert_firms
+from models import ChangeTracker, MSInt, TronPosOdooExchangeUp, TronPosWebClassifications
+from snapshot import Snapshot
+
+
+def test_save_and_load(db, cp, tmp_path):
+    insert_firms(range(1, 21))
+    tracker = ChangeTracker(TronPosOdooExchangeUp, cp)
+    rows = [values for chunk in TronPosOdooExchangeUp.IterValues(cp) for values in chunk]
+    tracker.reset()
+
+    snapshot = Snapshot(str(tmp_path / "snapshot.db"))
+    assert not snapshot.has(TronPosOdooExchangeUp)
+    snapshot.save(TronPosOdooExchangeUp, reversed(rows), tracker.versions)
+
+    assert snapshot.has(TronPosOdooExchangeUp)
+    assert not snapshot.has(TronPosWebClassifications)
+    assert list(snapshot.iterRows(TronPosOdooExchangeUp, chunk_size=7)) == rows[::-1]
+    assert snapshot.versions(TronPosOdooExchangeUp) == tracker.versions
+
+    snapshot.drop(TronPosOdooExchangeUp)
+    assert not snapshot.has(TronPosOdooExchangeUp)
+
+
+def test_restored_versions_find_changes(db, cp, tmp_path):
+    insert_firms(range(1, 11))
+    tracker = ChangeTracker(TronPosOdooExchangeUp, cp)
+    tracker.reset()
+    snapshot = Snapshot(str(tmp_path / "snapshot.db"))
+    rows = [values for chunk in TronPosOdooExchangeUp.IterValues(cp) for values in chunk]
+    snapshot.save(TronPosOdooExchangeUp, rows, tracker.versions)
+
+    firm = TronPosOdooExchangeUp.FetchObjectsWhere(cp, {'tpfirm_id': 4})[0]
+    firm.setField('OdooPort', 1)
+    firm.updateObject(cp)
+
+    restored = ChangeTracker(TronPosOdooExchangeUp, cp)
+    restored.restore(snapshot.versions(TronPosOdooExchangeUp))
+    changed, deleted = restored.poll()
+    assert [obj.getField('tpfirm_id') for obj in changed] == [4]
+    assert deleted == []
+
+
+def test_changed_schema_is_ignored(tmp_path):
+    snapshot = Snapshot(str(tmp_path / "snapshot.db"))
+    snapshot.save(TronPosWebClassifications, [], {})
+
+    class Changed(TronPosWebClassifications):
+        fields = OrderedDict(list(TronPosWebClassifications.fields.items()) + [('Extra', MSInt())])
+
+    assert snapshot.has(TronPosWebClassifications)
+    assert not snapshot.has(Changed)
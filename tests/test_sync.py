@@ -0,0 +1,65 @@
+import sqlite3
+
+import models
+from bench import make_row
+from models import TronPosOdooExchangeUp, TronPosWebClassifications
+from standin import StubOdooServer
+from sync import XMLID_FORMAT, Checkpoint, SyncEngine
+
+
+def insert_synced_firms(cp, port, pks, guid_field=None):
+    for pk in pks:
+        row = make_row(pk)
+        row.update({'OdooHost': '127.0.0.1', 'OdooPort': port, 'tpfirmActive': True,
+                    'TopWebClassifications': guid_field})
+        TronPosOdooExchangeUp(row).insertObject(cp)
+        for i in range(3):
+            TronPosWebClassifications({'id': pk * 100 + i, 'tpfirm_id': pk, 'TopWebClassificationGUID': 'guid-{}'.format(i),
+                                       'Name': 'Name {}'.format(i)}).insertObject(cp)
+
+
+def sent(results):
+    return {result.firm_id: result.sent for result in results}
+
+
+def test_sync_sends_only_changes(db, cp, tmp_path):
+    with StubOdooServer() as server, StubOdooServer() as other:
+        insert_synced_firms(cp, server.address[1], [1, 2])
+        engine = SyncEngine(cp, Checkpoint(str(tmp_path / "checkpoint.db")))
+
+        assert sent(engine.run()) == {1: 3, 2: 3}
+        assert sent(engine.run()) == {1: 0, 2: 0}
+
+        classification = TronPosWebClassifications.FetchObjectsWhere(cp, {'id': 101})[0]
+        classification.setField('Name', 'Changed')
+        classification.updateObject(cp)
+        assert sent(engine.run()) == {1: 1, 2: 0}
+
+        # endpoint is compared even when RowChID isn't incremented
+        TronPosOdooExchangeUp.UpdateObjectsByPK(cp, [2], {'OdooPort': other.address[1], 'RowChID': 1})
+        assert sent(engine.run()) == {1: 0, 2: 3}
+
+        records = server.records[(make_row(1)['OdooDataBase'], 'WebClass')]
+        assert records[XMLID_FORMAT.format(101)]['name'] == 'Changed'
+
+
+def test_sync_sends_guid_to_configured_field(db, cp, tmp_path):
+    with StubOdooServer() as server:
+        insert_synced_firms(cp, server.address[1], [1], guid_field='x_guid')
+        SyncEngine(cp, Checkpoint(str(tmp_path / "checkpoint.db"))).run()
+        records = server.records[(make_row(1)['OdooDataBase'], 'WebClass')]
+        assert records[XMLID_FORMAT.format(100)]['x_guid'] == 'guid-0'
+
+
+def test_checkpoint_of_older_version(db, cp, tmp_path):
+    file_path = str(tmp_path / "checkpoint.db")
+    conn = sqlite3.connect(file_path)
+    conn.execute("CREATE TABLE sync_firms (firm_id INTEGER PRIMARY KEY, row_version INTEGER, endpoint TEXT)")
+    conn.commit()
+    conn.close()
+
+    with StubOdooServer() as server:
+        insert_synced_firms(cp, server.address[1], [1])
+        engine = SyncEngine(cp, Checkpoint(file_path))
+        assert sent(engine.run()) == {1: 3}
+        assert sent(engine.run()) == {1: 0}
@@ -0,0 +1,31 @@
+from conftest import firm_values, insert_firms
+import models
+from models import TronPosOdooExchangeUp
+from standin import translate_query
+
+
+def test_upsert_mixed_new_and_existing_rows(db, cp):
+    insert_firms(range(1, 6))
+    version = TronPosOdooExchangeUp.FIELD_NAMES.index('RowChID')
+    before = {row[0]: row[version] for chunk in TronPosOdooExchangeUp.IterValues(cp) for row in chunk}
+
+    rows = [firm_values(pk, tpfirmName='Upserted {}'.format(pk)) for pk in range(4, 9)]
+    with models.connect(cp) as conn:
+        with conn.cursor(as_dict=True) as cursor:
+            assert TronPosOdooExchangeUp.UpsertValues(cursor, rows) == (3, 2)
+        conn.commit()
+
+    firms = {firm.getField('tpfirm_id'): firm for firm in TronPosOdooExchangeUp.FetchAllObjects(cp)}
+    assert sorted(firms) == list(range(1, 9))
+    assert firms[3].getField('tpfirmName') == 'Firma 3'
+    assert all(firms[pk].getField('tpfirmName') == 'Upserted {}'.format(pk) for pk in range(4, 9))
+    # version of updated rows is incremented, so optimistic updates of loaded copies fail
+    assert firms[4].getField('RowChID') == before[4] + 1
+
+
+def test_existing_keys_locks_checked_keys(db, cp):
+    with models.connect(cp) as conn:
+        with conn.cursor(as_dict=True) as cursor:
+            assert TronPosOdooExchangeUp._existingKeys(cursor, 'tpfirm_id', [1, 2], lock=True) == set()
+    assert translate_query("SELECT a FROM t WITH (UPDLOCK, HOLDLOCK) WHERE a IN (%s)") == \
+        "SELECT a FROM t WHERE a IN (?)"